@@ -2,38 +2,71 @@ __version__ = '2025.02.14'
 
 import argparse
 from .misp_stix_mapping import Mapping # noqa
-from .misp2stix import MISPtoSTIX1AttributesParser, MISPtoSTIX1EventsParser # noqa
-from .misp2stix import MISPtoSTIX1Mapping # noqa
-from .misp2stix import MISPtoSTIX20Parser, MISPtoSTIX21Parser # noqa
-from .misp2stix import MISPtoSTIX20Mapping, MISPtoSTIX21Mapping # noqa
-from .misp2stix import stix1_attributes_framing, stix1_framing # noqa
-from .misp2stix import stix20_framing, stix21_framing # noqa
-# Helpers
-from .misp_stix_converter import ( # noqa
-    _is_stix1_from_misp, _is_stix2_from_misp,
-    misp_attribute_collection_to_stix1, misp_collection_to_stix2,
-    misp_event_collection_to_stix1, misp_to_stix1, misp_to_stix2,
-    stix_1_to_misp, stix_2_to_misp, stix2_to_misp_instance)
-# STIX 1 special helpers
-from .misp_stix_converter import ( # noqa
-    _get_campaigns, _get_courses_of_action, _get_events, _get_indicators,
-    _get_observables, _get_threat_actors, _get_ttps)
-# STIX 1 footers
-from .misp_stix_converter import ( # noqa
-    _get_campaigns_footer, _get_courses_of_action_footer, _get_indicators_footer,
-    _get_observables_footer, _get_threat_actors_footer, _get_ttps_footer)
-# STIX 1 headers
-from .misp_stix_converter import ( # noqa
-    _get_campaigns_header, _get_courses_of_action_header, _get_indicators_header,
-    _get_observables_header, _get_threat_actors_header, _get_ttps_header)
-# Command line methods
-from .misp_stix_converter import _misp_to_stix, _stix_to_misp # noqa
-from .stix2misp import ExternalSTIX2toMISPParser, InternalSTIX2toMISPParser # noqa
-from .stix2misp import ExternalSTIX2toMISPMapping, InternalSTIX2toMISPMapping # noqa
-from .stix2misp import STIX2PatternParser # noqa
-from .stix2misp import MISP_org_uuid # noqa
+from importlib import import_module
 from pathlib import Path
 
+# Every conversion feature is only imported when it is first accessed, so
+# that each command loads only the libraries (python-stix & cybox for STIX 1,
+# stix2 & the pattern grammars for STIX 2.x) it actually uses
+_lazy_imports = {
+    **dict.fromkeys(
+        (
+            'MISPtoSTIX1AttributesParser', 'MISPtoSTIX1EventsParser',
+            'MISPtoSTIX1Mapping', 'MISPtoSTIX20Parser', 'MISPtoSTIX21Parser',
+            'MISPtoSTIX20Mapping', 'MISPtoSTIX21Mapping',
+            'stix1_attributes_framing', 'stix1_framing', 'stix20_framing',
+            'stix21_framing'
+        ),
+        '.misp2stix'
+    ),
+    **dict.fromkeys(
+        (
+            # Helpers
+            '_is_stix1_from_misp', '_is_stix2_from_misp',
+            'misp_attribute_collection_to_stix1', 'misp_collection_to_stix2',
+            'misp_content_to_stix2', 'misp_event_collection_to_stix1',
+            'misp_to_stix1', 'misp_to_stix2', 'stix_1_to_misp',
+            'stix_2_content_to_misp', 'stix_2_to_misp',
+            'stix2_to_misp_instance',
+            # STIX 1 special helpers
+            '_get_campaigns', '_get_courses_of_action', '_get_events',
+            '_get_indicators', '_get_observables', '_get_threat_actors',
+            '_get_ttps',
+            # STIX 1 footers
+            '_get_campaigns_footer', '_get_courses_of_action_footer',
+            '_get_indicators_footer', '_get_observables_footer',
+            '_get_threat_actors_footer', '_get_ttps_footer',
+            # STIX 1 headers
+            '_get_campaigns_header', '_get_courses_of_action_header',
+            '_get_indicators_header', '_get_observables_header',
+            '_get_threat_actors_header', '_get_ttps_header',
+            # Command line methods
+            '_misp_to_stix', '_serve', '_stix_to_misp'
+        ),
+        '.misp_stix_converter'
+    ),
+    **dict.fromkeys(
+        (
+            'ExternalSTIX2toMISPParser', 'InternalSTIX2toMISPParser',
+            'ExternalSTIX2toMISPMapping', 'InternalSTIX2toMISPMapping',
+            'STIX2PatternParser', 'MISP_org_uuid'
+        ),
+        '.stix2misp'
+    )
+}
+
+
+def __getattr__(name: str):
+    if name not in _lazy_imports:
+        raise AttributeError(f'module {__name__!r} has no attribute {name!r}')
+    value = getattr(import_module(_lazy_imports[name], __name__), name)
+    globals()[name] = value
+    return value
+
+
+def __dir__() -> list:
+    return sorted(set(globals()) | set(_lazy_imports))
+
 
 def _handle_return_message(traceback):
     if isinstance(traceback, dict):
@@ -46,6 +79,18 @@ def _handle_return_message(traceback):
     return '\n - '.join(traceback)
 
 
+def _validation_rate(value: str) -> float:
+    try:
+        rate = float(value)
+    except ValueError:
+        raise argparse.ArgumentTypeError(f'invalid float value: {value!r}')
+    if not 0 <= rate <= 1:
+        raise argparse.ArgumentTypeError(
+            f'{value} is not between 0 and 1'
+        )
+    return rate
+
+
 def main():
     parser = argparse.ArgumentParser(description='Convert MISP <-> STIX')
     parser.add_argument(
@@ -93,6 +138,51 @@ def main():
         help='Output file name - used in the case of a single input file or '
              'when the `single_output` argument is used.'
     )
+    export_parser.add_argument(
+        '-w', '--workers', type=int, default=1,
+        help='Number of worker processes used to convert multiple input files '
+             'in parallel (default is 1) - STIX 2 only.'
+    )
+    export_parser.add_argument(
+        '--trusted', action='store_true',
+        help='Build STIX 2 objects as plain dicts, skipping the python-stix2 '
+             'objects validation - only use it with MISP content from a '
+             'trusted source.'
+    )
+    export_parser.add_argument(
+        '--validation-rate', type=_validation_rate, default=0.0,
+        help='Share of the STIX 2 objects built in trusted mode that are '
+             'also validated with python-stix2 (between 0 and 1, default '
+             'is 0) - requires `--trusted`.'
+    )
+    export_parser.add_argument(
+        '--compact', action='store_true',
+        help='Write STIX 2 bundles without indentation.'
+    )
+    export_parser.add_argument(
+        '--json-backend', choices=['json', 'orjson'], default='json',
+        help='JSON library used to write STIX 2 bundles (default is json) - '
+             'orjson is faster but can only indent by 2 spaces.'
+    )
+    export_parser.add_argument(
+        '--compress', choices=['gzip', 'zstd'],
+        help='Compress the output files, with a `.gz` or `.zst` suffix - '
+             'zstd requires the zstandard library.'
+    )
+    export_parser.add_argument(
+        '--cache', type=Path,
+        help='Path to a cache database of the STIX 2 objects converted from '
+             'each MISP event, reused as long as the event is not modified.'
+    )
+    export_parser.add_argument(
+        '--cache-max-size', type=int,
+        help='Maximum size of the cached content, in MB - the least recently '
+             'used results are evicted beyond.'
+    )
+    export_parser.add_argument(
+        '--cache-max-age', type=float,
+        help='Maximum age of the cached results, in days.'
+    )
     # STIX 1 EXPORT SPECIFIC ARGUMENTS
     stix1_parser = export_parser.add_argument_group('STIX 1 specific arguments')
     stix1_parser.add_argument(
@@ -111,7 +201,7 @@ def main():
         '-org', default='MISP',
         help='Organisation name to be used in the STIX 1 header.'
     )
-    export_parser.set_defaults(func=_misp_to_stix)
+    export_parser.set_defaults(func='_misp_to_stix')
 
     # IMPORT SUBPARSER
     import_parser = subparsers.add_parser(
@@ -193,6 +283,45 @@ def main():
             'name from the list of existing producer Galaxy Clusters.'
         )
     )
+    import_parser.add_argument(
+        '--streaming', action='store_true',
+        help='Read STIX 2 Bundles incrementally, one object at a time, '
+             'instead of loading the whole file content in memory.'
+    )
+    import_parser.add_argument(
+        '--trusted', action='store_true',
+        help='Load STIX 2 content as plain dicts, skipping the python-stix2 '
+             'objects creation and validation - only use it with content '
+             'from a trusted source.'
+    )
+    import_parser.add_argument(
+        '--compress', choices=['gzip', 'zstd'],
+        help='Compress the MISP output files, with a `.gz` or `.zst` suffix '
+             '- compressed input files are detected automatically.'
+    )
+    import_parser.add_argument(
+        '-w', '--workers', type=int, default=1,
+        help='Number of worker processes used to convert multiple input files '
+             'in parallel (default is 1) - ignored when results are sent to '
+             'a MISP instance.'
+    )
+    import_parser.add_argument(
+        '--upload-workers', type=int, default=1,
+        help='Number of MISP events uploaded concurrently to your MISP '
+             'instance (default is 1).'
+    )
+    import_parser.add_argument(
+        '--upload-retries', type=int, default=2,
+        help='Number of times the upload of a MISP event is retried with an '
+             'exponential backoff after a server error or a timeout '
+             '(default is 2).'
+    )
+    import_parser.add_argument(
+        '--upload-timeout', type=float, default=None,
+        help='Number of seconds to wait for the response of your MISP '
+             'instance to an upload before it is retried (default is no '
+             'timeout).'
+    )
     import_parser.add_argument(
         '-c', '--config', type=Path,
         help='Config file containing the URL and the authentication key to connect to your MISP.'
@@ -208,9 +337,26 @@ def main():
         '--skip-ssl', action='store_true',
         help='Skip SSL certificate checking when connecting to your MISP instance.'
     )
-    import_parser.set_defaults(func=_stix_to_misp)
+    import_parser.set_defaults(func='_stix_to_misp')
+
+    # SERVE SUBPARSER
+    serve_parser = subparsers.add_parser(
+        'serve', help='Run conversion jobs in a long-running process - try '
+                      '`misp_stix_converter serve -h` for more help.'
+    )
+    serve_parser.add_argument(
+        '-s', '--socket', type=Path,
+        help='Path of the UNIX socket to listen to - jobs are read from the '
+             'standard input when no socket is given.'
+    )
+    serve_parser.set_defaults(func='_serve')
 
     stix_args = parser.parse_args()
+    if getattr(stix_args, 'validation_rate', 0) and not stix_args.trusted:
+        export_parser.error('argument --validation-rate requires --trusted')
+    stix_args.func = __getattr__(stix_args.func)
+    if stix_args.feature == 'serve':
+        return stix_args.func(stix_args)
     single = (
         stix_args.single_output if stix_args.feature == 'export'
         else stix_args.single_event
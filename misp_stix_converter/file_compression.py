@@ -0,0 +1,155 @@
+# -*- coding: utf-8 -*-
+#!/usr/bin/env python3
+
+import gzip
+import json
+from contextlib import contextmanager
+from io import BufferedReader, BytesIO, TextIOWrapper
+from pathlib import Path
+from typing import IO, Iterator, Optional, Union
+
+_COMPRESSION_SUFFIXES = {'gzip': '.gz', 'zstd': '.zst'}
+_MAGIC_NUMBERS = {b'\x1f\x8b': 'gzip', b'\x28\xb5\x2f\xfd': 'zstd'}
+_SUFFIX_COMPRESSIONS = {
+    suffix: compression for compression, suffix in _COMPRESSION_SUFFIXES.items()
+}
+COMPRESSION_FORMATS = tuple(_COMPRESSION_SUFFIXES)
+
+
+def compressed_filename(filename: Path, compress: Optional[str]) -> Path:
+    """
+    Returns the file name with the suffix of the compression format, unless
+    it already has it.
+    """
+    if compress is None:
+        return filename
+    if compress not in _COMPRESSION_SUFFIXES:
+        raise ValueError(
+            f'Invalid compression format: {compress} - it should be one of '
+            f'{", ".join(COMPRESSION_FORMATS)}.'
+        )
+    suffix = _COMPRESSION_SUFFIXES[compress]
+    if filename.suffix == suffix:
+        return filename
+    return filename.with_name(f'{filename.name}{suffix}')
+
+
+def detect_compression(filename: Union[Path, str]) -> Union[str, None]:
+    """
+    Returns the compression format of a file from its first bytes, or None
+    for uncompressed content.
+    """
+    with open(filename, 'rb') as f:
+        return _detect_header_compression(f.read(4))
+
+
+def open_file(filename: Union[Path, str], mode: Optional[str] = 'rt') -> IO:
+    """
+    Opens a file, transparently (de)compressing its content as a stream.
+    Files are read according to their content, and written according to the
+    suffix of their name: `.gz` for gzip, `.zst` for zstd.
+    Text mode is the default, with UTF-8 encoding.
+    """
+    if 'r' in mode:
+        compression = detect_compression(filename)
+    else:
+        compression = _SUFFIX_COMPRESSIONS.get(Path(filename).suffix)
+    encoding = None if 'b' in mode else 'utf-8'
+    if 'b' not in mode and 't' not in mode:
+        mode = f'{mode}t'
+    if compression == 'gzip':
+        return gzip.open(filename, mode, encoding=encoding)
+    if compression == 'zstd':
+        return _open_zstd_file(filename, mode, encoding)
+    return open(filename, mode, encoding=encoding)
+
+
+@contextmanager
+def open_content(content: Union[Path, str, bytes, IO],
+                 mode: Optional[str] = 'rt') -> Iterator[IO]:
+    """
+    Opens some content given either as a file path, as bytes or as a file
+    object, transparently decompressing it.
+    File objects are read from their current position, and are left open.
+    """
+    if isinstance(content, (Path, str)):
+        with open_file(content, mode) as f:
+            yield f
+        return
+    buffered = None
+    if isinstance(content, (bytes, bytearray, memoryview)):
+        compression = _detect_header_compression(bytes(content[:4]))
+        stream = BytesIO(content)
+    else:
+        if isinstance(content.read(0), str):
+            if 'b' in mode:
+                raise TypeError('Binary content expected, got a text stream.')
+            yield content
+            return
+        stream = content
+        if not hasattr(content, 'peek') and not content.seekable():
+            # The first bytes of a raw stream that cannot be rewound are
+            # peeked at through a buffer, which then holds them
+            if hasattr(content, 'readinto'):
+                stream = buffered = BufferedReader(content)
+        compression = _detect_stream_compression(stream)
+    if compression == 'gzip':
+        stream = gzip.GzipFile(fileobj=stream, mode='rb')
+    elif compression == 'zstd':
+        stream = _open_zstd_file(stream, 'rb', None)
+    if 'b' not in mode:
+        stream = TextIOWrapper(stream, encoding='utf-8')
+    try:
+        yield stream
+    finally:
+        # Closing a text wrapper would also close the file object it wraps,
+        # while decompressing streams leave theirs open
+        if isinstance(stream, TextIOWrapper):
+            stream = stream.detach()
+        if stream is not content and stream is not buffered:
+            stream.close()
+        if buffered is not None:
+            buffered.detach()
+
+
+def load_json_content(content: Union[Path, str, bytes, dict, list, IO]):
+    """
+    Returns the JSON content given as a file path, as bytes or as a file
+    object - content already loaded as a dict or a list is returned as is.
+    """
+    if isinstance(content, (dict, list)):
+        return content
+    with open_content(content) as f:
+        return json.loads(f.read())
+
+
+def _detect_header_compression(header: bytes) -> Union[str, None]:
+    for magic_number, compression in _MAGIC_NUMBERS.items():
+        if header.startswith(magic_number):
+            return compression
+
+
+def _detect_stream_compression(stream: IO) -> Union[str, None]:
+    if hasattr(stream, 'peek'):
+        return _detect_header_compression(stream.peek(4)[:4])
+    if stream.seekable():
+        position = stream.tell()
+        header = stream.read(4)
+        stream.seek(position)
+        return _detect_header_compression(header)
+    return None
+
+
+def _open_zstd_file(filename: Union[Path, str, IO], mode: str,
+                    encoding: Union[str, None]) -> IO:
+    try:
+        from compression import zstd
+    except ImportError:
+        try:
+            import zstandard as zstd
+        except ImportError:
+            raise ImportError(
+                'Missing python library: zstandard - install it to handle '
+                'zstd compressed files.'
+            ) from None
+    return zstd.open(filename, mode, encoding=encoding)
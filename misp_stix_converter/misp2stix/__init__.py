@@ -1,7 +1,29 @@
-from .framing import stix1_attributes_framing, stix1_framing, stix20_framing, stix21_framing # noqa
-from .misp_to_stix1 import MISPtoSTIX1AttributesParser, MISPtoSTIX1EventsParser # noqa
-from .misp_to_stix20 import MISPtoSTIX20Parser # noqa
-from .misp_to_stix21 import MISPtoSTIX21Parser # noqa
-from .stix1_mapping import MISPtoSTIX1Mapping # noqa
-from .stix20_mapping import MISPtoSTIX20Mapping # noqa
-from .stix21_mapping import MISPtoSTIX21Mapping # noqa
+from importlib import import_module
+
+# The parsers and their dependencies (python-stix & cybox for STIX 1, stix2
+# for STIX 2.x) are only imported when they are first accessed
+_lazy_imports = {
+    'stix1_attributes_framing': '.framing',
+    'stix1_framing': '.framing',
+    'stix20_framing': '.framing',
+    'stix21_framing': '.framing',
+    'MISPtoSTIX1AttributesParser': '.misp_to_stix1',
+    'MISPtoSTIX1EventsParser': '.misp_to_stix1',
+    'MISPtoSTIX20Parser': '.misp_to_stix20',
+    'MISPtoSTIX21Parser': '.misp_to_stix21',
+    'MISPtoSTIX1Mapping': '.stix1_mapping',
+    'MISPtoSTIX20Mapping': '.stix20_mapping',
+    'MISPtoSTIX21Mapping': '.stix21_mapping'
+}
+
+
+def __getattr__(name: str):
+    if name not in _lazy_imports:
+        raise AttributeError(f'module {__name__!r} has no attribute {name!r}')
+    value = getattr(import_module(_lazy_imports[name], __name__), name)
+    globals()[name] = value
+    return value
+
+
+def __dir__() -> list:
+    return sorted(set(globals()) | set(_lazy_imports))
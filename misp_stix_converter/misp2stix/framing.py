@@ -10,6 +10,7 @@ from stix.core import STIXHeader, STIXPackage
 from typing import Optional, Union
 from uuid import uuid4, UUID
 from .stix1_mapping import NS_DICT, SCHEMALOC_DICT
+from .stix1_writer import stix1_xml_framing
 
 json_footer = ']}\n'
 _UUID_typing = Union[UUID, str]
@@ -113,13 +114,4 @@ def _stix_xml_attributes_framing(stix_package: STIXPackage, namespaces: dict) ->
 
 
 def _stix_xml_framing(stix_package: STIXPackage, namespaces: dict) -> tuple:
-    s_stix = "</stix:STIX_Package>\n"
-    s_related = "stix:Related_Package"
-    header = stix_package.to_xml(auto_namespace=False, ns_dict=namespaces, schemaloc_dict=SCHEMALOC_DICT)
-    header = header.decode()
-    if header.endswith('/>\n'):
-        header = f'{header[:-3]}>\n'
-    header = f"{header.replace(s_stix, '')}    <{s_related}s>\n        <{s_related}>\n"
-    footer = f"        </{s_related}>\n    </{s_related}s>\n{s_stix}"
-    separator = f"        </{s_related}>\n        <{s_related}>\n"
-    return header, separator, footer
+    return stix1_xml_framing(stix_package, namespaces)
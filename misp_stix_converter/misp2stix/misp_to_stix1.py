@@ -1,12 +1,13 @@
 #!/usr/bin/env python3
 # -*- coding: utf-8 -*-
 
-import json
 import re
 import socket
+from ..file_compression import load_json_content
 from .exportparser import MISPtoSTIXParser
 from .framing import _create_stix_package as _stix_package
 from .stix1_mapping import MISPtoSTIX1Mapping
+from .stix1_writer import STIX1XMLWriter
 from abc import ABCMeta
 from base64 import b64encode
 from collections import defaultdict
@@ -1103,10 +1104,9 @@ class MISPtoSTIX1AttributesParser(MISPtoSTIX1Parser):
         self._ids = set()
 
     def parse_json_content(self, filename):
-        with open(filename, 'rt', encoding='utf-8') as f:
-            attributes = json.loads(f.read())
-            if attributes.get('response') is not None:
-                attributes = attributes['response']
+        attributes = load_json_content(filename)
+        if attributes.get('response') is not None:
+            attributes = attributes['response']
         self._stix_package = STIXPackage()
         if 'Attribute' in attributes:
             attributes = attributes['Attribute']
@@ -1153,8 +1153,7 @@ class MISPtoSTIX1EventsParser(MISPtoSTIX1Parser):
         super().__init__(orgname, version)
 
     def parse_json_content(self, filename):
-        with open(filename, 'rt', encoding='utf-8') as f:
-            json_content = json.loads(f.read())
+        json_content = load_json_content(filename)
         if json_content.get('response'):
             package = _stix_package(self._orgname, self._version, header=False)
             for event in json_content['response']:
@@ -1164,6 +1163,17 @@ class MISPtoSTIX1EventsParser(MISPtoSTIX1Parser):
         else:
             self.parse_misp_event(json_content)
 
+    def write_json_content(self, filename, writer: STIX1XMLWriter):
+        """
+        Parse the MISP content like `parse_json_content` does, but write the
+        STIX package of each MISP event with the XML writer as soon as it is
+        converted, instead of keeping them all as related packages.
+        """
+        json_content = load_json_content(filename)
+        for event in json_content.get('response') or [json_content]:
+            self.parse_misp_event(event)
+            writer.write_package(self._stix_package)
+
     def parse_misp_event(self, misp_event: dict):
         self._header_comment = []
         self._objects_to_parse = defaultdict(dict)
@@ -5,11 +5,17 @@ import io
 import json
 import os
 import re
+from .. import Mapping
+from ..file_compression import load_json_content
 from .exportparser import MISPtoSTIXParser
+from .stix2_cache import STIX2ResultCache
+from .stix2_writer import STIX2BundleWriter
+from .trusted_stix2 import TrustedSTIX2Factory
 from abc import ABCMeta
 from base64 import b64encode
 from collections import defaultdict
 from datetime import datetime
+from functools import lru_cache
 from pathlib import Path
 from pymisp import (
     MISPAttribute, MISPEvent, MISPEventReport, MISPGalaxy, MISPGalaxyCluster,
@@ -32,9 +38,12 @@ from stix2.v21.sdo import (
     IntrusionSet as IntrusionSet_v21, Location, Malware as Malware_v21, Note,
     ObservedData as ObservedData_v21, Tool as Tool_v21,
     Vulnerability as Vulnerability_v21)
-from typing import Generator, Optional, Tuple, Union
+from typing import IO, Optional, Tuple, Union
 
-_event_report_regex = r'@[!]?\[%s\]\([0-9a-f]{8}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{12}\)'
+_event_report_pattern = re.compile(
+    r'@!?\[(?:attribute|object)\]'
+    r'\(([0-9a-f]{8}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{12})\)'
+)
 _label_fields = ('type', 'category', 'to_ids')
 _labelled_object_types = ('malware', 'threat-actor', 'tool')
 _misp_time_fields = ('first_seen', 'last_seen')
@@ -45,6 +54,52 @@ _stix_time_fields = {
     'indicator': ('valid_from', 'valid_until'),
     'observed-data': ('first_observed', 'last_observed')
 }
+_UUID_LENGTH = 36
+
+
+class _ObjectRefs:
+    """
+    Insertion-ordered set of the STIX object references of a Report/Grouping.
+    References are stored as the keys of a dict so the membership checks are
+    done in constant time while keeping the order in which they were added.
+    References are also indexed by the UUID part of their id, to find the
+    first one converted from a given MISP data structure.
+    """
+    def __init__(self):
+        self.__refs = {}
+        self.__uuids = {}
+
+    def __bool__(self) -> bool:
+        return bool(self.__refs)
+
+    def __contains__(self, object_ref: str) -> bool:
+        return object_ref in self.__refs
+
+    def __iter__(self):
+        return iter(self.__refs)
+
+    def __len__(self) -> int:
+        return len(self.__refs)
+
+    def append(self, object_ref: str):
+        if object_ref not in self.__refs:
+            self.__refs[object_ref] = None
+            self.__uuids.setdefault(object_ref.split('--')[-1], object_ref)
+
+    def extend(self, object_refs: list):
+        for object_ref in object_refs:
+            self.append(object_ref)
+
+    def find(self, reference: str) -> Union[str, None]:
+        """
+        Returns the first reference containing the given MISP UUID.
+        """
+        if len(reference) == _UUID_LENGTH:
+            return self.__uuids.get(reference)
+        for object_ref in self.__refs:
+            if reference in object_ref:
+                return object_ref
+
 
 _MISP_DATA_LAYER = Union[
     dict, MISPAttribute, MISPEventReport, MISPObject
@@ -59,27 +114,113 @@ _STIX_OBJECT_TYPING = Union[
 ]
 
 
+class _GalaxiesCatalog:
+    """
+    Index of the MITRE CTI objects used to match MISP Galaxy Clusters in
+    interoperability mode.
+    Objects are indexed by name and by external id, then by object type, and
+    the ones for which the name exactly matches the key are kept aside, so
+    the matching does not need to scan any list.
+    The catalog is shared by the parsers, so its indexes are read-only once
+    built.
+    """
+    def __init__(self, cti_path: Path, source_names: tuple):
+        self.__catalog = defaultdict(lambda: defaultdict(dict))
+        self.__identities = {}
+        self.__named = defaultdict(list)
+        for filename in sorted(cti_path.glob('*/*.json')):
+            with open(filename, 'rt', encoding='utf-8') as f:
+                bundle = json.loads(f.read())
+            for stix_object in bundle['objects']:
+                self.__index_object(stix_object, source_names)
+        self.__catalog = Mapping(
+            (
+                key, Mapping(
+                    (object_type, Mapping(stix_objects))
+                    for object_type, stix_objects in objects.items()
+                )
+            ) for key, objects in self.__catalog.items()
+        )
+        self.__identities = Mapping(self.__identities)
+        self.__named = Mapping(
+            (key, tuple(stix_objects))
+            for key, stix_objects in self.__named.items()
+        )
+
+    def __contains__(self, key: str) -> bool:
+        return key in self.__catalog
+
+    def __getitem__(self, key: str) -> dict:
+        return self.__catalog[key]
+
+    @property
+    def identities(self) -> dict:
+        return self.__identities
+
+    def get(self, key: str, default: Optional[dict] = None) -> dict:
+        return self.__catalog.get(key, default)
+
+    def named(self, name: str, object_type: str) -> tuple:
+        return self.__named.get((name, object_type), ())
+
+    def __index_object(self, stix_object: dict, source_names: tuple):
+        object_id = stix_object['id']
+        if stix_object['type'] == 'identity':
+            self.__identities[object_id] = stix_object
+            return
+        if not stix_object.get('name'):
+            return
+        name = stix_object['name']
+        object_type = stix_object['type']
+        objects = self.__catalog[name][object_type]
+        if object_id not in objects:
+            objects[object_id] = stix_object
+            self.__named[(name, object_type)].append(stix_object)
+        for reference in stix_object.get('external_references', []):
+            if reference['source_name'] in source_names:
+                objects = self.__catalog[reference['external_id']][object_type]
+                if object_id not in objects:
+                    objects[object_id] = stix_object
+                break
+
+
+@lru_cache(maxsize=None)
+def _load_galaxies_catalog(source_names: tuple) -> _GalaxiesCatalog:
+    cti_path = Path(os.path.dirname(os.path.realpath(__file__))).parent
+    return _GalaxiesCatalog(cti_path / 'data' / 'cti', source_names)
+
+
 class InvalidHashValueError(Exception):
     pass
 
 
 class MISPtoSTIX2Parser(MISPtoSTIXParser, metaclass=ABCMeta):
-    def __init__(self, interoperability: bool):
+    def __init__(self, interoperability: bool, trusted: Optional[bool] = False,
+                 validation_rate: Optional[float] = 0.0,
+                 cache: Optional[STIX2ResultCache] = None):
         super().__init__()
+        self.__cache = cache
         self.__ids: dict = {}
         self.__index = 0
         self.__initiated = False
         self.__interoperability = interoperability
-        self._id_parsing_function = {
-            'attribute': '_define_stix_object_id',
-            'object': '_define_stix_object_id'
-        }
+        self.__trusted_factory = (
+            TrustedSTIX2Factory(validation_rate) if trusted else None
+        )
+        self.__writer = None
+        self.__writing = False
+        self.__attribute_parsers: dict = {}
+        self.__object_parsers: dict = {}
+        self._set_id_parsing_functions(False)
         self._markings = {}
 
-    def parse_json_content(self, filename: Union[Path, str]):
-        self._results_handling_function = '_append_SDO'
-        with open(filename, 'rt', encoding='utf-8') as f:
-            json_content = json.loads(f.read())
+    def parse_json_content(self, filename: Union[Path, str, bytes, dict, IO]):
+        """
+        Parse MISP content given as a file path, or already in memory as
+        bytes, a file object or a dict.
+        """
+        self._results_handling_function = self._append_SDO
+        json_content = load_json_content(filename)
         if json_content.get('response'):
             json_content = json_content['response']
             if isinstance(json_content, list):
@@ -101,8 +242,35 @@ class MISPtoSTIX2Parser(MISPtoSTIXParser, metaclass=ABCMeta):
                 else:
                     self.parse_misp_event(json_content)
 
+    def write_json_content(self, filename: Union[Path, str, bytes, dict, IO],
+                           writer: STIX2BundleWriter):
+        """
+        Parse the MISP content like `parse_json_content` does, but write the
+        STIX objects with the bundle writer as soon as each MISP event is
+        converted, instead of keeping them all until the bundle is created.
+        The list of unique IDs remains the same for the next content written
+        with the same writer, and is re-initialised with a new writer.
+        If the content cannot be converted, the objects of the MISP event that
+        failed are discarded, and so are their IDs in the list of unique IDs.
+        """
+        if writer is not self.__writer:
+            self.__ids = {}
+            self._markings = {}
+            self.__writer = writer
+        self.__writing = True
+        self.__save_written_state()
+        try:
+            self.parse_json_content(filename)
+            self._write_stix_objects()
+        except Exception:
+            self.__restore_written_state()
+            raise
+        finally:
+            self.__writing = False
+            self.__initiated = False
+
     def parse_misp_attribute(self, attribute: Union[MISPAttribute, dict]):
-        self._results_handling_function = '_append_SDO_without_refs'
+        self._results_handling_function = self._append_SDO_without_refs
         self._identifier = 'attribute feed'
         if not self.__initiated:
             self._initiate_feed_parsing()
@@ -112,7 +280,7 @@ class MISPtoSTIX2Parser(MISPtoSTIXParser, metaclass=ABCMeta):
         self._resolve_attribute(attribute)
 
     def parse_misp_attributes(self, attributes: Union[MISPAttribute, dict]):
-        self._results_handling_function = '_append_SDO_without_refs'
+        self._results_handling_function = self._append_SDO_without_refs
         self._identifier = 'attributes collection'
         if not self.__initiated:
             self._initiate_attributes_parsing()
@@ -131,7 +299,7 @@ class MISPtoSTIX2Parser(MISPtoSTIXParser, metaclass=ABCMeta):
             self._handle_relationships()
 
     def parse_misp_event(self, misp_event: Union[MISPEvent, dict]):
-        self._results_handling_function = '_append_SDO'
+        self._results_handling_function = self._append_SDO
         if not self.__initiated:
             self._initiate_events_parsing()
         self._parse_misp_event(misp_event)
@@ -139,32 +307,85 @@ class MISPtoSTIX2Parser(MISPtoSTIXParser, metaclass=ABCMeta):
     def _parse_misp_event(self, misp_event: Union[MISPEvent, dict]):
         if 'Event' in misp_event:
             misp_event = misp_event['Event']
+        if self.__cache is None:
+            self._convert_misp_event(misp_event)
+        else:
+            self._convert_misp_event_with_cache(misp_event)
+        if self.__writing:
+            self._write_stix_objects()
+
+    def _convert_misp_event(self, misp_event: Union[MISPEvent, dict]):
         self._misp_event = misp_event
         self._identifier = self._misp_event['uuid']
         self.__event_timestamp = self._handle_event_timestamp()
-        self.__object_refs = []
+        self.__object_refs = _ObjectRefs()
         self.__relationships = []
         self._handle_identity_from_event()
         if self._misp_event.get('EventReport'):
-            self._id_parsing_function = {
-                'attribute': '_define_stix_object_id_from_attribute',
-                'object': '_define_stix_object_id_from_object'
-            }
-            self._event_report_matching = defaultdict(list)
+            self._scan_event_reports()
             self._handle_attributes_and_objects()
             for event_report in self._misp_event['EventReport']:
                 note = self._parse_event_report(event_report)
                 self._append_SDO(note)
                 self._handle_analyst_data(note, event_report)
         else:
-            self._id_parsing_function = {
-                'attribute': '_define_stix_object_id',
-                'object': '_define_stix_object_id'
-            }
+            self._set_id_parsing_functions(False)
             self._handle_attributes_and_objects()
         report = self._generate_report_from_event()
         self.__objects.insert(self.__index, report)
 
+    def _convert_misp_event_with_cache(
+            self, misp_event: Union[MISPEvent, dict]):
+        key = self.__cache.key(
+            misp_event, self._version, interoperability=self.interoperability
+        )
+        result = self.__cache.get(key)
+        if result is None:
+            result = self.__convert_standalone_misp_event(misp_event)
+            identifier = misp_event['uuid']
+            # Errors & warnings are reported again with every conversion
+            if identifier not in self.errors and identifier not in self.warnings:
+                self.__cache.set(key, result)
+        else:
+            self._misp_event = misp_event
+            self._identifier = misp_event['uuid']
+        # Identities, marking definitions and galaxy related objects are
+        # shared between events and must appear only once in the bundle
+        shared_ids = set(result['shared_ids'])
+        known_ids = set(self.__ids.values())
+        for stix_object in result['objects']:
+            if stix_object['id'] in shared_ids:
+                if stix_object['id'] in known_ids:
+                    continue
+                known_ids.add(stix_object['id'])
+            self.__objects.append(stix_object)
+        for object_id, stix_object_id in result['unique_ids'].items():
+            self.__ids.setdefault(object_id, stix_object_id)
+
+    def __convert_standalone_misp_event(
+            self, misp_event: Union[MISPEvent, dict]) -> dict:
+        # The event is converted as if it were alone, so the cached result
+        # holds every object it needs, whatever the events converted before
+        objects, index = self.__objects, self.__index
+        unique_ids, markings = self.__ids, self._markings
+        self.__objects, self.__index = [], 0
+        self.__ids, self._markings = {}, {}
+        try:
+            self._convert_misp_event(misp_event)
+            shared_ids = set(self.__ids.values())
+            return {
+                'objects': self.__objects,
+                'shared_ids': [
+                    stix_object['id'] for stix_object in self.__objects
+                    if stix_object['id'] in shared_ids or
+                    stix_object['type'] == 'marking-definition'
+                ],
+                'unique_ids': self.__ids
+            }
+        finally:
+            self.__objects, self.__index = objects, index
+            self.__ids, self._markings = unique_ids, markings
+
     def _define_stix_object_id(
             self, feature: str, misp_object: Union[MISPObject, dict]) -> str:
         return f"{feature}--{misp_object['uuid']}"
@@ -173,18 +394,78 @@ class MISPtoSTIX2Parser(MISPtoSTIXParser, metaclass=ABCMeta):
             self, feature: str, attribute: Union[MISPAttribute, dict]) -> str:
         attribute_uuid = attribute['uuid']
         stix_id = f'{feature}--{attribute_uuid}'
-        self._event_report_matching[attribute_uuid].append(stix_id)
+        if attribute_uuid in self._event_report_matching:
+            self._event_report_matching[attribute_uuid].append(stix_id)
         return stix_id
 
     def _define_stix_object_id_from_object(
             self, feature: str, misp_object: Union[MISPObject, dict]) -> str:
         object_uuid = misp_object['uuid']
         stix_id = f'{feature}--{object_uuid}'
-        self._event_report_matching[object_uuid].append(stix_id)
+        matching = self._event_report_matching
+        if object_uuid in matching:
+            matching[object_uuid].append(stix_id)
         for attribute in misp_object['Attribute']:
-            self._event_report_matching[attribute['uuid']].append(stix_id)
+            if attribute['uuid'] in matching:
+                matching[attribute['uuid']].append(stix_id)
         return stix_id
 
+    def _scan_event_reports(self):
+        # Event reports are scanned once, before the attributes and objects
+        # are converted, so only the STIX ids of the referenced attributes
+        # and objects are recorded
+        self._event_report_references = {
+            event_report['uuid']: set(
+                _event_report_pattern.findall(event_report['content'])
+            ) for event_report in self._misp_event['EventReport']
+        }
+        self._event_report_matching = {
+            reference: [] for references in
+            self._event_report_references.values()
+            for reference in references
+        }
+        self._set_id_parsing_functions(bool(self._event_report_matching))
+
+    def __get_parser(self, to_call: Union[str, None]):
+        # Parsing methods are resolved once per attribute type or object name
+        return None if to_call is None else getattr(self, to_call)
+
+    def _set_id_parsing_functions(self, event_report_references: bool):
+        if event_report_references:
+            self._id_parsing_function = {
+                'attribute': self._define_stix_object_id_from_attribute,
+                'object': self._define_stix_object_id_from_object
+            }
+        else:
+            self._id_parsing_function = {
+                'attribute': self._define_stix_object_id,
+                'object': self._define_stix_object_id
+            }
+
+    def _write_stix_objects(self):
+        if self.__writer.bundle_id is None and hasattr(self, '_misp_event'):
+            self.__writer.bundle_id = f"bundle--{self._misp_event['uuid']}"
+        self.__writer.write_objects(self.__objects)
+        self.__objects = []
+        self.__index = 0
+        self.__save_written_state()
+
+    def __restore_written_state(self):
+        # Identities, markings & galaxy related objects are only known as
+        # already in the bundle once they are actually written - the unique
+        # IDs are only ever added, so the latest ones are simply removed
+        while len(self.__ids) > self.__written_ids:
+            self.__ids.popitem()
+        self._markings = self.__written_markings
+        self.__objects = []
+        self.__index = 0
+
+    def __save_written_state(self):
+        self.__written_ids = len(self.__ids)
+        self.__written_markings = {
+            marking: dict(value) for marking, value in self._markings.items()
+        }
+
     def _handle_attributes_and_objects(self):
         if self._misp_event.get('Attribute'):
             for attribute in self._misp_event['Attribute']:
@@ -257,7 +538,7 @@ class MISPtoSTIX2Parser(MISPtoSTIXParser, metaclass=ABCMeta):
 
     def _initiate_attributes_parsing(self):
         self.__objects = []
-        self.__object_refs = []
+        self.__object_refs = _ObjectRefs()
         self.__relationships = []
         self._handle_default_identity()
         self.__initiated = True
@@ -285,6 +566,10 @@ class MISPtoSTIX2Parser(MISPtoSTIXParser, metaclass=ABCMeta):
         self.__index = 0
         return self._create_bundle()
 
+    @property
+    def cache(self) -> Union[STIX2ResultCache, None]:
+        return self.__cache
+
     @property
     def event_timestamp(self) -> datetime:
         try:
@@ -314,9 +599,13 @@ class MISPtoSTIX2Parser(MISPtoSTIXParser, metaclass=ABCMeta):
         return self.__interoperability
 
     @property
-    def object_refs(self) -> list:
+    def object_refs(self) -> _ObjectRefs:
         return self.__object_refs
 
+    @property
+    def trusted(self) -> bool:
+        return self.__trusted_factory is not None
+
     def populate_unique_ids(self, unique_ids: dict):
         self.__ids.update(unique_ids)
 
@@ -378,57 +667,16 @@ class MISPtoSTIX2Parser(MISPtoSTIXParser, metaclass=ABCMeta):
                 }
             )
             self._handle_analyst_data(report_args)
-            report_args['object_refs'] = self.object_refs
+            report_args['object_refs'] = list(self.object_refs)
             report = self._create_report(report_args)
             return report
         return self._handle_unpublished_report(report_args)
 
     def _generate_galaxies_catalog(self):
-        current_path = Path(os.path.dirname(os.path.realpath(__file__)))
-        cti_path = current_path.parent / 'data' / 'cti'
-        self._galaxies_catalog = defaultdict(lambda: defaultdict(list))
-        self._identities = {}
-        for filename in cti_path.glob('*/*.json'):
-            with open(filename, 'rt', encoding='utf-8') as f:
-                bundle = json.loads(f.read())
-            for stix_object in bundle['objects']:
-                if stix_object['type'] == 'identity':
-                    object_id = stix_object['id']
-                    not_unique = (
-                        object_id not in self.unique_ids or
-                        object_id not in self._identities
-                    )
-                    if not_unique:
-                        self._identities[object_id] = stix_object
-                    continue
-                if not stix_object.get('name'):
-                    continue
-                name = stix_object['name']
-                object_type = stix_object['type']
-                object_id = stix_object['id']
-                if object_id not in self._get_object_ids(name, object_type):
-                    self._galaxies_catalog[name][object_type].append(
-                        stix_object
-                    )
-                if not stix_object.get('external_references'):
-                    continue
-                mapping = self._mapping.source_names()
-                for reference in stix_object['external_references']:
-                    if reference['source_name'] in mapping:
-                        ext_id = reference['external_id']
-                        object_ids = self._get_object_ids(ext_id, object_type)
-                        if object_id not in object_ids:
-                            self._galaxies_catalog[ext_id][object_type].append(
-                                stix_object
-                            )
-                        break
-
-    def _get_object_ids(
-            self, name: str, object_type: str) -> Generator[None, None, str]:
-        return (
-            stix_object['id'] for stix_object
-            in self._galaxies_catalog[name][object_type]
+        self._galaxies_catalog = _load_galaxies_catalog(
+            self._mapping.source_names()
         )
+        self._identities = self._galaxies_catalog.identities
 
     def _handle_analyst_data(self, stix_object: _STIX_OBJECT_TYPING,
                              data_layer: _MISP_DATA_LAYER = None):
@@ -482,7 +730,7 @@ class MISPtoSTIX2Parser(MISPtoSTIXParser, metaclass=ABCMeta):
                     ]
                 if sighting.get('source', ''):
                     sighting_args['description'] = sighting['source']
-                getattr(self, self._results_handling_function)(
+                self._results_handling_function(
                     self._create_sighting(sighting_args)
                 )
             elif sighting_type == '1':
@@ -496,13 +744,9 @@ class MISPtoSTIX2Parser(MISPtoSTIXParser, metaclass=ABCMeta):
 
     def _parse_event_report_references(
             self, event_report: Union[MISPEventReport, dict]):
-        references = {
-            reference.split('(')[1][:-1]
-            for feature in ('attribute', 'object')
-            for reference in re.findall(
-                _event_report_regex % feature, event_report['content']
-            )
-        }
+        references = self._event_report_references.get(event_report['uuid'])
+        if references is None:
+            references = _event_report_pattern.findall(event_report['content'])
         for reference in references:
             if reference in self._event_report_matching:
                 yield from self._event_report_matching[reference]
@@ -514,9 +758,16 @@ class MISPtoSTIX2Parser(MISPtoSTIXParser, metaclass=ABCMeta):
     def _resolve_attribute(self, attribute: Union[MISPAttribute, dict]):
         attribute_type = attribute['type']
         try:
-            to_call = self._mapping.attribute_types_mapping(attribute_type)
-            if to_call is not None:
-                getattr(self, to_call)(attribute)
+            try:
+                parser = self.__attribute_parsers[attribute_type]
+            except KeyError:
+                parser = self.__attribute_parsers[attribute_type] = (
+                    self.__get_parser(
+                        self._mapping.attribute_types_mapping(attribute_type)
+                    )
+                )
+            if parser is not None:
+                parser(attribute)
             else:
                 self._parse_custom_attribute(attribute)
                 self._attribute_not_mapped_warning(attribute_type)
@@ -552,7 +803,7 @@ class MISPtoSTIX2Parser(MISPtoSTIXParser, metaclass=ABCMeta):
         if markings:
             self._handle_markings(indicator_arguments, markings)
         indicator = self._create_indicator(indicator_arguments)
-        getattr(self, self._results_handling_function)(indicator)
+        self._results_handling_function(indicator)
         self._handle_analyst_data(indicator, attribute)
         if attribute.get('Sighting'):
             self._handle_sightings(attribute['Sighting'], indicator_id)
@@ -656,7 +907,7 @@ class MISPtoSTIX2Parser(MISPtoSTIXParser, metaclass=ABCMeta):
         if markings:
             self._handle_markings(campaign_args, markings)
         campaign = self._create_campaign(campaign_args)
-        getattr(self, self._results_handling_function)(campaign)
+        self._results_handling_function(campaign)
         self._handle_analyst_data(campaign, attribute)
         if attribute.get('Sighting'):
             self._handle_sightings(attribute['Sighting'], campaign_id)
@@ -683,7 +934,7 @@ class MISPtoSTIX2Parser(MISPtoSTIXParser, metaclass=ABCMeta):
         if markings:
             self._handle_markings(custom_args, markings)
         custom_attribute = self._create_custom_attribute(custom_args)
-        getattr(self, self._results_handling_function)(custom_attribute)
+        self._results_handling_function(custom_attribute)
         self._handle_analyst_data(custom_attribute, attribute)
         if attribute.get('Sighting'):
             self._handle_sightings(attribute['Sighting'], custom_id)
@@ -1078,7 +1329,7 @@ class MISPtoSTIX2Parser(MISPtoSTIXParser, metaclass=ABCMeta):
         if markings:
             self._handle_markings(vulnerability_args, markings)
         vulnerability = self._create_vulnerability(vulnerability_args)
-        getattr(self, self._results_handling_function)(vulnerability)
+        self._results_handling_function(vulnerability)
         self._handle_analyst_data(vulnerability, attribute)
         if attribute.get('Sighting'):
             self._handle_sightings(attribute['Sighting'], vulnerability_id)
@@ -1107,9 +1358,16 @@ class MISPtoSTIX2Parser(MISPtoSTIXParser, metaclass=ABCMeta):
         for misp_object in self._misp_event['Object']:
             try:
                 object_name = misp_object['name']
-                to_call = self._mapping.objects_mapping(object_name)
-                if to_call is not None:
-                    getattr(self, to_call)(misp_object)
+                try:
+                    parser = self.__object_parsers[object_name]
+                except KeyError:
+                    parser = self.__object_parsers[object_name] = (
+                        self.__get_parser(
+                            self._mapping.objects_mapping(object_name)
+                        )
+                    )
+                if parser is not None:
+                    parser(misp_object)
                 else:
                     self._parse_custom_object(misp_object)
                     self._object_not_mapped_warning(object_name)
@@ -1190,7 +1448,7 @@ class MISPtoSTIX2Parser(MISPtoSTIXParser, metaclass=ABCMeta):
             )
         feature = f"_create_{object_type.replace('-', '_')}"
         stix_object = getattr(self, feature)(object_args)
-        getattr(self, self._results_handling_function)(stix_object)
+        self._results_handling_function(stix_object)
         self._handle_object_analyst_data(stix_object, misp_object)
 
     def _handle_object_indicator(
@@ -1221,7 +1479,7 @@ class MISPtoSTIX2Parser(MISPtoSTIXParser, metaclass=ABCMeta):
                 indicator_args['modified']
             )
         indicator = self._create_indicator(indicator_args)
-        getattr(self, self._results_handling_function)(indicator)
+        self._results_handling_function(indicator)
         self._handle_object_analyst_data(indicator, misp_object)
 
     def _handle_object_observable(
@@ -1570,7 +1828,7 @@ class MISPtoSTIX2Parser(MISPtoSTIXParser, metaclass=ABCMeta):
                 misp_object['ObjectReference'], custom_id, timestamp
             )
         custom_object = self._create_custom_object(custom_args)
-        getattr(self, self._results_handling_function)(custom_object)
+        self._results_handling_function(custom_object)
         self._handle_object_analyst_data(custom_object, misp_object)
 
     @staticmethod
@@ -1717,7 +1975,7 @@ class MISPtoSTIX2Parser(MISPtoSTIXParser, metaclass=ABCMeta):
                     identity_args['modified']
                 )
         identity = self._create_identity(identity_args)
-        getattr(self, self._results_handling_function)(identity)
+        self._results_handling_function(identity)
         self._handle_object_analyst_data(identity, misp_object)
 
     def _parse_file_object(self, misp_object: Union[MISPObject, dict]):
@@ -1986,7 +2244,7 @@ class MISPtoSTIX2Parser(MISPtoSTIXParser, metaclass=ABCMeta):
                     identity_args['modified']
                 )
         identity = self._create_identity(identity_args)
-        getattr(self, self._results_handling_function)(identity)
+        self._results_handling_function(identity)
         self._handle_object_analyst_data(identity, misp_object)
 
     def _parse_lnk_object(self, misp_object: Union[MISPObject, dict]):
@@ -2265,7 +2523,7 @@ class MISPtoSTIX2Parser(MISPtoSTIXParser, metaclass=ABCMeta):
                     identity_args['modified']
                 )
         identity = self._create_identity(identity_args)
-        getattr(self, self._results_handling_function)(identity)
+        self._results_handling_function(identity)
         self._handle_object_analyst_data(identity, misp_object)
 
     def _parse_person_object(self, misp_object: Union[MISPObject, dict]):
@@ -2303,7 +2561,7 @@ class MISPtoSTIX2Parser(MISPtoSTIXParser, metaclass=ABCMeta):
                 identity_args['modified']
             )
         identity = self._create_identity(identity_args)
-        getattr(self, self._results_handling_function)(identity)
+        self._results_handling_function(identity)
         self._handle_object_analyst_data(identity, misp_object)
 
     def _parse_organization_object(self, misp_object: Union[MISPObject, dict]):
@@ -2331,7 +2589,7 @@ class MISPtoSTIX2Parser(MISPtoSTIXParser, metaclass=ABCMeta):
                 identity_args['modified']
             )
         identity = self._create_identity(identity_args)
-        getattr(self, self._results_handling_function)(identity)
+        self._results_handling_function(identity)
         self._handle_object_analyst_data(identity, misp_object)
 
     def _parse_pe_extensions_observable(
@@ -2859,21 +3117,13 @@ class MISPtoSTIX2Parser(MISPtoSTIXParser, metaclass=ABCMeta):
                     )
 
     def _check_galaxy_name(self, name: str, object_type: str) -> bool:
-        names = 0
-        for stix_object in self._galaxies_catalog[name][object_type]:
-            if stix_object['name'] == name:
-                names += 1
-        return names == 1
+        return len(self._galaxies_catalog.named(name, object_type)) == 1
 
     def _check_galaxy_references(self, values: str, feature: str, name: str,
                                  object_type: str) -> bool:
         numbers = 0
-        for stix_object in self._galaxies_catalog[name][object_type]:
-            to_continue = (
-                stix_object['name'] != name
-                or not stix_object.get('external_references')
-            )
-            if to_continue:
+        for stix_object in self._galaxies_catalog.named(name, object_type):
+            if not stix_object.get('external_references'):
                 continue
             has_reference = self._check_external_references(
                 stix_object['external_references'], values, feature
@@ -2895,20 +3145,15 @@ class MISPtoSTIX2Parser(MISPtoSTIXParser, metaclass=ABCMeta):
 
     def _fetch_galaxy_matching_by_name(
             self, name: str, object_type: str) -> Union[str, None]:
-        for stix_object in self._galaxies_catalog[name][object_type]:
-            if stix_object['name'] == name:
-                self._handle_galaxy_matching(object_type, stix_object)
-                return stix_object['id']
+        stix_object = self._galaxies_catalog.named(name, object_type)[0]
+        self._handle_galaxy_matching(object_type, stix_object)
+        return stix_object['id']
 
     def _fetch_galaxy_matching_by_reference(
             self, values: list, feature: str, name: str,
             object_type: str) -> Union[str, None]:
-        for stix_object in self._galaxies_catalog[name][object_type]:
-            to_continue = (
-                stix_object['name'] != name
-                or not stix_object.get('external_references')
-            )
-            if to_continue:
+        for stix_object in self._galaxies_catalog.named(name, object_type):
+            if not stix_object.get('external_references'):
                 continue
             has_reference = self._check_external_references(
                 stix_object['external_references'], values, feature
@@ -2953,17 +3198,14 @@ class MISPtoSTIX2Parser(MISPtoSTIXParser, metaclass=ABCMeta):
             self.__objects.insert(0, identity)
             self.__index += 1
             self.__ids[identity_id] = identity_id
-        stix_object['allow_custom'] = True
         self._append_SDO_without_refs(
             getattr(self, f"_create_{object_type.replace('-', '_')}")(
-                stix_object
+                dict(stix_object, allow_custom=True)
             )
         )
 
     def _handle_object_refs(self, object_refs: list):
-        for object_ref in object_refs:
-            if object_ref not in self.__object_refs:
-                self.__object_refs.append(object_ref)
+        self.__object_refs.extend(object_refs)
 
     def _handle_undefined_attribute_galaxy(
             self, galaxy: Union[MISPGalaxy, dict],
@@ -4134,13 +4376,22 @@ class MISPtoSTIX2Parser(MISPtoSTIXParser, metaclass=ABCMeta):
                 indicator_args['modified']
             )
         indicator = self._create_indicator(indicator_args)
-        getattr(self, self._results_handling_function)(indicator)
+        self._results_handling_function(indicator)
         self._handle_object_analyst_data(indicator, misp_object)
 
     ############################################################################
     #                            UTILITY FUNCTIONS.                            #
     ############################################################################
 
+    def _create_stix_object(self, stix_class: type, stix_args: dict):
+        """
+        Create the STIX object with python-stix2, or as a trusted object
+        with the same content when the parser is in trusted mode.
+        """
+        if self.__trusted_factory is None:
+            return stix_class(**stix_args)
+        return self.__trusted_factory.create(stix_class, stix_args)
+
     @staticmethod
     def _check_hash_value(attribute_type, value):
         hash_type = attribute_type.upper()
@@ -4204,9 +4455,7 @@ class MISPtoSTIX2Parser(MISPtoSTIXParser, metaclass=ABCMeta):
         return uuids
 
     def _find_target_uuid(self, reference: str) -> Union[str, None]:
-        for object_ref in self.object_refs:
-            if reference in object_ref:
-                return object_ref
+        return self.object_refs.find(reference)
 
     @staticmethod
     def _get_matching_email_display_name(
@@ -4350,7 +4599,7 @@ class MISPtoSTIX2Parser(MISPtoSTIXParser, metaclass=ABCMeta):
 
     def _parse_stix_object_id(self, feature: str, object_type: str,
                               misp_object: Union[dict, MISPObject]) -> str:
-        return getattr(self, self._id_parsing_function[feature])(
+        return self._id_parsing_function[feature](
             object_type, misp_object
         )
 
@@ -1,16 +1,22 @@
 #!/usr/bin/env python3
 # -*- coding: utf-8 -*-
 
+from ..stix2_custom_objects import (
+    CustomAnalystNote_v20 as CustomAnalystNote,
+    CustomAnalystOpinion_v20 as CustomAnalystOpinion,
+    CustomAttribute_v20 as CustomAttribute,
+    CustomEventReport_v20 as CustomEventReport,
+    CustomGalaxyCluster_v20 as CustomGalaxyCluster,
+    CustomMispObject_v20 as CustomMispObject, CustomNote_v20 as CustomNote,
+    CustomOpinion_v20 as CustomOpinion)
 from .misp_to_stix2 import InvalidHashValueError, MISPtoSTIX2Parser
 from .stix20_mapping import MISPtoSTIX20Mapping
+from .stix2_cache import STIX2ResultCache
 from base64 import b64encode
 from collections import defaultdict
 from datetime import datetime
 from pymisp import (
     MISPAttribute, MISPEventReport, MISPNote, MISPObject, MISPOpinion)
-from stix2.properties import (
-    DictionaryProperty, IDProperty, IntegerProperty, ListProperty,
-    ReferenceProperty, StringProperty, TimestampProperty)
 from stix2.v20.bundle import Bundle
 from stix2.v20.observables import (
     Artifact, AutonomousSystem, Directory, DomainName, EmailAddress,
@@ -26,221 +32,18 @@ from stix2.v20.sro import Relationship, Sighting
 from stix2.v20.vocab import HASHING_ALGORITHM
 from typing import Optional, Union
 
-_ANALYST_DATA_REFERENCE_TYPES = [
-    'attack-pattern', 'campaign', 'course-of-action', 'identity', 'indicator',
-    'intrusion-set', 'malware', 'observed-data', 'report', 'threat-actor',
-    'tool', 'vulnerability', 'x-misp-analyst-note', 'x-misp-analyst-opinion',
-    'x-misp-attribute', 'x-misp-event-note', 'x-misp-event-report',
-    'x-misp-galaxy-cluster', 'x-misp-object'
-]
 _STIX_OBJECT_TYPING = Union[
     AttackPattern, Campaign, CourseOfAction, CustomObject, Identity, Indicator,
     IntrusionSet, Malware, ObservedData, Tool, Vulnerability, dict
 ]
 
 
-@CustomObject(
-    'x-misp-analyst-note',
-    [
-        ('id', IDProperty('x-misp-analyst-note')),
-        ('created', TimestampProperty(precision='millisecond')),
-        ('modified', TimestampProperty(precision='millisecond')),
-        ('x_misp_note', StringProperty(required=True)),
-        ('x_misp_author', StringProperty()),
-        ('x_misp_language', StringProperty()),
-        (
-            'object_ref',
-            ReferenceProperty(
-                valid_types=_ANALYST_DATA_REFERENCE_TYPES, spec_version='2.0'
-            )
-        )
-    ]
-)
-class CustomAnalystNote:
-    pass
-
-
-@CustomObject(
-    'x-misp-analyst-opinion',
-    [
-        ('id', IDProperty('x-misp-analyst-opinion')),
-        ('created', TimestampProperty(precision='millisecond')),
-        ('modified', TimestampProperty(precision='millisecond')),
-        ('x_misp_opinion', IntegerProperty(required=True)),
-        ('x_misp_author', StringProperty()),
-        ('x_misp_comment', StringProperty()),
-        (
-            'object_ref',
-            ReferenceProperty(
-                valid_types=_ANALYST_DATA_REFERENCE_TYPES, spec_version='2.0'
-            )
-        )
-    ]
-)
-class CustomAnalystOpinion:
-    pass
-
-
-@CustomObject(
-    'x-misp-attribute',
-    [
-        ('id', IDProperty('x-misp-attribute')),
-        ('labels', ListProperty(StringProperty, required=True)),
-        ('created', TimestampProperty(required=True, precision='millisecond')),
-        ('modified', TimestampProperty(required=True, precision='millisecond')),
-        (
-            'created_by_ref',
-            ReferenceProperty(valid_types='identity', spec_version='2.0')
-        ),
-        (
-            'object_marking_refs',
-            ListProperty(
-                ReferenceProperty(
-                    valid_types='marking-definition', spec_version='2.0'
-                )
-            )
-        ),
-        ('x_misp_type', StringProperty(required=True)),
-        ('x_misp_value', StringProperty(required=True)),
-        ('x_misp_comment', StringProperty()),
-        ('x_misp_category', StringProperty())
-    ]
-)
-class CustomAttribute:
-    pass
-
-
-@CustomObject(
-    'x-misp-event-report',
-    [
-        ('id', IDProperty('x-misp-event-report')),
-        ('created', TimestampProperty(required=True, precision='millisecond')),
-        ('modified', TimestampProperty(required=True, precision='millisecond')),
-        (
-            'created_by_ref',
-            ReferenceProperty(valid_types='identity', spec_version='2.0')
-        ),
-        (
-            'object_refs',
-            ListProperty(
-                ReferenceProperty(
-                    valid_types=_ANALYST_DATA_REFERENCE_TYPES,
-                    spec_version='2.0'
-                ),
-                required=True
-            )
-        ),
-        ('x_misp_content', StringProperty(required=True)),
-        ('x_misp_name', StringProperty()),
-    ]
-)
-class CustomEventReport:
-    pass
-
-
-@CustomObject(
-    'x-misp-galaxy-cluster',
-    [
-        ('id', IDProperty('x-misp-galaxy-cluster')),
-        ('labels', ListProperty(StringProperty, required=True)),
-        ('created', TimestampProperty(precision='millisecond')),
-        ('modified', TimestampProperty(precision='millisecond')),
-        (
-            'created_by_ref',
-            ReferenceProperty(valid_types='identity', spec_version='2.0')
-        ),
-        ('x_misp_name', StringProperty(required=True)),
-        ('x_misp_type', StringProperty(required=True)),
-        ('x_misp_value', StringProperty(required=True)),
-        ('x_misp_description', StringProperty(required=True)),
-        ('x_misp_meta', DictionaryProperty())
-    ]
-)
-class CustomGalaxyCluster:
-    pass
-
-
-@CustomObject(
-    'x-misp-object',
-    [
-        ('id', IDProperty('x-misp-object')),
-        ('labels', ListProperty(StringProperty, required=True)),
-        ('created', TimestampProperty(required=True, precision='millisecond')),
-        ('modified', TimestampProperty(required=True, precision='millisecond')),
-        (
-            'created_by_ref',
-            ReferenceProperty(valid_types='identity', spec_version='2.0')
-        ),
-        (
-            'object_marking_refs',
-            ListProperty(
-                ReferenceProperty(
-                    valid_types='marking-definition', spec_version='2.0'
-                )
-            )
-        ),
-        ('x_misp_name', StringProperty(required=True)),
-        ('x_misp_attributes', ListProperty(DictionaryProperty())),
-        ('x_misp_comment', StringProperty()),
-        ('x_misp_meta_category', StringProperty())
-    ]
-)
-class CustomMispObject:
-    pass
-
-
-@CustomObject(
-    'x-misp-event-note',
-    [
-        ('id', IDProperty('x-misp-event-note')),
-        ('created', TimestampProperty(required=True, precision='millisecond')),
-        ('modified', TimestampProperty(required=True, precision='millisecond')),
-        (
-            'created_by_ref',
-            ReferenceProperty(valid_types='identity', spec_version='2.0')
-        ),
-        ('x_misp_event_note', StringProperty(required=True)),
-        (
-            'object_ref',
-            ReferenceProperty(valid_types='report', spec_version='2.0')
-        )
-    ]
-)
-class CustomNote:
-    pass
-
-
-@CustomObject(
-    'x-misp-opinion',
-    [
-        ('id', IDProperty('x-misp-opinion')),
-        ('x_misp_author', StringProperty()),
-        (
-            'x_misp_author_ref',
-            ReferenceProperty(valid_types='identity', spec_version='2.0')
-        ),
-        ('x_misp_explanation', StringProperty()),
-        ('x_misp_opinion', StringProperty(required=True)),
-        ('x_misp_source', StringProperty()),
-        (
-            'object_ref',
-            ReferenceProperty(
-                valid_types=[
-                    'campaign', 'indicator', 'observed-data',
-                    'vulnerability', 'x-misp-attribute'
-                ],
-                spec_version='2.0'
-            )
-        )
-    ]
-)
-class CustomOpinion:
-    pass
-
-
 class MISPtoSTIX20Parser(MISPtoSTIX2Parser):
-    def __init__(self, interoperability=False):
-        super().__init__(interoperability)
+    def __init__(self, interoperability=False,
+                 trusted: Optional[bool] = False,
+                 validation_rate: Optional[float] = 0.0,
+                 cache: Optional[STIX2ResultCache] = None):
+        super().__init__(interoperability, trusted, validation_rate, cache)
         self._version = '2.0'
         self._mapping = MISPtoSTIX20Mapping
 
@@ -304,7 +107,7 @@ class MISPtoSTIX20Parser(MISPtoSTIX2Parser):
             note_args['x_misp_language'] = note['language']
         if stix_object['id'].startswith('x-misp-'):
             note_args['allow_custom'] = True
-        getattr(self, self._results_handling_function)(
+        self._results_handling_function(
             CustomAnalystNote(**note_args)
         )
 
@@ -322,7 +125,7 @@ class MISPtoSTIX20Parser(MISPtoSTIX2Parser):
             opinion_args['x_misp_comment'] = opinion['comment']
         if stix_object['id'].startswith('x-misp-'):
             opinion_args['allow_custom'] = True
-        getattr(self, self._results_handling_function)(
+        self._results_handling_function(
             CustomAnalystOpinion(**opinion_args)
         )
 
@@ -352,7 +155,7 @@ class MISPtoSTIX20Parser(MISPtoSTIX2Parser):
             )
         if sighting.get('source', ''):
             opinion_args['x_misp_source'] = sighting['source']
-        getattr(self, self._results_handling_function)(
+        self._results_handling_function(
             CustomOpinion(**opinion_args)
         )
 
@@ -367,7 +170,7 @@ class MISPtoSTIX20Parser(MISPtoSTIX2Parser):
             }
         )
         self._handle_analyst_data(report_args)
-        report_args['object_refs'] = self.object_refs
+        report_args['object_refs'] = list(self.object_refs)
         report = self._create_report(report_args)
         return report
 
@@ -893,7 +696,7 @@ class MISPtoSTIX20Parser(MISPtoSTIX2Parser):
             address, display_name=display_names.get(address)
         )
         observable[index] = email_address
-        email_args['_valid_refs'][index] = email_address._type
+        email_args['_valid_refs'][index] = email_address.type
 
     def _parse_file_observable_object(
             self, misp_object: Union[MISPObject, dict]) -> tuple:
@@ -1341,58 +1144,55 @@ class MISPtoSTIX20Parser(MISPtoSTIX2Parser):
             args.update(
                 self._mapping.malware_sample_additional_observable_values()
             )
-        return Artifact(**args)
+        return self._create_stix_object(Artifact, args)
 
-    @staticmethod
-    def _create_attack_pattern(attack_pattern_args: dict) -> AttackPattern:
-        return AttackPattern(**attack_pattern_args)
+    def _create_attack_pattern(
+            self, attack_pattern_args: dict) -> AttackPattern:
+        return self._create_stix_object(AttackPattern, attack_pattern_args)
 
     def _create_bundle(self) -> Bundle:
-        return Bundle(
-            self.stix_objects, allow_custom=True,
-            id=f"bundle--{self._misp_event.get('uuid')}"
-            if hasattr(self, "_misp_event") else None
-        )
+        bundle_args = {'objects': self.stix_objects, 'allow_custom': True}
+        if self.cache is not None:
+            # Cached objects are dicts, already validated at their creation
+            bundle_args['interoperability'] = True
+        if hasattr(self, '_misp_event'):
+            bundle_args['id'] = f"bundle--{self._misp_event.get('uuid')}"
+        return self._create_stix_object(Bundle, bundle_args)
 
-    @staticmethod
-    def _create_campaign(campaign_args: dict) -> Campaign:
-        return Campaign(**campaign_args)
+    def _create_campaign(self, campaign_args: dict) -> Campaign:
+        return self._create_stix_object(Campaign, campaign_args)
 
-    @staticmethod
-    def _create_course_of_action(course_of_action_args: dict) -> CourseOfAction:
-        return CourseOfAction(**course_of_action_args)
+    def _create_course_of_action(
+            self, course_of_action_args: dict) -> CourseOfAction:
+        return self._create_stix_object(CourseOfAction, course_of_action_args)
 
     def _create_custom_attribute(self, custom_args: dict) -> CustomAttribute:
         self._clean_custom_properties(custom_args)
-        return CustomAttribute(**custom_args)
+        return self._create_stix_object(CustomAttribute, custom_args)
 
     def _create_custom_galaxy(self, custom_args: dict) -> CustomGalaxyCluster:
-        return CustomGalaxyCluster(**custom_args)
+        return self._create_stix_object(CustomGalaxyCluster, custom_args)
 
     def _create_custom_object(self, custom_args: dict) -> CustomMispObject:
         self._clean_custom_properties(custom_args)
-        return CustomMispObject(**custom_args)
+        return self._create_stix_object(CustomMispObject, custom_args)
 
-    @staticmethod
     def _create_email_address(
-            email_address: str,
+            self, email_address: str,
             display_name: Optional[str] = None) -> EmailAddress:
         args = {'value': email_address}
         if display_name is not None:
             args['display_name'] = display_name
-        return EmailAddress(**args)
+        return self._create_stix_object(EmailAddress, args)
 
-    @staticmethod
-    def _create_file(name: str) -> File:
-        return File(name=name)
+    def _create_file(self, name: str) -> File:
+        return self._create_stix_object(File, {'name': name})
 
-    @staticmethod
-    def _create_file_object(file_args: dict) -> File:
-        return File(**file_args)
+    def _create_file_object(self, file_args: dict) -> File:
+        return self._create_stix_object(File, file_args)
 
-    @staticmethod
-    def _create_identity(identity_args: dict) -> Identity:
-        return Identity(**identity_args)
+    def _create_identity(self, identity_args: dict) -> Identity:
+        return self._create_stix_object(Identity, identity_args)
 
     def _create_identity_object(self, orgname: str) -> Identity:
         identity_args = {
@@ -1402,56 +1202,45 @@ class MISPtoSTIX20Parser(MISPtoSTIX2Parser):
         }
         return self._create_identity(identity_args)
 
-    @staticmethod
-    def _create_indicator(indicator_args: dict) -> Indicator:
-        return Indicator(**indicator_args)
+    def _create_indicator(self, indicator_args: dict) -> Indicator:
+        return self._create_stix_object(Indicator, indicator_args)
 
-    @staticmethod
-    def _create_intrusion_set(intrusion_set_args: dict) -> IntrusionSet:
-        return IntrusionSet(**intrusion_set_args)
+    def _create_intrusion_set(self, intrusion_set_args: dict) -> IntrusionSet:
+        return self._create_stix_object(IntrusionSet, intrusion_set_args)
 
-    @staticmethod
-    def _create_malware(malware_args: dict) -> Malware:
-        return Malware(**malware_args)
+    def _create_malware(self, malware_args: dict) -> Malware:
+        return self._create_stix_object(Malware, malware_args)
 
     def _create_observed_data(
             self, args: dict, observable: dict) -> ObservedData:
         args['objects'] = observable
-        observed_data = ObservedData(**args)
-        getattr(self, self._results_handling_function)(observed_data)
+        observed_data = self._create_stix_object(ObservedData, args)
+        self._results_handling_function(observed_data)
         return observed_data
 
-    @staticmethod
-    def _create_PE_extension(extension_args: dict) -> WindowsPEBinaryExt:
-        return WindowsPEBinaryExt(**extension_args)
+    def _create_PE_extension(self, extension_args: dict) -> WindowsPEBinaryExt:
+        return self._create_stix_object(WindowsPEBinaryExt, extension_args)
 
-    @staticmethod
-    def _create_relationship(relationship_args: dict) -> Relationship:
-        return Relationship(**relationship_args)
+    def _create_relationship(self, relationship_args: dict) -> Relationship:
+        return self._create_stix_object(Relationship, relationship_args)
 
-    @staticmethod
-    def _create_report(report_args: dict) -> Report:
-        return Report(**report_args)
+    def _create_report(self, report_args: dict) -> Report:
+        return self._create_stix_object(Report, report_args)
 
-    @staticmethod
-    def _create_sighting(sighting_args: dict) -> Sighting:
-        return Sighting(**sighting_args)
+    def _create_sighting(self, sighting_args: dict) -> Sighting:
+        return self._create_stix_object(Sighting, sighting_args)
 
-    @staticmethod
-    def _create_threat_actor(threat_actor_args: dict) -> ThreatActor:
-        return ThreatActor(**threat_actor_args)
+    def _create_threat_actor(self, threat_actor_args: dict) -> ThreatActor:
+        return self._create_stix_object(ThreatActor, threat_actor_args)
 
-    @staticmethod
-    def _create_tool(tool_args: dict) -> Tool:
-        return Tool(**tool_args)
+    def _create_tool(self, tool_args: dict) -> Tool:
+        return self._create_stix_object(Tool, tool_args)
 
-    @staticmethod
-    def _create_vulnerability(vulnerability_args: dict) -> Vulnerability:
-        return Vulnerability(**vulnerability_args)
+    def _create_vulnerability(self, vulnerability_args: dict) -> Vulnerability:
+        return self._create_stix_object(Vulnerability, vulnerability_args)
 
-    @staticmethod
-    def _create_windowsPESection(section_args: dict) -> WindowsPESection:
-        return WindowsPESection(**section_args)
+    def _create_windowsPESection(self, section_args: dict) -> WindowsPESection:
+        return self._create_stix_object(WindowsPESection, section_args)
 
     ############################################################################
     #                   OBSERVABLE OBJECT PARSING FUNCTIONS.                   #
@@ -2,17 +2,19 @@
 # -*- coding: utf-8 -*-
 
 import re
+from ..stix2_custom_objects import (
+    CustomAttribute_v21 as CustomAttribute,
+    CustomGalaxyCluster_v21 as CustomGalaxyCluster,
+    CustomMispObject_v21 as CustomMispObject)
 from .misp_to_stix2 import InvalidHashValueError, MISPtoSTIX2Parser
 from .stix21_mapping import MISPtoSTIX21Mapping
+from .stix2_cache import STIX2ResultCache
 from base64 import b64encode
 from collections import defaultdict
 from datetime import datetime
 from pymisp import (
     MISPAttribute, MISPEventReport, MISPGalaxy, MISPGalaxyCluster, MISPNote,
     MISPObject, MISPOpinion)
-from stix2.properties import (
-    DictionaryProperty, IDProperty, ListProperty, ReferenceProperty,
-    StringProperty, TimestampProperty)
 from stix2.v21.bundle import Bundle
 from stix2.v21.observables import (
     Artifact, AutonomousSystem, Directory, DomainName, EmailAddress,
@@ -35,66 +37,12 @@ _STIX_OBJECT_TYPING = Union[
 ]
 
 
-@CustomObject(
-    'x-misp-attribute',
-    [
-        ('id', IDProperty('x-misp-attribute', spec_version='2.1')),
-        ('labels', ListProperty(StringProperty, required=True)),
-        ('created', TimestampProperty(required=True, precision='millisecond')),
-        ('modified', TimestampProperty(required=True, precision='millisecond')),
-        ('created_by_ref', ReferenceProperty(valid_types='identity', spec_version='2.1')),
-        ('object_marking_refs', ListProperty(ReferenceProperty(valid_types='marking-definition', spec_version='2.1'))),
-        ('x_misp_type', StringProperty(required=True)),
-        ('x_misp_value', StringProperty(required=True)),
-        ('x_misp_comment', StringProperty()),
-        ('x_misp_category', StringProperty())
-    ]
-)
-class CustomAttribute():
-    pass
-
-
-@CustomObject(
-    'x-misp-object',
-    [
-        ('id', IDProperty('x-misp-object', spec_version='2.1')),
-        ('labels', ListProperty(StringProperty, required=True)),
-        ('created', TimestampProperty(required=True, precision='millisecond')),
-        ('modified', TimestampProperty(required=True, precision='millisecond')),
-        ('created_by_ref', ReferenceProperty(valid_types='identity', spec_version='2.1')),
-        ('object_marking_refs', ListProperty(ReferenceProperty(valid_types='marking-definition', spec_version='2.1'))),
-        ('x_misp_name', StringProperty(required=True)),
-        ('x_misp_attributes', ListProperty(DictionaryProperty())),
-        ('x_misp_comment', StringProperty()),
-        ('x_misp_meta_category', StringProperty())
-    ]
-)
-class CustomMispObject():
-    pass
-
-
-@CustomObject(
-    'x-misp-galaxy-cluster',
-    [
-        ('id', IDProperty('x-misp-galaxy-cluster')),
-        ('labels', ListProperty(StringProperty, required=True)),
-        ('created', TimestampProperty(precision='millisecond')),
-        ('modified', TimestampProperty(precision='millisecond')),
-        ('created_by_ref', ReferenceProperty(valid_types='identity', spec_version='2.1')),
-        ('x_misp_name', StringProperty(required=True)),
-        ('x_misp_type', StringProperty(required=True)),
-        ('x_misp_value', StringProperty(required=True)),
-        ('x_misp_description', StringProperty(required=True)),
-        ('x_misp_meta', DictionaryProperty())
-    ]
-)
-class CustomGalaxyCluster:
-    pass
-
-
 class MISPtoSTIX21Parser(MISPtoSTIX2Parser):
-    def __init__(self, interoperability=False):
-        super().__init__(interoperability)
+    def __init__(self, interoperability=False,
+                 trusted: Optional[bool] = False,
+                 validation_rate: Optional[float] = 0.0,
+                 cache: Optional[STIX2ResultCache] = None):
+        super().__init__(interoperability, trusted, validation_rate, cache)
         self._version = '2.1'
         self._mapping = MISPtoSTIX21Mapping
 
@@ -167,7 +115,7 @@ class MISPtoSTIX21Parser(MISPtoSTIX2Parser):
             note_args['lang'] = note['language']
         if stix_object['id'].startswith('x-misp--'):
             note_args['allow_custom'] = True
-        getattr(self, self._results_handling_function)(
+        self._results_handling_function(
             self._create_note(note_args)
         )
 
@@ -187,7 +135,7 @@ class MISPtoSTIX21Parser(MISPtoSTIX2Parser):
             opinion_args['explanation'] = opinion['comment']
         if stix_object['id'].startswith('x-misp--'):
             opinion_args['allow_custom'] = True
-        getattr(self, self._results_handling_function)(
+        self._results_handling_function(
             self._create_opinion(opinion_args)
         )
 
@@ -216,7 +164,7 @@ class MISPtoSTIX21Parser(MISPtoSTIX2Parser):
                     )
                 }
             )
-        getattr(self, self._results_handling_function)(
+        self._results_handling_function(
             self._create_opinion(opinion_args)
         )
 
@@ -231,7 +179,7 @@ class MISPtoSTIX21Parser(MISPtoSTIX2Parser):
             }
         )
         self._handle_analyst_data(report_args)
-        report_args['object_refs'] = self.object_refs
+        report_args['object_refs'] = list(self.object_refs)
         grouping = Grouping(**report_args)
         return grouping
 
@@ -737,7 +685,7 @@ class MISPtoSTIX21Parser(MISPtoSTIX2Parser):
                     else values
                 )
         note = self._create_note(note_args)
-        getattr(self, self._results_handling_function)(note)
+        self._results_handling_function(note)
         self._handle_object_analyst_data(note, misp_object)
 
     def _parse_asn_object_observable(
@@ -1004,7 +952,7 @@ class MISPtoSTIX21Parser(MISPtoSTIX2Parser):
         if attributes:
             location_args.update(self._handle_observable_properties(attributes))
         location = self._create_location(location_args)
-        getattr(self, self._results_handling_function)(location)
+        self._results_handling_function(location)
         self._handle_object_analyst_data(location, misp_object)
 
     def _parse_http_request_object_observable(
@@ -1601,61 +1549,57 @@ class MISPtoSTIX21Parser(MISPtoSTIX2Parser):
             args.update(
                 self._mapping.malware_sample_additional_observable_values()
             )
-        return Artifact(**args)
+        return self._create_stix_object(Artifact, args)
 
-    @staticmethod
-    def _create_attack_pattern(attack_pattern_args: dict) -> AttackPattern:
-        return AttackPattern(**attack_pattern_args)
+    def _create_attack_pattern(
+            self, attack_pattern_args: dict) -> AttackPattern:
+        return self._create_stix_object(AttackPattern, attack_pattern_args)
 
     def _create_bundle(self) -> Bundle:
-        return Bundle(
-            self.stix_objects, allow_custom=True,
-            id=(
-                f"bundle--{self._misp_event.get('uuid')}"
-                if hasattr(self, "_misp_event") else None
-            )
-        )
+        bundle_args = {'objects': self.stix_objects, 'allow_custom': True}
+        if self.cache is not None:
+            # Cached objects are dicts, already validated at their creation
+            bundle_args['interoperability'] = True
+        if hasattr(self, '_misp_event'):
+            bundle_args['id'] = f"bundle--{self._misp_event.get('uuid')}"
+        return self._create_stix_object(Bundle, bundle_args)
 
-    @staticmethod
-    def _create_campaign(campaign_args: dict) -> Campaign:
-        return Campaign(**campaign_args)
+    def _create_campaign(self, campaign_args: dict) -> Campaign:
+        return self._create_stix_object(Campaign, campaign_args)
 
-    @staticmethod
-    def _create_course_of_action(course_of_action_args: dict) -> CourseOfAction:
-        return CourseOfAction(**course_of_action_args)
+    def _create_course_of_action(
+            self, course_of_action_args: dict) -> CourseOfAction:
+        return self._create_stix_object(CourseOfAction, course_of_action_args)
 
     def _create_custom_attribute(self, custom_args: dict) -> CustomAttribute:
         self._clean_custom_properties(custom_args)
-        return CustomAttribute(**custom_args)
+        return self._create_stix_object(CustomAttribute, custom_args)
 
-    @staticmethod
-    def _create_custom_galaxy(custom_args: dict) -> CustomGalaxyCluster:
-        return CustomGalaxyCluster(**custom_args)
+    def _create_custom_galaxy(self, custom_args: dict) -> CustomGalaxyCluster:
+        return self._create_stix_object(CustomGalaxyCluster, custom_args)
 
     def _create_custom_object(self, custom_args: dict) -> CustomMispObject:
         self._clean_custom_properties(custom_args)
-        return CustomMispObject(**custom_args)
+        return self._create_stix_object(CustomMispObject, custom_args)
 
-    @staticmethod
     def _create_email_address(
-            address_id: str, email_address: str,
+            self, address_id: str, email_address: str,
             display_name: Optional[str] = None) -> EmailAddress:
         args = {'id': address_id, 'value': email_address}
         if display_name is not None:
             args['display_name'] = display_name
-        return EmailAddress(**args)
+        return self._create_stix_object(EmailAddress, args)
 
-    @staticmethod
-    def _create_file(file_id: str, filename: str) -> File:
-        return File(id=file_id, name=filename)
+    def _create_file(self, file_id: str, filename: str) -> File:
+        return self._create_stix_object(
+            File, {'id': file_id, 'name': filename}
+        )
 
-    @staticmethod
-    def _create_file_object(file_args: dict) -> File:
-        return File(**file_args)
+    def _create_file_object(self, file_args: dict) -> File:
+        return self._create_stix_object(File, file_args)
 
-    @staticmethod
-    def _create_identity(identity_args: dict) -> Identity:
-        return Identity(**identity_args)
+    def _create_identity(self, identity_args: dict) -> Identity:
+        return self._create_stix_object(Identity, identity_args)
 
     def _create_identity_object(self, orgname: str) -> Identity:
         identity_args = {
@@ -1666,79 +1610,65 @@ class MISPtoSTIX21Parser(MISPtoSTIX2Parser):
         }
         return self._create_identity(identity_args)
 
-    @staticmethod
-    def _create_indicator(indicator_args: dict) -> Indicator:
+    def _create_indicator(self, indicator_args: dict) -> Indicator:
         indicator_args['spec_version'] = '2.1'
         if indicator_args.get('pattern_type') is None:
             indicator_args['pattern_type'] = 'stix'
         if indicator_args.get('pattern_version') is None:
             indicator_args['pattern_version'] = '2.1'
-        return Indicator(**indicator_args)
+        return self._create_stix_object(Indicator, indicator_args)
 
-    @staticmethod
-    def _create_intrusion_set(intrusion_set_args: dict) -> IntrusionSet:
-        return IntrusionSet(**intrusion_set_args)
+    def _create_intrusion_set(self, intrusion_set_args: dict) -> IntrusionSet:
+        return self._create_stix_object(IntrusionSet, intrusion_set_args)
 
-    @staticmethod
-    def _create_location(location_args: dict) -> Location:
-        return Location(**location_args)
+    def _create_location(self, location_args: dict) -> Location:
+        return self._create_stix_object(Location, location_args)
 
-    @staticmethod
-    def _create_malware(malware_args: dict) -> Malware:
+    def _create_malware(self, malware_args: dict) -> Malware:
         if 'is_family' not in malware_args:
             malware_args['is_family'] = False
-        return Malware(**malware_args)
+        return self._create_stix_object(Malware, malware_args)
 
-    @staticmethod
-    def _create_note(note_args: dict) -> Note:
+    def _create_note(self, note_args: dict) -> Note:
         if any(ref.startswith('x-misp-') for ref in note_args['object_refs']):
             note_args['allow_custom'] = True
-        return Note(**note_args)
+        return self._create_stix_object(Note, note_args)
 
     def _create_observed_data(
             self, args: dict, observables: list) -> ObservedData:
         args['object_refs'] = [observable.id for observable in observables]
-        observed_data = ObservedData(**args)
-        getattr(self, self._results_handling_function)(observed_data)
+        observed_data = self._create_stix_object(ObservedData, args)
+        self._results_handling_function(observed_data)
         for observable in observables:
-            getattr(self, self._results_handling_function)(observable)
+            self._results_handling_function(observable)
         return observed_data
 
-    @staticmethod
-    def _create_opinion(opinion_args: dict) -> Opinion:
-        return Opinion(**opinion_args)
+    def _create_opinion(self, opinion_args: dict) -> Opinion:
+        return self._create_stix_object(Opinion, opinion_args)
 
-    @staticmethod
-    def _create_PE_extension(extension_args: dict) -> WindowsPEBinaryExt:
-        return WindowsPEBinaryExt(**extension_args)
+    def _create_PE_extension(self, extension_args: dict) -> WindowsPEBinaryExt:
+        return self._create_stix_object(WindowsPEBinaryExt, extension_args)
 
-    @staticmethod
-    def _create_relationship(relationship_args: dict) -> Relationship:
-        return Relationship(**relationship_args)
+    def _create_relationship(self, relationship_args: dict) -> Relationship:
+        return self._create_stix_object(Relationship, relationship_args)
 
-    @staticmethod
-    def _create_report(report_args: dict) -> Report:
-        return Report(**report_args)
+    def _create_report(self, report_args: dict) -> Report:
+        return self._create_stix_object(Report, report_args)
 
-    @staticmethod
-    def _create_sighting(sighting_args: dict) -> Sighting:
-        return Sighting(**sighting_args)
+    def _create_sighting(self, sighting_args: dict) -> Sighting:
+        return self._create_stix_object(Sighting, sighting_args)
 
-    @staticmethod
-    def _create_threat_actor(threat_actor_args: dict) -> ThreatActor:
-        return ThreatActor(**threat_actor_args)
+    def _create_threat_actor(self, threat_actor_args: dict) -> ThreatActor:
+        return self._create_stix_object(ThreatActor, threat_actor_args)
 
-    @staticmethod
-    def _create_tool(tool_args: dict) -> Tool:
-        return Tool(**tool_args)
+    def _create_tool(self, tool_args: dict) -> Tool:
+        return self._create_stix_object(Tool, tool_args)
 
-    @staticmethod
-    def _create_vulnerability(vulnerability_args: dict) -> Vulnerability:
-        return Vulnerability(**vulnerability_args)
+    def _create_vulnerability(self, vulnerability_args: dict) -> Vulnerability:
+        return self._create_stix_object(Vulnerability, vulnerability_args)
 
-    @staticmethod
-    def _create_windowsPESection(section_args: dict) -> WindowsPESection:
-        return WindowsPESection(**section_args)
+    def _create_windowsPESection(self, section_args: dict) -> WindowsPESection:
+        return self._create_stix_object(WindowsPESection, section_args)
 
     ############################################################################
     #                   OBSERVABLE OBJECT PARSING FUNCTIONS.                   #
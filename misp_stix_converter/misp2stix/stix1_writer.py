@@ -0,0 +1,226 @@
+# -*- coding: utf-8 -*-
+#!/usr/bin/env python3
+
+from ..file_compression import open_file
+from .stix1_mapping import SCHEMALOC_DICT
+from mixbox import binding_utils
+from mixbox.entities import Entity, EntityList, NamespaceCollector, _objectify
+from mixbox.namespaces import get_full_ns_map
+from pathlib import Path
+from stix.common.related import RelatedPackage, RelatedPackages
+from stix.core import STIXPackage
+from typing import Callable, Optional, TextIO, Union
+
+
+class _LazyBindings:
+    """
+    Binding objects of the values of a multiple field, converted one at a
+    time while they are exported, and then released.
+    """
+
+    def __init__(self, field, values: list):
+        self.__field = field
+        self.__values = values
+
+    def __bool__(self) -> bool:
+        return bool(self.__values)
+
+    def __iter__(self):
+        for value in self.__values:
+            yield _objectify(self.__field, value, None)
+
+    def __len__(self) -> int:
+        return len(self.__values)
+
+
+class _Placeholder:
+    """
+    Binding object standing in for the content written by the STIX1XMLWriter,
+    it records the arguments it is exported with and writes nothing.
+    """
+
+    def __init__(self):
+        self.args = None
+        self.kwargs = None
+
+    def export(self, lwrite: Callable, *args, **kwargs):
+        self.args = args
+        self.kwargs = kwargs
+
+
+class STIX1XMLWriter:
+    """
+    Writes a STIX 1 package as XML incrementally: the STIX objects are
+    exported one at a time straight into the output, so neither the complete
+    XML content nor all the binding objects are ever held in memory.
+    MISP events are written as related packages of the root package, between
+    the header & footer exported from the structure of the root package
+    itself. The root package is written on its own if no event is given.
+    """
+
+    def __init__(self, output: Union[Path, str, TextIO],
+                 stix_package: STIXPackage,
+                 namespaces: Optional[dict] = None):
+        if isinstance(output, (Path, str)):
+            self.__file = open_file(output, 'wt')
+            self.__close_file = True
+        else:
+            self.__file = output
+            self.__close_file = False
+        self.__stix_package = stix_package
+        self.__namespaces = namespaces
+        self.__count = 0
+        self.__footer = None
+        self.__placeholder = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        if exc_type is None:
+            self.close()
+        elif self.__close_file:
+            self.__file.close()
+
+    @property
+    def count(self) -> int:
+        return self.__count
+
+    def close(self):
+        if self.__footer is None:
+            _export_binding(
+                _lazy_binding(self.__stix_package), self.__file.write,
+                self.__namespaces
+            )
+        else:
+            self.__file.write(self.__footer)
+        if self.__close_file:
+            self.__file.close()
+
+    def write_package(self, stix_package: STIXPackage):
+        """
+        Writes the STIX package of a MISP event as a related package of the
+        root package - or each related package of a package of MISP events.
+        """
+        if self.__footer is None:
+            self.__placeholder = _Placeholder()
+            header, self.__footer = _split_package(
+                _lazy_binding(self.__stix_package), self.__placeholder,
+                self.__namespaces
+            )
+            self.__file.write(header)
+        with binding_utils.save_encoding('utf-8'):
+            for related_package in _related_packages(stix_package):
+                _lazy_binding(related_package).export(
+                    self.__file.write, *self.__placeholder.args,
+                    **self.__placeholder.kwargs
+                )
+                self.__count += 1
+
+
+def serialize_related_packages(stix_package: STIXPackage) -> str:
+    """
+    Returns the packages of MISP events held in the related packages of a
+    package - or the package itself, serialised as they are written between
+    the header & footer from `stix1_xml_framing`, separated by its separator.
+    """
+    placeholder = _Placeholder()
+    _split_package(STIXPackage._binding_class(), placeholder)
+    header, footer, package = _split_related_package(placeholder)
+    packages = []
+    with binding_utils.save_encoding('utf-8'):
+        for related_package in _related_packages(stix_package):
+            content = []
+            _lazy_binding(related_package).Package.export(
+                content.append, *package.args, **package.kwargs
+            )
+            packages.append(''.join(content))
+    return f'{footer}{header}'.join(packages)
+
+
+def stix1_xml_framing(stix_package: STIXPackage, namespaces: dict) -> tuple:
+    """
+    Returns the header, separator and footer surrounding the packages of
+    MISP events in the related packages of a root package.
+    """
+    placeholder = _Placeholder()
+    header, footer = _split_package(
+        _lazy_binding(stix_package), placeholder, namespaces
+    )
+    related_header, related_footer, _ = _split_related_package(placeholder)
+    return (
+        f'{header}{related_header}', f'{related_footer}{related_header}',
+        f'{related_footer}{footer}'
+    )
+
+
+def _export_binding(binding, write: Callable,
+                    namespaces: Optional[dict] = None):
+    # Same output as the `to_xml` method of python-stix packages with
+    # `auto_namespace` disabled, without the intermediate XML string
+    ns_info = NamespaceCollector()
+    ns_info.finalize(ns_dict=namespaces, schemaloc_dict=SCHEMALOC_DICT)
+    delimiter = '\n\t'
+    with binding_utils.save_encoding('utf-8'):
+        binding.export(
+            write, 0, {**ns_info.binding_namespaces, **get_full_ns_map()},
+            pretty_print=True, namespacedef_=(
+                f'{delimiter}{ns_info.get_xmlns_string(delimiter)}'
+            )
+        )
+
+
+def _lazy_binding(entity: Entity):
+    # Mirrors the `to_obj` method of mixbox entities, with the values of the
+    # multiple fields converted into binding objects only when exported
+    binding = entity._binding_class()
+    for field, value in entity._fields.items():
+        if isinstance(value, EntityList):
+            value = _lazy_binding(value) if len(value) else None
+        elif field.multiple:
+            value = _LazyBindings(field, value) if value else []
+        elif isinstance(value, STIXPackage):
+            value = _lazy_binding(value)
+        else:
+            value = _objectify(field, value, None)
+        setattr(binding, field.name, value)
+    entity._finalize_obj(binding)
+    return binding
+
+
+def _related_packages(stix_package: STIXPackage):
+    if stix_package.related_packages:
+        yield from stix_package.related_packages
+    else:
+        yield RelatedPackage(stix_package)
+
+
+def _split(export: Callable, placeholder: _Placeholder) -> tuple:
+    # Splits the exported content where the placeholder is exported
+    content = ([], [])
+    export(
+        lambda value: content[placeholder.args is not None].append(value)
+    )
+    return tuple(''.join(values) for values in content)
+
+
+def _split_package(binding, placeholder: _Placeholder,
+                   namespaces: Optional[dict] = None) -> tuple:
+    binding.Related_Packages = RelatedPackages().to_obj()
+    binding.Related_Packages.Related_Package = [placeholder]
+    return _split(
+        lambda write: _export_binding(binding, write, namespaces), placeholder
+    )
+
+
+def _split_related_package(placeholder: _Placeholder) -> tuple:
+    package = _Placeholder()
+    binding = RelatedPackage().to_obj()
+    binding.Package = package
+    header, footer = _split(
+        lambda write: binding.export(
+            write, *placeholder.args, **placeholder.kwargs
+        ),
+        package
+    )
+    return header, footer, package
@@ -0,0 +1,177 @@
+# -*- coding: utf-8 -*-
+#!/usr/bin/env python3
+
+import json
+import sqlite3
+import zlib
+from .trusted_stix2 import TrustedSTIX2Object
+from hashlib import sha256
+from pathlib import Path
+from stix2.base import STIXJSONEncoder
+from time import time
+from typing import Optional, Union
+
+_EVICTION_RATIO = 0.9
+# Seconds waited for another process writing into the cache
+_TIMEOUT = 60
+_SCHEMA = (
+    'CREATE TABLE IF NOT EXISTS results ('
+    'key TEXT PRIMARY KEY, content BLOB NOT NULL, size INTEGER NOT NULL, '
+    'created REAL NOT NULL, accessed REAL NOT NULL)'
+)
+
+
+class STIX2ResultCache:
+    """
+    On-disk cache of the STIX objects converted from MISP events, stored in a
+    SQLite database.
+    Results are keyed by the event uuid & timestamps, the STIX version and
+    the exporter options, so an event is converted again as soon as it is
+    modified. Entries older than `max_age` (in seconds) are evicted when the
+    cache is opened, and the least recently used ones are evicted once the
+    cached content exceeds `max_size` (in bytes).
+    Every write is committed straight away, in WAL mode, so the worker
+    processes sharing the cache never wait for each other more than the
+    time of a single write. A cache that remains locked anyway is simply
+    skipped: results are then converted & not stored.
+    """
+
+    def __init__(self, path: Union[Path, str],
+                 max_size: Optional[int] = None,
+                 max_age: Optional[float] = None):
+        from .. import __version__
+        self.__version = __version__
+        self.__path = path
+        self.__max_size = max_size
+        self.__connection = sqlite3.connect(
+            str(path), timeout=_TIMEOUT, isolation_level=None
+        )
+        self.__connection.execute('PRAGMA journal_mode=WAL')
+        self.__connection.execute(_SCHEMA)
+        if max_age is not None:
+            self.__connection.execute(
+                'DELETE FROM results WHERE created < ?', (time() - max_age,)
+            )
+        self.__size = self.__connection.execute(
+            'SELECT COALESCE(SUM(size), 0) FROM results'
+        ).fetchone()[0]
+        self.__hits = 0
+        self.__misses = 0
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    @property
+    def hits(self) -> int:
+        return self.__hits
+
+    @property
+    def max_size(self) -> Union[int, None]:
+        return self.__max_size
+
+    @property
+    def misses(self) -> int:
+        return self.__misses
+
+    @property
+    def path(self) -> Union[Path, str]:
+        return self.__path
+
+    @property
+    def size(self) -> int:
+        return self.__size
+
+    def close(self):
+        self.__connection.close()
+
+    def get(self, key: str) -> Union[dict, None]:
+        """
+        Returns the cached result, with its STIX objects loaded as
+        TrustedSTIX2Object instances, or None if there is no such result.
+        """
+        try:
+            row = self.__connection.execute(
+                'SELECT content FROM results WHERE key = ?', (key,)
+            ).fetchone()
+        except sqlite3.OperationalError:
+            row = None
+        if row is None:
+            self.__misses += 1
+            return None
+        self.__hits += 1
+        try:
+            # Only used to evict the least recently used results first
+            self.__connection.execute(
+                'UPDATE results SET accessed = ? WHERE key = ?', (time(), key)
+            )
+        except sqlite3.OperationalError:
+            pass
+        return json.loads(
+            zlib.decompress(row[0]), object_pairs_hook=TrustedSTIX2Object
+        )
+
+    def key(self, misp_event: dict, version: str, **options) -> str:
+        """
+        Returns the cache key of a MISP event converted into the given STIX
+        version with the given exporter options.
+        """
+        fields = (
+            misp_event['uuid'], misp_event.get('timestamp'),
+            misp_event.get('published'), misp_event.get('publish_timestamp'),
+            version, sorted(options.items()), self.__version
+        )
+        return sha256(
+            json.dumps(fields, default=str).encode('utf-8')
+        ).hexdigest()
+
+    def set(self, key: str, result: dict):
+        """
+        Stores the result of a MISP event conversion - or gives up if the
+        cache remains locked by other processes.
+        """
+        content = zlib.compress(
+            json.dumps(
+                result, cls=STIXJSONEncoder, separators=(',', ':')
+            ).encode('utf-8')
+        )
+        now = time()
+        try:
+            previous = self.__connection.execute(
+                'SELECT size FROM results WHERE key = ?', (key,)
+            ).fetchone()
+            self.__connection.execute(
+                'INSERT OR REPLACE INTO results VALUES (?, ?, ?, ?, ?)',
+                (key, content, len(content), now, now)
+            )
+            if previous is not None:
+                self.__size -= previous[0]
+            self.__size += len(content)
+            if self.__max_size is not None and self.__size > self.__max_size:
+                self.__evict()
+        except sqlite3.OperationalError:
+            pass
+
+    def __evict(self):
+        # Evicting a bit more than needed avoids scanning the entries again
+        # with every new result once the cache is full
+        target_size = self.__max_size * _EVICTION_RATIO
+        rows = self.__connection.execute(
+            'SELECT key, size FROM results ORDER BY accessed'
+        ).fetchall()
+        evicted = []
+        cache_size = self.__size
+        for key, size in rows:
+            if cache_size <= target_size:
+                break
+            evicted.append((key,))
+            cache_size -= size
+        # A single transaction for all the evicted results
+        with self.__connection:
+            self.__connection.execute('BEGIN')
+            self.__connection.executemany(
+                'DELETE FROM results WHERE key = ?', evicted
+            )
+        self.__size = cache_size
@@ -0,0 +1,198 @@
+# -*- coding: utf-8 -*-
+#!/usr/bin/env python3
+
+import json
+from ..file_compression import open_file
+from pathlib import Path
+from stix2.base import STIXJSONEncoder
+from typing import Iterable, Optional, TextIO, Union
+from uuid import uuid4
+
+_JSON_BACKENDS = ('json', 'orjson')
+_PLACEHOLDER = 'null'
+
+
+class STIX2JSONSerializer:
+    """
+    Serialises STIX 2 objects the way they are laid out in a bundle.
+    The `json` backend gives the same output as python-stix2, `orjson` is
+    faster but only supports an indentation of 2 and no space after the
+    separators in the compact output.
+    """
+
+    def __init__(self, indent: Optional[int] = 4,
+                 json_backend: Optional[str] = 'json'):
+        if json_backend not in _JSON_BACKENDS:
+            raise ValueError(
+                f'Invalid JSON backend: {json_backend} - it should be one of '
+                f'{", ".join(_JSON_BACKENDS)}.'
+            )
+        self.__indent = indent
+        if json_backend == 'orjson':
+            try:
+                import orjson
+            except ImportError:
+                raise ImportError(
+                    'Missing python library: orjson - install it or use the '
+                    'json backend.'
+                ) from None
+            self.__orjson = orjson
+            self.__encoder = STIXJSONEncoder()
+            self.__options = (
+                orjson.OPT_PASSTHROUGH_DATETIME |
+                orjson.OPT_PASSTHROUGH_SUBCLASS
+            )
+            if indent:
+                self.__options |= orjson.OPT_INDENT_2
+            self.__dumps = self.__orjson_dumps
+        else:
+            self.__dumps = self.__json_dumps
+        _, separator, _ = self.__dumps(
+            {'objects': [None, None]}
+        ).split(_PLACEHOLDER)
+        # Objects in a bundle are nested in the objects list, their own
+        # content gets the same indentation as the one between them
+        self.__object_indentation = (
+            separator.split('\n', 1)[1] if '\n' in separator else ''
+        )
+
+    @property
+    def indent(self) -> Union[int, None]:
+        return self.__indent
+
+    def dumps(self, stix_object) -> str:
+        """
+        Serialises a STIX object with the indentation it gets in a bundle.
+        """
+        serialized = self.__dumps(stix_object)
+        if self.__object_indentation:
+            return serialized.replace('\n', f'\n{self.__object_indentation}')
+        return serialized
+
+    def frame(self, bundle_args: dict) -> tuple:
+        """
+        Returns the header, separator and footer surrounding the objects of
+        a bundle with the given bundle fields.
+        """
+        return tuple(
+            self.__dumps(
+                {**bundle_args, 'objects': [None, None]}
+            ).split(_PLACEHOLDER)
+        )
+
+    def serialize_bundle(self, bundle_args: dict) -> str:
+        return self.__dumps(bundle_args)
+
+    def __json_dumps(self, content) -> str:
+        return json.dumps(content, cls=STIXJSONEncoder, indent=self.__indent)
+
+    def __orjson_default(self, value):
+        if isinstance(value, dict):
+            return dict(value)
+        if isinstance(value, list):
+            return list(value)
+        if isinstance(value, str):
+            return str(value)
+        return self.__encoder.default(value)
+
+    def __orjson_dumps(self, content) -> str:
+        return self.__orjson.dumps(
+            content, default=self.__orjson_default, option=self.__options
+        ).decode()
+
+
+class STIX2BundleWriter:
+    """
+    Writes a STIX 2 bundle incrementally: the STIX objects are serialised
+    and written one at a time, as they are given, so the complete bundle
+    is never held in memory.
+    The bundle header is written with the first object, the bundle id can
+    then be defined until then - a random one is generated otherwise.
+    """
+
+    def __init__(self, output: Union[Path, str, TextIO],
+                 version: Optional[str] = '2.1',
+                 bundle_id: Optional[str] = None,
+                 indent: Optional[int] = 4,
+                 json_backend: Optional[str] = 'json'):
+        self.__serializer = STIX2JSONSerializer(indent, json_backend)
+        if isinstance(output, (Path, str)):
+            self.__file = open_file(output, 'wt')
+            self.__close_file = True
+        else:
+            self.__file = output
+            self.__close_file = False
+        self.__bundle_id = bundle_id
+        self.__version = version
+        self.__count = 0
+        self.__separator = None
+        self.__footer = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        if exc_type is None:
+            self.close()
+        elif self.__close_file:
+            self.__file.close()
+
+    @property
+    def bundle_id(self) -> Union[str, None]:
+        return self.__bundle_id
+
+    @bundle_id.setter
+    def bundle_id(self, bundle_id: str):
+        if self.__separator is not None:
+            raise ValueError(
+                'The bundle id cannot be changed once the bundle header is '
+                'written.'
+            )
+        self.__bundle_id = bundle_id
+
+    @property
+    def count(self) -> int:
+        return self.__count
+
+    @property
+    def serializer(self) -> STIX2JSONSerializer:
+        return self.__serializer
+
+    def close(self):
+        if self.__separator is None:
+            self.__file.write(
+                self.__serializer.serialize_bundle(self.__bundle_args())
+            )
+        else:
+            self.__file.write(self.__footer)
+        if self.__close_file:
+            self.__file.close()
+
+    def write(self, stix_object):
+        self.write_serialized(self.__serializer.dumps(stix_object))
+
+    def write_objects(self, stix_objects: Iterable):
+        for stix_object in stix_objects:
+            self.write(stix_object)
+
+    def write_serialized(self, serialized: str):
+        """
+        Writes a STIX object already serialised with the `dumps` method of
+        a STIX2JSONSerializer using the same indentation and JSON backend.
+        """
+        if self.__separator is None:
+            header, self.__separator, self.__footer = self.__serializer.frame(
+                self.__bundle_args()
+            )
+            self.__file.write(f'{header}{serialized}')
+        else:
+            self.__file.write(f'{self.__separator}{serialized}')
+        self.__count += 1
+
+    def __bundle_args(self) -> dict:
+        if self.__bundle_id is None:
+            self.__bundle_id = f'bundle--{uuid4()}'
+        bundle_args = {'type': 'bundle', 'id': self.__bundle_id}
+        if self.__version == '2.0':
+            bundle_args['spec_version'] = '2.0'
+        return bundle_args
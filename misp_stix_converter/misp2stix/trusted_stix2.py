@@ -0,0 +1,269 @@
+# -*- coding: utf-8 -*-
+#!/usr/bin/env python3
+
+import json
+from stix2.base import _Observable, _STIXBase, STIXJSONEncoder
+from stix2.properties import (
+    BinaryProperty, BooleanProperty, DictionaryProperty,
+    EmbeddedObjectProperty, ExtensionsProperty, FloatProperty, HashesProperty,
+    HexProperty, IDProperty, IntegerProperty, ListProperty,
+    ObservableProperty, ReferenceProperty, STIXObjectProperty, StringProperty,
+    TypeProperty)
+from stix2.registry import class_for_type
+from stix2.utils import NOW, get_timestamp
+from typing import Callable, Optional
+
+# Constructor flags of the python-stix2 objects, not STIX properties
+_CONSTRUCTION_FLAGS = ('_valid_refs', 'allow_custom', 'interoperability')
+_NO_DEFAULT = object()
+_STRING_PROPERTIES = (
+    BinaryProperty, HexProperty, IDProperty, ReferenceProperty,
+    StringProperty, TypeProperty
+)
+
+
+class TrustedSTIX2ValidationError(Exception):
+    pass
+
+
+class TrustedSTIX2Object(dict):
+    """
+    STIX 2 object built as a plain dict, with the properties order and the
+    values python-stix2 would give it, but without any validation.
+    Properties are also accessible as attributes, and the object serialises
+    the same way as the python-stix2 one.
+    """
+    __slots__ = ()
+
+    def __getattr__(self, name: str):
+        try:
+            return self[name]
+        except KeyError:
+            raise AttributeError(
+                f"'{self.get('type', 'STIX')}' object has no attribute "
+                f"'{name}'"
+            ) from None
+
+    def serialize(self, **kwargs) -> str:
+        return json.dumps(self, cls=STIXJSONEncoder, **kwargs)
+
+
+class TrustedSTIX2Factory:
+    """
+    Builds TrustedSTIX2Object instances from the same arguments as the
+    python-stix2 classes.
+    Values already in the form python-stix2 would give them are kept as is,
+    any other value is cleaned by the property itself, so the result is the
+    one of the python-stix2 object, validation apart.
+    With a `validation_rate`, that share of the created objects is also built
+    with python-stix2, raising the validation errors and checking both
+    objects serialise the same way.
+    """
+    __plans: dict = {}
+
+    def __init__(self, validation_rate: Optional[float] = 0.0):
+        if not 0 <= validation_rate <= 1:
+            raise ValueError(
+                f'Invalid validation rate: {validation_rate} - it should be '
+                'between 0 and 1.'
+            )
+        self.__validation_rate = validation_rate
+        self.__validation_credit = 0.0
+
+    def create(self, stix_class: type, stix_args: dict):
+        if self.__requires_stix2_object(stix_class, stix_args):
+            return stix_class(**stix_args)
+        stix_object = self.__build(stix_class, stix_args)
+        if self.__validation_rate:
+            self.__validation_credit += self.__validation_rate
+            if self.__validation_credit >= 1:
+                self.__validation_credit -= 1
+                self.__validate(stix_class, stix_args, stix_object)
+        return stix_object
+
+    @classmethod
+    def __build(cls, stix_class: type, stix_args: dict) -> TrustedSTIX2Object:
+        stix_object = TrustedSTIX2Object()
+        now = None
+        for name, prop, convert, omitted_value in cls.__get_plan(stix_class):
+            value = stix_args.get(name)
+            if value is None or (isinstance(value, list) and not value):
+                if not hasattr(prop, 'default'):
+                    continue
+                value = prop.default()
+                if value == NOW:
+                    # Cleaned, as the timestamps precision may be constrained
+                    if now is None:
+                        now = get_timestamp()
+                    value = convert(now)
+            elif convert is not None:
+                value = convert(value)
+            if omitted_value is not _NO_DEFAULT and value == omitted_value:
+                continue
+            stix_object[name] = value
+        for name in sorted(stix_args.keys() - stix_class._properties.keys()):
+            value = stix_args[name]
+            if name in _CONSTRUCTION_FLAGS or value is None or value == []:
+                continue
+            stix_object[name] = value
+        return stix_object
+
+    @classmethod
+    def __get_plan(cls, stix_class: type) -> tuple:
+        try:
+            return cls.__plans[stix_class]
+        except KeyError:
+            plan = tuple(
+                (
+                    name, prop, cls.__get_converter(prop),
+                    cls.__get_omitted_value(prop)
+                ) for name, prop in stix_class._properties.items()
+            )
+            cls.__plans[stix_class] = plan
+            return plan
+
+    @staticmethod
+    def __get_omitted_value(prop):
+        # Optional properties with their default value are left out, like
+        # python-stix2 does when serialising - ids and timestamps defaults
+        # are never the same twice
+        omittable = (
+            not prop.required and not hasattr(prop, '_fixed_value') and
+            hasattr(prop, 'default') and not isinstance(prop, IDProperty)
+        )
+        if omittable:
+            default = prop.default()
+            if default != NOW:
+                return default
+        return _NO_DEFAULT
+
+    @classmethod
+    def __get_converter(cls, prop) -> Optional[Callable]:
+        if isinstance(prop, _STRING_PROPERTIES):
+            return cls.__typed_converter(prop, str)
+        if isinstance(prop, BooleanProperty):
+            return cls.__typed_converter(prop, bool)
+        if isinstance(prop, IntegerProperty):
+            return cls.__typed_converter(prop, int)
+        if isinstance(prop, FloatProperty):
+            return cls.__typed_converter(prop, float)
+        if isinstance(prop, HashesProperty):
+            return cls.__clean_converter(prop)
+        if isinstance(prop, DictionaryProperty):
+            return cls.__typed_converter(prop, dict)
+        if isinstance(prop, STIXObjectProperty):
+            return None
+        if isinstance(prop, EmbeddedObjectProperty):
+            return cls.__embedded_converter(prop.type)
+        if isinstance(prop, ListProperty):
+            if isinstance(prop.contained, STIXObjectProperty):
+                convert = cls.__stix_object_converter(prop.contained)
+                return lambda values: cls.__convert_list(values, convert)
+            if isinstance(prop.contained, EmbeddedObjectProperty):
+                convert = cls.__embedded_converter(prop.contained.type)
+            elif isinstance(prop.contained, type):
+                convert = cls.__embedded_converter(prop.contained)
+            else:
+                convert = cls.__get_converter(prop.contained)
+            return lambda values: cls.__convert_list(values, convert)
+        if isinstance(prop, ExtensionsProperty):
+            return lambda extensions: cls.__convert_extensions(
+                extensions, prop.spec_version
+            )
+        if isinstance(prop, ObservableProperty):
+            return cls.__convert_observables
+        return cls.__clean_converter(prop)
+
+    @staticmethod
+    def __clean_converter(prop) -> Callable:
+        def convert(value):
+            return prop.clean(value, True)[0]
+        return convert
+
+    @classmethod
+    def __convert_extensions(cls, extensions: dict, spec_version: str) -> dict:
+        converted = {}
+        for key, extension in extensions.items():
+            extension_class = class_for_type(key, spec_version, 'extensions')
+            if extension_class is not None:
+                extension = cls.__convert_embedded(extension_class, extension)
+            converted[key] = extension
+        return converted
+
+    @classmethod
+    def __convert_embedded(cls, stix_class: type, value):
+        if isinstance(value, (_STIXBase, TrustedSTIX2Object)):
+            return value
+        return cls.__build(stix_class, value)
+
+    @staticmethod
+    def __convert_list(values, convert: Optional[Callable]) -> list:
+        if isinstance(values, (str, _STIXBase, TrustedSTIX2Object)):
+            values = [values]
+        if convert is None:
+            return list(values)
+        return [convert(value) for value in values]
+
+    @classmethod
+    def __convert_observables(cls, observables: dict) -> dict:
+        converted = {}
+        for key, observable in observables.items():
+            if isinstance(observable, dict):
+                observable_class = class_for_type(
+                    observable.get('type'), '2.0', 'observables'
+                )
+                if observable_class is not None:
+                    observable = cls.__convert_embedded(
+                        observable_class, observable
+                    )
+            converted[key] = observable
+        return converted
+
+    @classmethod
+    def __embedded_converter(cls, stix_class: type) -> Callable:
+        return lambda value: cls.__convert_embedded(stix_class, value)
+
+    @staticmethod
+    def __requires_stix2_object(stix_class: type, stix_args: dict) -> bool:
+        # STIX 2.1 observables without id get a deterministic one, and
+        # top-level property extensions change the properties order
+        if issubclass(stix_class, _Observable):
+            if 'id' in stix_class._properties and 'id' not in stix_args:
+                return True
+        return any(
+            extension.get('extension_type') == 'toplevel-property-extension'
+            for extension in stix_args.get('extensions', {}).values()
+            if isinstance(extension, dict)
+        )
+
+    @staticmethod
+    def __stix_object_converter(prop) -> Callable:
+        # Objects coming as plain dicts (i.e. from the MITRE CTI repository)
+        # are parsed like python-stix2 does, to keep their properties order
+        def convert(value):
+            if isinstance(value, (_STIXBase, TrustedSTIX2Object)):
+                return value
+            return prop.clean(value, True)[0]
+        return convert
+
+    @staticmethod
+    def __typed_converter(prop, value_type: type) -> Callable:
+        def convert(value):
+            if type(value) is value_type:
+                return value
+            return prop.clean(value, True)[0]
+        return convert
+
+    @staticmethod
+    def __validate(stix_class: type, stix_args: dict,
+                   stix_object: TrustedSTIX2Object):
+        args = {**stix_object, 'allow_custom': True}
+        for flag in ('_valid_refs', 'interoperability'):
+            if flag in stix_args:
+                args[flag] = stix_args[flag]
+        validated = json.dumps(stix_class(**args), cls=STIXJSONEncoder)
+        if validated != stix_object.serialize():
+            raise TrustedSTIX2ValidationError(
+                f'The trusted {stix_class.__name__} object with id '
+                f"{stix_object.get('id')} differs from the python-stix2 one."
+            )
@@ -3,46 +3,54 @@
 
 import json
 import os
+import signal
+import socket
+import socketserver
+import sqlite3
 import sys
 import urllib3
-from .misp2stix.framing import (
-    _stix1_attributes_framing, _stix1_framing, _handle_namespaces,
-    _create_stix_package)
-from .misp2stix.misp_to_stix1 import (
-    MISPtoSTIX1AttributesParser, MISPtoSTIX1EventsParser)
-from .misp2stix.misp_to_stix20 import MISPtoSTIX20Parser
-from .misp2stix.misp_to_stix21 import MISPtoSTIX21Parser
+from .file_compression import compressed_filename, open_file
 from .misp2stix.stix1_mapping import NS_DICT, SCHEMALOC_DICT
-from .stix2misp.external_stix1_to_misp import ExternalSTIX1toMISPParser
-from .stix2misp.external_stix2_to_misp import ExternalSTIX2toMISPParser
+from .misp2stix.stix2_cache import STIX2ResultCache
+from .misp2stix.stix2_writer import STIX2BundleWriter, STIX2JSONSerializer
+from .stix2misp.exceptions import UnavailableGalaxyResourcesError
 from .stix2misp.importparser import (
-    _load_stix1_package, _load_stix2_content, MISP_org_uuid)
-from .stix2misp.internal_stix1_to_misp import InternalSTIX1toMISPParser
-from .stix2misp.internal_stix2_to_misp import InternalSTIX2toMISPParser
+    _is_stix2_object_from_misp, _load_stix1_package, _load_stix2_content,
+    MISP_org_uuid, STIX2BundleReader)
 from collections import defaultdict
-from cybox.core.observable import Observables
+from contextlib import nullcontext, redirect_stdout
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from functools import partial
+from io import StringIO
 from mixbox import idgen
 from mixbox.namespaces import (
     Namespace, NamespaceNotFoundError, register_namespace)
 from pathlib import Path
 from pymisp import MISPEvent, PyMISP, PyMISPError
-from stix.core import (
-    Campaigns, CoursesOfAction, Indicators, ThreatActors, STIXPackage)
-from stix.core.ttps import TTPs
-from stix2.base import STIXJSONEncoder
-from stix2.v20 import Bundle as Bundle_v20
-from stix2.v21 import Bundle as Bundle_v21
-from typing import List, Optional, Union
+from pymisp.exceptions import MISPServerError
+from requests.adapters import HTTPAdapter
+from requests.exceptions import ConnectionError as HTTPConnectionError, Timeout
+from time import sleep
+from typing import (
+    Callable, IO, Iterable, Iterator, List, Optional, TYPE_CHECKING, Union)
 from uuid import uuid4
 
+# The STIX 1 libraries and the different parsers are imported where they are
+# used, so each conversion only loads the libraries it needs
+if TYPE_CHECKING:
+    from cybox.core.observable import Observables
+    from stix.core import (
+        Campaigns, CoursesOfAction, Indicators, ThreatActors, STIXPackage)
+    from stix.core.ttps import TTPs
+
 urllib3.disable_warnings()
 _cybox_features = (
     'cybox_major_version', 'cybox_minor_version', 'cybox_update_version'
 )
 _default_namespace = 'https://misp-project.org'
 _default_org = 'MISP'
+_contents_type = Union[bytes, dict, IO]
 _files_type = Union[Path, str]
-_MISP_STIX_tags = ('misp:tool="MISP-STIX-Converter"', 'misp:tool="misp2stix2"')
 _STIX1_default_format = 'xml'
 _STIX1_default_version = '1.1.1'
 _STIX1_features = (
@@ -52,8 +60,8 @@ _STIX1_features = (
 _STIX1_valid_formats = ('json', 'xml')
 _STIX1_valid_versions = ('1.1.1', '1.2')
 _STIX2_default_version = '2.1'
-_STIX2_event_types = ('grouping', 'report')
 _STIX2_valid_versions = ('2.0', '2.1')
+_UPLOAD_BACKOFF = 0.5
 
 
 ################################################################################
@@ -258,11 +266,15 @@ def misp_attribute_collection_to_stix1(
         in_memory: Optional[bool] = False,
         single_output: Optional[bool] = False,
         output_dir: Optional[_files_type] = None,
-        output_name: Optional[_files_type] = None) -> dict:
+        output_name: Optional[_files_type] = None,
+        compress: Optional[str] = None) -> dict:
     if return_format not in _STIX1_valid_formats:
         return_format = _STIX1_default_format
     if version not in _STIX1_valid_versions:
         version = _STIX1_default_version
+    from .misp2stix.framing import (
+        _create_stix_package, _stix1_attributes_framing)
+    from .misp2stix.misp_to_stix1 import MISPtoSTIX1AttributesParser
     parser = MISPtoSTIX1AttributesParser(org, version)
     if len(input_files) == 1:
         try:
@@ -271,7 +283,8 @@ def misp_attribute_collection_to_stix1(
                 filename = Path(filename).resolve()
             parser.parse_json_content(filename)
             name = _check_filename(
-                filename.parent, f'{filename.name}.out', output_dir, output_name
+                filename.parent, f'{filename.name}.out', output_dir,
+                output_name, compress
             )
             _write_raw_stix(
                 parser.stix_package, name, namespace, org, return_format
@@ -285,7 +298,7 @@ def misp_attribute_collection_to_stix1(
         name = _check_filename(
             Path(__file__).resolve().parent / 'tmp',
             f'{stix_package.id_}.stix1.{return_format}',
-            output_dir, output_name
+            output_dir, output_name, compress
         )
         if in_memory:
             for filename in input_files:
@@ -343,7 +356,7 @@ def misp_attribute_collection_to_stix1(
             header, _, footer = _stix1_attributes_framing(
                 namespace, org, return_format, stix_package
             )
-            with open(name, 'wt', encoding='utf-8') as result:
+            with open_file(name, 'wt') as result:
                 result.write(header)
                 actual_features = handler.features
                 for feature in actual_features:
@@ -366,7 +379,7 @@ def misp_attribute_collection_to_stix1(
                 filename = Path(filename).resolve()
             parser.parse_json_content(filename)
             name = _check_output(
-                filename.parent, f'{filename.name}.out', output_dir
+                filename.parent, f'{filename.name}.out', output_dir, compress
             )
             _write_raw_stix(
                 parser.stix_package, name, namespace, org, return_format
@@ -388,12 +401,15 @@ def misp_event_collection_to_stix1(
         in_memory: Optional[bool] = False,
         single_output: Optional[bool] = False,
         output_dir: Optional[_files_type] = None,
-        output_name: Optional[_files_type] = None) -> dict:
+        output_name: Optional[_files_type] = None,
+        compress: Optional[str] = None) -> dict:
     if return_format not in _STIX1_valid_formats:
         return_format = _STIX1_default_format
     if version not in _STIX1_valid_versions:
         version = _STIX1_default_version
     _write_args = (namespace, org, return_format)
+    from .misp2stix.framing import _create_stix_package, _stix1_framing
+    from .misp2stix.misp_to_stix1 import MISPtoSTIX1EventsParser
     parser = MISPtoSTIX1EventsParser(org, version)
     if len(input_files) == 1:
         filename = input_files[0]
@@ -402,7 +418,8 @@ def misp_event_collection_to_stix1(
                 filename = Path(filename).resolve()
             parser.parse_json_content(filename)
             name = _check_filename(
-                filename.parent, f'{filename.name}.out', output_dir, output_name
+                filename.parent, f'{filename.name}.out', output_dir,
+                output_name, compress
             )
             _write_raw_stix(parser.stix_package, name, *_write_args)
             return _generate_traceback(debug, parser, name)
@@ -414,7 +431,7 @@ def misp_event_collection_to_stix1(
         name = _check_filename(
             Path(__file__).resolve().parent / 'tmp',
             f'{stix_package.id_}.stix1.{return_format}',
-            output_dir, output_name
+            output_dir, output_name, compress
         )
         if in_memory:
             for filename in input_files:
@@ -433,30 +450,51 @@ def misp_event_collection_to_stix1(
                 _write_raw_stix(stix_package, name, *_write_args)
                 traceback.update(_generate_traceback(debug, parser, name))
             return traceback
+        if return_format == 'xml':
+            from .misp2stix.framing import _handle_namespaces
+            from .misp2stix.stix1_writer import STIX1XMLWriter
+            namespaces = _handle_namespaces(namespace, org)
+            # Events are written as they are converted, the related packages
+            # of the output package are never held in memory
+            with STIX1XMLWriter(name, stix_package, namespaces) as writer:
+                for filename in input_files:
+                    try:
+                        if not isinstance(filename, Path):
+                            filename = Path(filename).resolve()
+                        parser.write_json_content(filename, writer)
+                    except Exception as exception:
+                        traceback['fails'].append(
+                            f'{filename} - {exception.__str__()}'
+                        )
+            traceback.update(_generate_traceback(debug, parser, name))
+            return traceback
         header, separator, footer = _stix1_framing(
             namespace, org, return_format, stix_package
         )
-        filename = input_files[0]
-        try:
-            if not isinstance(filename, Path):
-                filename = Path(filename).resolve()
-            parser.parse_json_content(filename)
-            content = _get_events(parser.stix_package, return_format)
-            with open(name, 'wt', encoding='utf-8') as f:
-                f.write(f'{header}{content}')
-        except Exception as exception:
-            traceback['fails'].append(filename)
-        for filename in input_files[1:]:
+        # The output is written as a single stream, compressed files cannot
+        # always be appended to
+        with open_file(name, 'wt') as f:
+            filename = input_files[0]
             try:
                 if not isinstance(filename, Path):
                     filename = Path(filename).resolve()
                 parser.parse_json_content(filename)
                 content = _get_events(parser.stix_package, return_format)
-                with open(name, 'at', encoding='utf-8') as f:
-                    f.write(f'{separator}{content}')
+                f.write(f'{header}{content}')
             except Exception as exception:
-                traceback['fails'].append(f'{filename} - {exception.__str__()}')
-        with open(name, 'at', encoding='utf-8') as f:
+                f.write(header)
+                traceback['fails'].append(filename)
+            for filename in input_files[1:]:
+                try:
+                    if not isinstance(filename, Path):
+                        filename = Path(filename).resolve()
+                    parser.parse_json_content(filename)
+                    content = _get_events(parser.stix_package, return_format)
+                    f.write(f'{separator}{content}')
+                except Exception as exception:
+                    traceback['fails'].append(
+                        f'{filename} - {exception.__str__()}'
+                    )
             f.write(footer)
         traceback.update(_generate_traceback(debug, parser, name))
         return traceback
@@ -467,7 +505,7 @@ def misp_event_collection_to_stix1(
                 filename = Path(filename).resolve()
             parser.parse_json_content(filename)
             name = _check_output(
-                filename.parent, f'{filename.name}.out', output_dir
+                filename.parent, f'{filename.name}.out', output_dir, compress
             )
             _write_raw_stix(parser.stix_package, name, *_write_args)
             output_names.append(name)
@@ -484,21 +522,46 @@ def misp_collection_to_stix2(
         in_memory: Optional[bool] = False,
         single_output: Optional[bool] = False,
         output_dir: Optional[_files_type] = None,
-        output_name: Optional[_files_type] = None) -> dict:
+        output_name: Optional[_files_type] = None,
+        workers: Optional[int] = 1, trusted: Optional[bool] = False,
+        validation_rate: Optional[float] = 0.0, indent: Optional[int] = 4,
+        json_backend: Optional[str] = 'json',
+        compress: Optional[str] = None,
+        cache: Optional[STIX2ResultCache] = None) -> dict:
     if version not in _STIX2_valid_versions:
         version = _STIX2_default_version
-    parser = MISPtoSTIX21Parser() if version == '2.1' else MISPtoSTIX20Parser()
+    writer_args = {
+        'version': version, 'indent': indent, 'json_backend': json_backend
+    }
+    if workers is not None and workers > 1 and len(input_files) > 1:
+        return _misp_collection_to_stix2_in_parallel(
+            *input_files, debug=debug, in_memory=in_memory,
+            single_output=single_output,
+            output_dir=output_dir, output_name=output_name, workers=workers,
+            trusted=trusted, validation_rate=validation_rate,
+            compress=compress, cache=cache, **writer_args
+        )
+    try:
+        parser = _get_misp_to_stix2_parser(
+            version, trusted, validation_rate, cache
+        )
+    except ValueError as exception:
+        return {
+            'fails': [
+                f'{filename} - {exception.__str__()}'
+                for filename in input_files
+            ]
+        }
     if len(input_files) == 1:
         filename = input_files[0]
         try:
             if not isinstance(filename, Path):
                 filename = Path(filename).resolve()
-            parser.parse_json_content(filename)
             name = _check_filename(
-                filename.parent, f'{filename.name}.out', output_dir, output_name
+                filename.parent, f'{filename.name}.out', output_dir,
+                output_name, compress
             )
-            with open(name, 'wt', encoding='utf-8') as f:
-                f.write(parser.bundle.serialize(indent=4))
+            _write_stix2_bundle(parser, filename, name, **writer_args)
             return _generate_traceback(debug, parser, name)
         except Exception as exception:
             return {'fails': [f'{filename} - {exception.__str__()}']}
@@ -518,66 +581,46 @@ def misp_collection_to_stix2(
                     Path(__file__).resolve().parents[1] / 'tmp',
                     f"{bundle.id.split('--')[1]}.stix"
                     f"{version.replace('.', '')}.json",
-                    output_dir, output_name
+                    output_dir, output_name, compress
                 )
-                with open(name, 'wt', encoding='utf-8') as f:
-                    f.write(bundle.serialize(indent=4))
+                writer = STIX2BundleWriter(
+                    name, bundle_id=bundle.id, **writer_args
+                )
+                with writer:
+                    writer.write_objects(bundle.objects)
                 traceback.update(_generate_traceback(debug, parser, name))
             return traceback
-        bundle = Bundle_v21() if version == '2.1' else Bundle_v20()
+        bundle_id = f'bundle--{uuid4()}'
         name = _check_filename(
             Path(__file__).resolve().parents[1] / 'tmp',
-            f"{bundle.id.split('--')[1]}.stix{version.replace('.', '')}.json",
-            output_dir, output_name
+            f"{bundle_id.split('--')[1]}.stix{version.replace('.', '')}.json",
+            output_dir, output_name, compress
         )
-        with open(name, 'wt', encoding='utf-8') as f:
-            f.write(f'{bundle.serialize(indent=4)[:-2]},\n    "objects": [\n')
-        written = False
-        try:
-            filename = input_files[0]
-            if not isinstance(filename, Path):
-                filename = Path(filename).resolve()
-            parser.parse_json_content(filename)
-            stix_objects = json.dumps(
-                [parser.fetch_stix_objects], cls=STIXJSONEncoder, indent=4
-            )
-            with open(name, 'at', encoding='utf-8') as f:
-                f.write(stix_objects[8:-8])
-            written = True
-        except Exception as exception:
-            traceback['fails'].append(f'{filename} - {exception.__str__()}')
-        for filename in input_files[1:]:
-            try:
-                if not isinstance(filename, Path):
-                    filename = Path(filename).resolve()
-                parser.parse_json_content(filename)
-                stix_objects = json.dumps(
-                    [parser.fetch_stix_objects], cls=STIXJSONEncoder, indent=4
-                )
-                separator = ',\n' if written else ''
-                with open(name, 'at', encoding='utf-8') as f:
-                    f.write(f"{separator}{stix_objects[8:-8]}")
-                written = True
-            except Exception as exception:
-                traceback['fails'].append(f'{filename} - {exception.__str__()}')
-        if written:
-            with open(name, 'at', encoding='utf-8') as f:
-                f.write('\n    ]\n}')
+        writer = STIX2BundleWriter(name, bundle_id=bundle_id, **writer_args)
+        with writer:
+            for filename in input_files:
+                try:
+                    if not isinstance(filename, Path):
+                        filename = Path(filename).resolve()
+                    parser.write_json_content(filename, writer)
+                except Exception as exception:
+                    traceback['fails'].append(
+                        f'{filename} - {exception.__str__()}'
+                    )
+        if writer.count:
             traceback.update(_generate_traceback(debug, parser, name))
         else:
-            name.remove()
+            os.remove(name)
         return traceback
     output_names = []
     for filename in input_files:
         try:
             if not isinstance(filename, Path):
                 filename = Path(filename).resolve()
-            parser.parse_json_content(filename)
             name = _check_output(
-                filename.parent, f'{filename.name}.out', output_dir
+                filename.parent, f'{filename.name}.out', output_dir, compress
             )
-            with open(name, 'wt', encoding='utf-8') as f:
-                f.write(parser.bundle.serialize(indent=4))
+            _write_stix2_bundle(parser, filename, name, **writer_args)
             output_names.append(name)
         except Exception as exception:
             traceback['fails'].append(f'{filename} - {exception.__str__()}')
@@ -593,18 +636,21 @@ def misp_to_stix1(
         org: Optional[str] = _default_org,
         version: Optional[str] = _STIX1_default_version,
         output_dir: Optional[_files_type] = None,
-        output_name: Optional[_files_type] = None) -> dict:
+        output_name: Optional[_files_type] = None,
+        compress: Optional[str] = None) -> dict:
     if return_format not in _STIX1_valid_formats:
         return_format = _STIX1_default_format
     if version not in _STIX1_valid_versions:
         version = _STIX1_default_version
+    from .misp2stix.misp_to_stix1 import MISPtoSTIX1EventsParser
     parser = MISPtoSTIX1EventsParser(org, version)
     try:
         if not isinstance(filename, Path):
             filename = Path(filename).resolve()
         parser.parse_json_content(filename)
         name = _check_filename(
-            filename.parent, f'{filename.name}.out', output_dir, output_name
+            filename.parent, f'{filename.name}.out', output_dir,
+            output_name, compress
         )
         _write_raw_stix(
             parser.stix_package, name, namespace, org, return_format
@@ -617,24 +663,208 @@ def misp_to_stix1(
 def misp_to_stix2(filename: _files_type, debug: Optional[bool] = False,
                   version: Optional[str] = _STIX2_default_version,
                   output_dir: Optional[_files_type] = None,
-                  output_name: Optional[_files_type] = None) -> dict:
+                  output_name: Optional[_files_type] = None,
+                  trusted: Optional[bool] = False,
+                  validation_rate: Optional[float] = 0.0,
+                  indent: Optional[int] = 4,
+                  json_backend: Optional[str] = 'json',
+                  compress: Optional[str] = None,
+                  cache: Optional[STIX2ResultCache] = None) -> dict:
     if version not in _STIX2_valid_versions:
         version = _STIX2_default_version
-    parser = MISPtoSTIX21Parser() if version == '2.1' else MISPtoSTIX20Parser()
     try:
+        parser = _get_misp_to_stix2_parser(
+            version, trusted, validation_rate, cache
+        )
         if not isinstance(filename, Path):
             filename = Path(filename).resolve()
-        parser.parse_json_content(filename)
         name = _check_filename(
-            filename.parent, f'{filename.name}.out', output_dir, output_name
+            filename.parent, f'{filename.name}.out', output_dir,
+            output_name, compress
+        )
+        _write_stix2_bundle(
+            parser, filename, name, version=version, indent=indent,
+            json_backend=json_backend
         )
-        with open(name, 'wt', encoding='utf-8') as f:
-            f.write(json.dumps(parser.bundle, cls=STIXJSONEncoder, indent=4))
         return _generate_traceback(debug, parser, name)
     except Exception as exception:
         return {'fails': [f'{filename} - {exception.__str__()}']}
 
 
+class _STIX2ExportMessages:
+    def __init__(self):
+        self.__errors = defaultdict(list)
+        self.__warnings = defaultdict(list)
+
+    @property
+    def errors(self) -> dict:
+        return self.__errors
+
+    @property
+    def warnings(self) -> dict:
+        return self.__warnings
+
+    def update(self, result: dict):
+        for identifier, errors in result['errors'].items():
+            self.__errors[identifier].extend(errors)
+        for identifier, warnings in result['warnings'].items():
+            self.__warnings[identifier].extend(warnings)
+
+
+def _fetch_stix2_objects_from_file(
+        filename: Path, version: str, trusted: bool, validation_rate: float,
+        indent: Union[int, None], json_backend: str,
+        cache_args: Union[tuple, None]) -> dict:
+    serializer = STIX2JSONSerializer(indent, json_backend)
+    try:
+        with _open_stix2_cache(cache_args) as cache:
+            parser = _get_misp_to_stix2_parser(
+                version, trusted, validation_rate, cache
+            )
+            parser.parse_json_content(filename)
+        return {
+            'errors': dict(parser.errors), 'warnings': parser.warnings,
+            'objects': [
+                (
+                    stix_object['id'], stix_object['type'],
+                    serializer.dumps(stix_object)
+                ) for stix_object in parser.stix_objects
+            ],
+            'unique_ids': list(parser.unique_ids.values())
+        }
+    except Exception as exception:
+        return {'fails': f'{filename} - {exception.__str__()}'}
+
+
+def _misp_collection_to_stix2_in_parallel(
+        *input_files: List[_files_type], debug: bool, version: str,
+        in_memory: bool, single_output: bool,
+        output_dir: Union[_files_type, None],
+        output_name: Union[_files_type, None], workers: int,
+        trusted: bool, validation_rate: float, indent: Union[int, None],
+        json_backend: str, compress: Union[str, None],
+        cache: Union[STIX2ResultCache, None]) -> dict:
+    # Each worker process opens its own connection to the cache
+    cache_args = None if cache is None else (cache.path, cache.max_size)
+    input_files = [
+        filename if isinstance(filename, Path) else Path(filename).resolve()
+        for filename in input_files
+    ]
+    traceback = defaultdict(list)
+    messages = _STIX2ExportMessages()
+    if not single_output:
+        method = partial(
+            _write_stix2_bundle_from_file, version=version,
+            output_dir=output_dir, trusted=trusted,
+            validation_rate=validation_rate, indent=indent,
+            json_backend=json_backend, compress=compress,
+            cache_args=cache_args
+        )
+        output_names = []
+        for result in _process_files_in_parallel(method, input_files, workers):
+            if 'fails' in result:
+                traceback['fails'].append(result['fails'])
+                continue
+            messages.update(result)
+            output_names.append(result['name'])
+        if output_names:
+            traceback.update(
+                _generate_traceback(debug, messages, *output_names)
+            )
+        return traceback
+    bundle_id = f'bundle--{uuid4()}'
+    name = _check_filename(
+        Path(__file__).resolve().parents[1] / 'tmp',
+        f"{bundle_id.split('--')[1]}.stix{version.replace('.', '')}.json",
+        output_dir, output_name, compress
+    )
+    method = partial(
+        _fetch_stix2_objects_from_file, version=version, trusted=trusted,
+        validation_rate=validation_rate, indent=indent,
+        json_backend=json_backend, cache_args=cache_args
+    )
+    stix_objects = _merge_stix2_objects_from_workers(
+        _process_files_in_parallel(method, input_files, workers),
+        traceback, messages
+    )
+    if in_memory:
+        # Every worker result is gathered before the bundle is written
+        stix_objects = list(stix_objects)
+    with STIX2BundleWriter(
+            name, version=version, bundle_id=bundle_id, indent=indent,
+            json_backend=json_backend) as writer:
+        for stix_object in stix_objects:
+            writer.write_serialized(stix_object)
+    if writer.count:
+        traceback.update(_generate_traceback(debug, messages, name))
+    else:
+        os.remove(name)
+    return traceback
+
+
+def _merge_stix2_objects_from_workers(
+        results: Iterable[dict], traceback: defaultdict,
+        messages: _STIX2ExportMessages) -> Iterator[str]:
+    unique_ids = set()
+    for result in results:
+        if 'fails' in result:
+            traceback['fails'].append(result['fails'])
+            continue
+        messages.update(result)
+        # Identities, marking definitions and galaxy related objects are
+        # shared between events and must appear only once in the bundle
+        shared_ids = set(result['unique_ids'])
+        for object_id, object_type, stix_object in result['objects']:
+            shared = (
+                object_id in shared_ids or object_type == 'marking-definition'
+            )
+            if shared:
+                if object_id in unique_ids:
+                    continue
+                unique_ids.add(object_id)
+            yield stix_object
+
+
+def _write_stix2_bundle(
+        parser, filename: Path, name: Path, version: str,
+        indent: Union[int, None], json_backend: str):
+    try:
+        with STIX2BundleWriter(
+                name, version=version, indent=indent,
+                json_backend=json_backend) as writer:
+            parser.write_json_content(filename, writer)
+    except Exception:
+        # No partial bundle is left behind
+        if name.exists():
+            os.remove(name)
+        raise
+
+
+def _write_stix2_bundle_from_file(
+        filename: Path, version: str, output_dir: Union[_files_type, None],
+        trusted: bool, validation_rate: float, indent: Union[int, None],
+        json_backend: str, compress: Union[str, None],
+        cache_args: Union[tuple, None]) -> dict:
+    try:
+        name = _check_output(
+            filename.parent, f'{filename.name}.out', output_dir, compress
+        )
+        with _open_stix2_cache(cache_args) as cache:
+            parser = _get_misp_to_stix2_parser(
+                version, trusted, validation_rate, cache
+            )
+            _write_stix2_bundle(
+                parser, filename, name, version=version, indent=indent,
+                json_backend=json_backend
+            )
+        return {
+            'errors': dict(parser.errors), 'warnings': parser.warnings,
+            'name': name
+        }
+    except Exception as exception:
+        return {'fails': f'{filename} - {exception.__str__()}'}
+
+
 ################################################################################
 #                         STIX to MISP MAIN FUNCTIONS.                         #
 ################################################################################
@@ -652,7 +882,8 @@ def stix_1_to_misp(filename: _files_type,
                    producer: Optional[str] = None,
                    sharing_group_id: Optional[int] = None,
                    single_event: Optional[bool] = False,
-                   title: Optional[str] = None) -> dict:
+                   title: Optional[str] = None,
+                   compress: Optional[str] = None) -> dict:
     if isinstance(filename, str):
         filename = Path(filename).resolve()
     try:
@@ -671,15 +902,19 @@ def stix_1_to_misp(filename: _files_type,
         output_dir = filename.parent
     if stix_parser.single_event:
         name = _check_filename(
-            filename.parent, f'{filename.name}.out', output_dir, output_name
+            filename.parent, f'{filename.name}.out', output_dir,
+            output_name, compress
         )
-        with open(name, 'wt', encoding='utf-8') as f:
+        with open_file(name, 'wt') as f:
             f.write(stix_parser.misp_event.to_json(indent=4))
         return _generate_traceback(debug, stix_parser, name)
     output_names = []
     for misp_event in stix_parser.misp_events:
-        output = output_dir / f'{filename.name}.{misp_event.uuid}.misp.out'
-        with open(output, 'wt', encoding='utf-8') as f:
+        output = compressed_filename(
+            output_dir / f'{filename.name}.{misp_event.uuid}.misp.out',
+            compress
+        )
+        with open_file(output, 'wt') as f:
             f.write(misp_event.to_json(indent=4))
         output_names.append(output)
     return _generate_traceback(debug, stix_parser, *output_names)
@@ -696,7 +931,9 @@ def stix1_to_misp_instance(misp: PyMISP, filename: _files_type,
                            producer: Optional[str] = None,
                            sharing_group_id: Optional[int] = None,
                            single_event: Optional[bool] = False,
-                           title: Optional[str] = None) -> dict:
+                           title: Optional[str] = None,
+                           upload_retries: Optional[int] = 2,
+                           upload_workers: Optional[int] = 1) -> dict:
     if isinstance(filename, str):
         filename = Path(filename).resolve()
     try:
@@ -711,25 +948,11 @@ def stix1_to_misp_instance(misp: PyMISP, filename: _files_type,
     stix_parser = parser()
     stix_parser.load_stix_package(stix_package)
     stix_parser.parse_stix_package(**args)
-    if stix_parser.single_event:
-        misp_event = misp.add_event(stix_parser.misp_event, pythonify=True)
-        if not isinstance(misp_event, MISPEvent):
-            return _generate_traceback(
-                debug, stix_parser, errors={
-                    stix_parser.misp_event.uuid: misp_event['errors'][1]['message']
-                }
-            )
-        return _generate_traceback(debug, stix_parser, misp_event.id)
-    event_ids = []
-    errors = {}
-    for event in stix_parser.misp_events:
-        misp_event = misp.add_event(event, pythonify=True)
-        if not isinstance(misp_event, MISPEvent):
-            errors[event.uuid] = misp_event['errors'][1]['message']
-            continue
-        event_ids.append(misp_event.id)
+    event_ids, errors = _upload_misp_events(
+        misp, stix_parser, upload_retries, upload_workers
+    )
     return _generate_traceback(
-        debug, stix_parser, *event_ids, errors=list(errors)
+        debug, stix_parser, *event_ids, errors=errors
     )
 
 
@@ -746,34 +969,50 @@ def stix_2_to_misp(filename: _files_type,
                    producer: Optional[str] = None,
                    sharing_group_id: Optional[int] = None,
                    single_event: Optional[bool] = False,
-                   title: Optional[str] = None) -> dict:
+                   streaming: Optional[bool] = False,
+                   title: Optional[str] = None,
+                   trusted: Optional[bool] = False,
+                   compress: Optional[str] = None) -> dict:
     if isinstance(filename, str):
         filename = Path(filename).resolve()
     try:
-        bundle = _load_stix2_content(filename)
+        bundle = _load_stix2_content(
+            filename, streaming=streaming, trusted=trusted
+        )
+        # The streamed bundles find it out while reading their header
+        from_misp = (
+            bundle.from_misp if streaming
+            else _is_stix2_from_misp(bundle.objects)
+        )
     except Exception as error:
         return {'errors': [f'{filename} -  {error.__str__()}']}
     parser, args = _get_stix2_parser(
-        _is_stix2_from_misp(bundle.objects), distribution, sharing_group_id,
+        from_misp, distribution, sharing_group_id,
         title, producer, force_contextual_data, galaxies_as_tags, single_event,
         organisation_uuid, cluster_distribution, cluster_sharing_group_id
     )
     stix_parser = parser()
-    stix_parser.load_stix_bundle(bundle)
-    stix_parser.parse_stix_bundle(**args)
+    try:
+        stix_parser.load_stix_bundle(bundle)
+    except Exception as error:
+        return {'errors': [f'{filename} -  {error.__str__()}']}
     if output_dir is None:
         output_dir = filename.parent
-    if stix_parser.single_event:
-        name = _check_filename(
-            filename.parent, f'{filename.name}.out', output_dir, output_name
-        )
-        with open(name, 'wt', encoding='utf-8') as f:
-            f.write(stix_parser.misp_event.to_json(indent=4))
-        return _generate_traceback(debug, stix_parser, name)
+    # Each MISP event is written as soon as it is converted, so the events of
+    # bundles with many reports are never all kept in memory
     output_names = []
-    for misp_event in stix_parser.misp_events:
-        output = output_dir / f'{filename.name}.{misp_event.uuid}.misp.out'
-        with open(output, 'wt', encoding='utf-8') as f:
+    for misp_event in stix_parser.iter_misp_events(**args):
+        if stix_parser.single_event:
+            output = _check_filename(
+                filename.parent, f'{filename.name}.out', output_dir,
+                output_name, compress
+            )
+        else:
+            output = compressed_filename(
+                output_dir / f'{filename.name}.{misp_event.uuid}.misp.out',
+                compress
+            )
+        with open_file(output, 'wt') as f:
             f.write(misp_event.to_json(indent=4))
         output_names.append(output)
     return _generate_traceback(debug, stix_parser, *output_names)
@@ -790,43 +1029,136 @@ def stix2_to_misp_instance(misp: PyMISP, filename: _files_type,
                            producer: Optional[str] = None,
                            sharing_group_id: Optional[int] = None,
                            single_event: Optional[bool] = False,
-                           title: Optional[str] = None) -> dict:
+                           streaming: Optional[bool] = False,
+                           title: Optional[str] = None,
+                           trusted: Optional[bool] = False,
+                           upload_retries: Optional[int] = 2,
+                           upload_workers: Optional[int] = 1) -> dict:
     if isinstance(filename, str):
         filename = Path(filename).resolve()
     try:
-        bundle = _load_stix2_content(filename)
+        bundle = _load_stix2_content(
+            filename, streaming=streaming, trusted=trusted
+        )
+        # The streamed bundles find it out while reading their header
+        from_misp = (
+            bundle.from_misp if streaming
+            else _is_stix2_from_misp(bundle.objects)
+        )
     except Exception as error:
         return {'errors': [f'{filename} -  {error.__str__()}']}
     parser, args = _get_stix2_parser(
-        _is_stix2_from_misp(bundle.objects), distribution, sharing_group_id,
+        from_misp, distribution, sharing_group_id,
         title, producer, force_contextual_data, galaxies_as_tags, single_event,
         organisation_uuid, cluster_distribution, cluster_sharing_group_id
     )
     stix_parser = parser()
-    stix_parser.load_stix_bundle(bundle)
+    try:
+        stix_parser.load_stix_bundle(bundle)
+    except Exception as error:
+        return {'errors': [f'{filename} -  {error.__str__()}']}
     stix_parser.parse_stix_bundle(**args)
-    if stix_parser.single_event:
-        misp_event = misp.add_event(stix_parser.misp_event, pythonify=True)
-        if not isinstance(misp_event, MISPEvent):
-            return _generate_traceback(
-                debug, stix_parser, errors={
-                    stix_parser.misp_event.uuid: misp_event['errors'][1]['message']
-                }
-            )
-        return _generate_traceback(debug, stix_parser, misp_event.id)
-    event_ids = []
-    errors = {}
-    for event in stix_parser.misp_events:
-        misp_event = misp.add_event(event, pythonify=True)
-        if not isinstance(misp_event, MISPEvent):
-            errors[event.uuid] = misp_event['errors'][1]['message']
-            continue
-        event_ids.append(misp_event.id)
+    event_ids, errors = _upload_misp_events(
+        misp, stix_parser, upload_retries, upload_workers
+    )
     return _generate_traceback(
-        debug, stix_parser, *event_ids, errors=list(errors)
+        debug, stix_parser, *event_ids, errors=errors
     )
 
 
+################################################################################
+#                       IN MEMORY CONVERSION FUNCTIONS.                        #
+################################################################################
+
+def misp_content_to_stix2(
+        *contents: List[_contents_type], debug: Optional[bool] = False,
+        version: Optional[str] = _STIX2_default_version,
+        trusted: Optional[bool] = False,
+        validation_rate: Optional[float] = 0.0,
+        serialize: Optional[bool] = False, indent: Optional[int] = 4,
+        json_backend: Optional[str] = 'json',
+        cache: Optional[STIX2ResultCache] = None) -> dict:
+    """
+    Converts MISP content given as dicts, bytes or file objects into a single
+    STIX 2 Bundle, without writing anything to the disk.
+    The traceback `results` holds the Bundle, or its serialised content as
+    UTF-8 encoded bytes when `serialize` is set.
+    """
+    if version not in _STIX2_valid_versions:
+        version = _STIX2_default_version
+    parser = _get_misp_to_stix2_parser(
+        version, trusted, validation_rate, cache
+    )
+    traceback = defaultdict(list)
+    output = StringIO()
+    writer = STIX2BundleWriter(
+        output, version=version, indent=indent, json_backend=json_backend
+    )
+    parsed = 0
+    for index, content in enumerate(contents, 1):
+        try:
+            if serialize:
+                parser.write_json_content(content, writer)
+            else:
+                parser.parse_json_content(content)
+            parsed += 1
+        except Exception as exception:
+            traceback['fails'].append(
+                f'Content #{index} - {exception.__str__()}'
+            )
+    if parsed:
+        if serialize:
+            writer.close()
+            result = output.getvalue().encode('utf-8')
+        else:
+            result = parser.bundle
+        traceback.update(_generate_traceback(debug, parser, result))
+    return traceback
+
+
+def stix_2_content_to_misp(content: _contents_type,
+                           cluster_distribution: Optional[int] = 0,
+                           cluster_sharing_group_id: Optional[int] = None,
+                           debug: Optional[bool] = False,
+                           distribution: Optional[int] = 0,
+                           force_contextual_data: Optional[bool] = False,
+                           galaxies_as_tags: Optional[bool] = False,
+                           organisation_uuid: Optional[str] = MISP_org_uuid,
+                           producer: Optional[str] = None,
+                           sharing_group_id: Optional[int] = None,
+                           single_event: Optional[bool] = False,
+                           streaming: Optional[bool] = False,
+                           title: Optional[str] = None,
+                           trusted: Optional[bool] = False) -> dict:
+    """
+    Converts a STIX 2 Bundle given as a dict, bytes or a file object into
+    MISP events, without writing anything to the disk.
+    The traceback `results` holds the MISPEvent instances.
+    """
+    try:
+        bundle = _load_stix2_content(
+            content, streaming=streaming, trusted=trusted
+        )
+        from_misp = (
+            bundle.from_misp if isinstance(bundle, STIX2BundleReader)
+            else _is_stix2_from_misp(bundle.objects)
+        )
+    except Exception as error:
+        return {'errors': [f'STIX 2 content - {error.__str__()}']}
+    parser, args = _get_stix2_parser(
+        from_misp, distribution, sharing_group_id,
+        title, producer, force_contextual_data, galaxies_as_tags, single_event,
+        organisation_uuid, cluster_distribution, cluster_sharing_group_id
+    )
+    stix_parser = parser()
+    try:
+        stix_parser.load_stix_bundle(bundle)
+        misp_events = list(stix_parser.iter_misp_events(**args))
+    except Exception as error:
+        return {'errors': [f'STIX 2 content - {error.__str__()}']}
+    return _generate_traceback(debug, stix_parser, *misp_events)
+
+
 ################################################################################
 #                        STIX CONTENT LOADING FUNCTIONS                        #
 ################################################################################
@@ -847,7 +1179,9 @@ def _get_stix1_parser(
         'title': title
     }
     if from_misp:
+        from .stix2misp.internal_stix1_to_misp import InternalSTIX1toMISPParser
         return InternalSTIX1toMISPParser, args
+    from .stix2misp.external_stix1_to_misp import ExternalSTIX1toMISPParser
     args.update(
         {
             'cluster_distribution': cluster_distribution,
@@ -874,7 +1208,9 @@ def _get_stix2_parser(
         'title': title
     }
     if from_misp:
+        from .stix2misp.internal_stix2_to_misp import InternalSTIX2toMISPParser
         return InternalSTIX2toMISPParser, args
+    from .stix2misp.external_stix2_to_misp import ExternalSTIX2toMISPParser
     args.update(
         {
             'cluster_distribution': cluster_distribution,
@@ -885,7 +1221,7 @@ def _get_stix2_parser(
     return ExternalSTIX2toMISPParser, args
 
 
-def _is_stix1_from_misp(stix_package: STIXPackage) -> bool:
+def _is_stix1_from_misp(stix_package: 'STIXPackage') -> bool:
     try:
         title = stix_package.stix_header.title
     except AttributeError:
@@ -894,16 +1230,13 @@ def _is_stix1_from_misp(stix_package: STIXPackage) -> bool:
 
 
 def _is_stix2_from_misp(stix_objects: list):
-    for stix_object in stix_objects:
-        labels = stix_object.get('labels', [])
-        if stix_object['type'] not in _STIX2_event_types or not labels:
-            continue
-        if any(tag in labels for tag in _MISP_STIX_tags):
-            return True
-    return False
+    return any(
+        _is_stix2_object_from_misp(stix_object) for stix_object in stix_objects
+    )
 
 
 def _load_stix_event(filename, tries=0):
+    from stix.core import STIXPackage
     try:
         return STIXPackage.from_xml(filename)
     except NamespaceNotFoundError:
@@ -955,7 +1288,7 @@ def _format_xml_objects(
     return f'    {objects[header_length:-footer_length].replace(to_replace, replacement)}\n'
 
 
-def _get_campaigns(campaigns: Campaigns, return_format: str = 'xml') -> str:
+def _get_campaigns(campaigns: 'Campaigns', return_format: str = 'xml') -> str:
     if return_format == 'xml':
         campaigns = campaigns.to_xml(include_namespaces=True).decode()
         return _format_xml_objects(
@@ -977,7 +1310,8 @@ def _get_campaigns_header(return_format: str = 'xml') -> str:
 
 
 def _get_courses_of_action(
-        courses_of_action: CoursesOfAction, return_format: str = 'xml') -> str:
+        courses_of_action: 'CoursesOfAction',
+        return_format: str = 'xml') -> str:
     if return_format == 'xml':
         courses_of_action = courses_of_action.to_xml(
             include_namespaces=False).decode()
@@ -1002,15 +1336,10 @@ def _get_courses_of_action_header(return_format: str = 'xml') -> str:
     return '"courses_of_action": ['
 
 
-def _get_events(package: STIXPackage, return_format: str = 'xml') -> str:
+def _get_events(package: 'STIXPackage', return_format: str = 'xml') -> str:
     if return_format == 'xml':
-        if package.related_packages is not None:
-            length = 135 + len(package.id_) + len(package.version)
-            return package.to_xml(include_namespaces=False).decode()[length:-82]
-        content = '\n            '.join(
-            package.to_xml(include_namespaces=False).decode().split('\n')
-        )
-        return f'            {content}\n'
+        from .misp2stix.stix1_writer import serialize_related_packages
+        return serialize_related_packages(package)
     if package.related_packages is not None:
         return ', '.join(
             related_package.to_json() for related_package
@@ -1019,7 +1348,8 @@ def _get_events(package: STIXPackage, return_format: str = 'xml') -> str:
     return json.dumps({'package': package.to_dict()})
 
 
-def _get_indicators(indicators: Indicators, return_format: str = 'xml') -> str:
+def _get_indicators(
+        indicators: 'Indicators', return_format: str = 'xml') -> str:
     if return_format == 'xml':
         indicators = indicators.to_xml(include_namespaces=False).decode()
         return _format_xml_objects(
@@ -1041,7 +1371,7 @@ def _get_indicators_header(return_format: str = 'xml') -> str:
 
 
 def _get_observables(
-        observables: Observables, return_format: str = 'xml') -> str:
+        observables: 'Observables', return_format: str = 'xml') -> str:
     if return_format == 'xml':
         header_length = 20
         for field in _cybox_features:
@@ -1062,6 +1392,7 @@ def _get_observables_footer(return_format: str = 'xml') -> str:
 
 def _get_observables_header(return_format: str = 'xml') -> str:
     if return_format == 'xml':
+        from cybox.core.observable import Observables
         observables = Observables()
         versions = ' '.join(
             f'{feature}="{getattr(observables, feature)}"'
@@ -1072,7 +1403,7 @@ def _get_observables_header(return_format: str = 'xml') -> str:
 
 
 def _get_threat_actors(
-        threat_actors: ThreatActors, return_format: str = 'xml') -> str:
+        threat_actors: 'ThreatActors', return_format: str = 'xml') -> str:
     if return_format == 'xml':
         threat_actors = threat_actors.to_xml(include_namespaces=False).decode()
         return _format_xml_objects(
@@ -1095,7 +1426,7 @@ def _get_threat_actors_header(return_format: str = 'xml') -> str:
     return '"threat_actors": ['
 
 
-def _get_ttps(ttps: TTPs, return_format: str = 'xml') -> str:
+def _get_ttps(ttps: 'TTPs', return_format: str = 'xml') -> str:
     if return_format == 'xml':
         ttps = ttps.to_xml(include_namespaces=False).decode()
         return _format_xml_objects(ttps, header_length=16, footer_length=18)
@@ -1115,7 +1446,7 @@ def _get_ttps_header(return_format: str = 'xml') -> str:
 
 
 def _write_header(
-        package: STIXPackage, filename: str, namespace: str, org: str,
+        package: 'STIXPackage', filename: str, namespace: str, org: str,
         return_format: str) -> str:
     namespaces = namespaces = {namespace: org}
     namespaces.update(NS_DICT)
@@ -1141,20 +1472,16 @@ def _write_header(
 
 
 def _write_raw_stix(
-        package: STIXPackage, filename: _files_type, namespace: str,
+        package: 'STIXPackage', filename: _files_type, namespace: str,
         org: str, return_format: str) -> bool:
     if return_format == 'xml':
+        from .misp2stix.framing import _handle_namespaces
+        from .misp2stix.stix1_writer import STIX1XMLWriter
         namespaces = _handle_namespaces(namespace, org)
-        with open(filename, 'wb') as f:
-            f.write(
-                package.to_xml(
-                    auto_namespace=False,
-                    ns_dict=namespaces,
-                    schemaloc_dict=SCHEMALOC_DICT
-                )
-            )
+        with open_file(filename, 'wt') as f:
+            STIX1XMLWriter(f, package, namespaces).close()
     else:
-        with open(filename, 'wt', encoding='utf-8') as f:
+        with open_file(filename, 'wt') as f:
             f.write(json.dumps(package.to_dict(), indent=4))
 
 
@@ -1172,7 +1499,8 @@ def _misp_to_stix(stix_args):
             'debug': stix_args.debug, 'return_format': stix_args.format,
             'version': stix_args.version, 'namespace': stix_args.namespace,
             'org': stix_args.org, 'output_dir': stix_args.output_dir,
-            'output_name': stix_args.output_name
+            'output_name': stix_args.output_name,
+            'compress': getattr(stix_args, 'compress', None)
         }
         if stix_args.level == 'attribute':
             return misp_attribute_collection_to_stix1(
@@ -1185,12 +1513,38 @@ def _misp_to_stix(stix_args):
         )
     stix2_args = {
         'debug': stix_args.debug, 'output_dir': stix_args.output_dir,
-        'output_name': stix_args.output_name, 'version': stix_args.version
+        'output_name': stix_args.output_name, 'version': stix_args.version,
+        'workers': stix_args.workers
+    }
+    export_args = {
+        'compress': getattr(stix_args, 'compress', None),
+        'indent': None if getattr(stix_args, 'compact', False) else 4,
+        'json_backend': getattr(stix_args, 'json_backend', 'json'),
+        'trusted': getattr(stix_args, 'trusted', False),
+        'validation_rate': getattr(stix_args, 'validation_rate', 0.0)
     }
+    if getattr(stix_args, 'cache', None) is None:
+        return _misp_to_stix2(
+            stix_args, collection_args, stix2_args, export_args
+        )
+    max_size = stix_args.cache_max_size
+    max_age = stix_args.cache_max_age
+    with STIX2ResultCache(
+            stix_args.cache,
+            max_size=None if max_size is None else max_size * 1000000,
+            max_age=None if max_age is None else max_age * 86400) as cache:
+        export_args['cache'] = cache
+        return _misp_to_stix2(
+            stix_args, collection_args, stix2_args, export_args
+        )
+
+
+def _misp_to_stix2(stix_args, collection_args: dict, stix2_args: dict,
+                   export_args: dict) -> dict:
     if len(stix_args.file) == 1:
-        return misp_to_stix2(stix_args.file[0])
+        return misp_to_stix2(stix_args.file[0], **export_args)
     return misp_collection_to_stix2(
-        *stix_args.file, **collection_args, **stix2_args
+        *stix_args.file, **collection_args, **stix2_args, **export_args
     )
 
 
@@ -1199,14 +1553,17 @@ def _stix_to_misp(args):
         return _process_stix_to_misp_files(args)
     try:
         if args.url is not None and args.api_key is not None:
-            misp = PyMISP(args.url, args.api_key, not args.skip_ssl)
+            misp = _connect_misp_instance(
+                args, args.url, args.api_key, not args.skip_ssl
+            )
             return _process_stix_to_misp_instance(misp, args)
         elif args.config is not None:
             try:
                 with open(args.config, 'rt', encoding='utf-8') as f:
                     config = json.load(f)
-                misp = PyMISP(
-                    config['url'], config['api_key'], config['verify_cert']
+                misp = _connect_misp_instance(
+                    args, config['url'], config['api_key'],
+                    config['verify_cert']
                 )
                 return _process_stix_to_misp_instance(misp, args)
             except (FileNotFoundError, KeyError, json.JSONDecodeError):
@@ -1218,6 +1575,19 @@ def _stix_to_misp(args):
     print(f'{msg} Saving MISP results into files instead.')
     return _process_stix_to_misp_files(args)
 
+
+def _connect_misp_instance(
+        args, url: str, api_key: str, verify_cert: bool) -> PyMISP:
+    # The connection pool of the HTTP session is sized so that every
+    # concurrent upload keeps its connection alive
+    pool_size = max(getattr(args, 'upload_workers', 1) or 1, 10)
+    return PyMISP(
+        url, api_key, verify_cert,
+        timeout=getattr(args, 'upload_timeout', None),
+        https_adapter=HTTPAdapter(pool_connections=1, pool_maxsize=pool_size)
+    )
+
+
 def _process_stix_to_misp_files(args) -> dict:
     results = defaultdict(dict)
     success = []
@@ -1237,23 +1607,19 @@ def _process_stix_to_misp_files(args) -> dict:
         'single_event': args.single_event,
         'title': args.title
     }
-    for filename in args.file:
-        traceback = method(filename, **kwargs)
-        if traceback.pop('success', 0) == 1:
-            success.extend(traceback.pop('results'))
-            for key, value in traceback.items():
-                if isinstance(value, dict):
-                    results[key].update(value)
-            continue
-        for field in ('errors', 'warnings'):
-            if field not in traceback:
-                continue
-            content = traceback[field]
-            if isinstance(content, list):
-                results['fails'][filename.name] = content
-                continue
-            for identifier, values in traceback[field].items():
-                results['fails'][identifier] = tuple(values)
+    if args.version == '2':
+        kwargs['streaming'] = getattr(args, 'streaming', False)
+        kwargs['trusted'] = getattr(args, 'trusted', False)
+    kwargs['compress'] = getattr(args, 'compress', None)
+    workers = getattr(args, 'workers', 1) or 1
+    if workers > 1 and len(args.file) > 1:
+        tracebacks = _process_files_in_parallel(
+            partial(method, **kwargs), args.file, workers
+        )
+    else:
+        tracebacks = (method(filename, **kwargs) for filename in args.file)
+    for filename, traceback in zip(args.file, tracebacks):
+        _merge_stix_to_misp_traceback(results, success, filename, traceback)
     if success:
         results['results'] = success
     return results
@@ -1279,54 +1645,214 @@ def _process_stix_to_misp_instance(misp: PyMISP, args) -> dict:
         'single_event': args.single_event,
         'title': args.title
     }
+    if args.version == '2':
+        kwargs['streaming'] = getattr(args, 'streaming', False)
+        kwargs['trusted'] = getattr(args, 'trusted', False)
+    kwargs['upload_retries'] = getattr(args, 'upload_retries', 2)
+    kwargs['upload_workers'] = getattr(args, 'upload_workers', 1) or 1
     for filename in args.file:
         traceback = method(misp, filename, **kwargs)
-        if traceback.pop('success', 0) == 1:
-            success.extend(traceback.pop('results'))
-            for key, value in traceback.items():
-                if isinstance(value, dict):
-                    results[key].update(value)
-            continue
-        if 'pymisp_errors' in traceback:
-            results['pymisp_errors'].update(traceback['pymisp_errors'])
-        for field in ('errors', 'warnings'):
-            if field not in traceback:
-                continue
-            content = traceback[field]
-            if isinstance(content, list):
-                results['fails'][filename.name] = content
-                continue
-            for identifier, values in traceback[field].items():
-                results['fails'][identifier] = tuple(values)
+        _merge_stix_to_misp_traceback(results, success, filename, traceback)
     if success:
         results['event_ids'] = success
     return results
 
 
+def _merge_stix_to_misp_traceback(
+        results: defaultdict, success: list, filename: Path, traceback: dict):
+    if traceback.pop('success', 0) == 1:
+        success.extend(traceback.pop('results'))
+        for key, value in traceback.items():
+            if isinstance(value, dict):
+                results[key].update(value)
+        return
+    if 'pymisp_errors' in traceback:
+        results['pymisp_errors'].update(traceback['pymisp_errors'])
+        # Events successfully uploaded alongside the failing ones
+        success.extend(traceback.get('results', []))
+    for field in ('errors', 'warnings'):
+        if field not in traceback:
+            continue
+        content = traceback[field]
+        if isinstance(content, list):
+            results['fails'][filename.name] = content
+            continue
+        for identifier, values in traceback[field].items():
+            results['fails'][identifier] = tuple(values)
+
+
+def _serve(args):
+    _warm_up_resources()
+    if args.socket is None:
+        for line in sys.stdin:
+            response = _process_conversion_job(line)
+            if response is not None:
+                sys.stdout.write(f'{response}\n')
+                sys.stdout.flush()
+        return
+    _remove_stale_socket(args.socket)
+    server = _ConversionJobsServer(str(args.socket), _ConversionJobsHandler)
+    # SIGTERM stops the server the same way as an interruption does, the
+    # SystemExit exceptions being specific to the conversion jobs that fail
+    signal.signal(signal.SIGTERM, signal.default_int_handler)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        os.remove(args.socket)
+
+
+class _ConversionJobsServer(
+        socketserver.ForkingMixIn, socketserver.UnixStreamServer):
+    # Each connection is handled in a process forked from the server, which
+    # inherits the resources already loaded while keeping the conversion
+    # state (stdout redirection, STIX 1 id generator, ...) of every job
+    # apart, and a client keeping its connection open no longer blocks the
+    # other ones. The children are reaped while the server is polling and
+    # the server shuts down without waiting for the connections still open.
+    block_on_close = False
+
+
+class _ConversionJobsHandler(socketserver.StreamRequestHandler):
+    def handle(self):
+        for line in self.rfile:
+            response = _process_conversion_job(line.decode('utf-8'))
+            if response is not None:
+                self.wfile.write(f'{response}\n'.encode('utf-8'))
+                self.wfile.flush()
+
+
+_conversion_jobs = {
+    'misp_attribute_collection_to_stix1': misp_attribute_collection_to_stix1,
+    'misp_collection_to_stix2': misp_collection_to_stix2,
+    'misp_event_collection_to_stix1': misp_event_collection_to_stix1,
+    'misp_to_stix1': misp_to_stix1,
+    'misp_to_stix2': misp_to_stix2,
+    'stix_1_to_misp': stix_1_to_misp,
+    'stix_2_to_misp': stix_2_to_misp
+}
+_conversion_jobs_paths = ('filename', 'output_dir', 'output_name')
+
+
+def _process_conversion_job(line: str) -> Union[str, None]:
+    """
+    Runs the conversion job described as a JSON line:
+        {"id": ..., "method": "misp_to_stix2", "args": [...], "kwargs": {...}}
+    `method` is one of the public conversion functions, `args` are the input
+    file paths and `kwargs` the keyword arguments of the function.
+    Returns the JSON line with the job id and the resulting traceback, or
+    the error message that prevented the job from running.
+    """
+    line = line.strip()
+    if not line:
+        return None
+    try:
+        job = json.loads(line)
+    except json.JSONDecodeError as error:
+        return json.dumps({'id': None, 'error': f'Invalid job format: {error}'})
+    if not isinstance(job, dict):
+        return json.dumps({'id': None, 'error': 'Invalid job format'})
+    job_id = job.get('id')
+    method = job.get('method')
+    if not isinstance(method, str) or method not in _conversion_jobs:
+        return json.dumps({'id': job_id, 'error': f'Unknown method: {method}'})
+    try:
+        args, kwargs = _parse_conversion_job_arguments(job)
+    except TypeError as error:
+        return json.dumps(
+            {'id': job_id, 'error': f'Invalid job format: {error}'}
+        )
+    try:
+        # stdout may be the channel used to return the results
+        with redirect_stdout(sys.stderr):
+            traceback = _conversion_jobs[method](*args, **kwargs)
+    except (Exception, SystemExit) as exception:
+        # Some loading errors call `sys.exit`, which must only end the job
+        response = {
+            'id': job_id,
+            'error': f'Breaking exception: {exception.__str__()}'
+        }
+    else:
+        response = {'id': job_id, 'traceback': traceback}
+    return json.dumps(response, default=str)
+
+
+def _parse_conversion_job_arguments(job: dict) -> tuple:
+    args = job.get('args', [])
+    if not isinstance(args, list):
+        raise TypeError('`args` should be a list of file paths')
+    kwargs = job.get('kwargs', {})
+    if not isinstance(kwargs, dict):
+        raise TypeError('`kwargs` should be an object')
+    kwargs = {
+        key: Path(value)
+        if key in _conversion_jobs_paths and value is not None else value
+        for key, value in kwargs.items()
+    }
+    return [Path(filename) for filename in args], kwargs
+
+
+def _remove_stale_socket(socket_path: Path):
+    # The socket file left behind by a server that did not shut down cleanly
+    # prevents the new server from binding to the same path
+    if not Path(socket_path).is_socket():
+        return
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as client:
+        try:
+            client.connect(str(socket_path))
+        except ConnectionRefusedError:
+            os.remove(socket_path)
+            return
+    sys.exit(f'A conversion server is already listening to {socket_path}')
+
+
+def _warm_up_resources():
+    from .stix2misp.internal_stix2_to_misp import InternalSTIX2toMISPParser
+    parser = InternalSTIX2toMISPParser()
+    features = ('galaxy_definitions', 'relationship_types', 'synonyms_mapping')
+    for feature in features:
+        try:
+            getattr(parser, feature)
+        except UnavailableGalaxyResourcesError:
+            continue
+
+
 ################################################################################
 #                              UTILITY FUNCTIONS.                              #
 ################################################################################
 
 def _check_filename(default_dir: Path, default_name: str,
-                    output_dir: _files_type, output_name: _files_type) -> Path:
+                    output_dir: _files_type, output_name: _files_type,
+                    compress: Optional[str] = None) -> Path:
     if output_name is None:
-        return _check_output(default_dir, default_name, output_dir)
+        return _check_output(default_dir, default_name, output_dir, compress)
     if not isinstance(output_name, Path):
         output_name = Path(output_name).resolve()
     if output_name.is_dir():
-        return output_name / default_name
-    return output_name
+        return compressed_filename(output_name / default_name, compress)
+    return compressed_filename(output_name, compress)
 
 
 def _check_output(
-        default_dir: Path, default_name: str, output_dir: _files_type) -> Path:
+        default_dir: Path, default_name: str, output_dir: _files_type,
+        compress: Optional[str] = None) -> Path:
     if output_dir is None:
-        return default_dir / default_name
+        return compressed_filename(default_dir / default_name, compress)
     if not isinstance(output_dir, Path):
         output_dir = Path(output_dir).resolve()
     if output_dir.is_file():
-        return output_dir
-    return output_dir / default_name
+        return compressed_filename(output_dir, compress)
+    return compressed_filename(output_dir / default_name, compress)
+
+
+def _process_files_in_parallel(
+        method: Callable, input_files: list, workers: int) -> list:
+    # Results are collected in the same order as the input files, so the
+    # merged traceback does not depend on the number of workers
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        return list(executor.map(method, input_files))
 
 
 def _generate_traceback(
@@ -1341,6 +1867,31 @@ def _generate_traceback(
     return traceback
 
 
+def _get_misp_to_stix2_parser(
+        version: str, trusted: Optional[bool] = False,
+        validation_rate: Optional[float] = 0.0,
+        cache: Optional[STIX2ResultCache] = None):
+    if version == '2.1':
+        from .misp2stix.misp_to_stix21 import MISPtoSTIX21Parser
+        return MISPtoSTIX21Parser(
+            trusted=trusted, validation_rate=validation_rate, cache=cache
+        )
+    from .misp2stix.misp_to_stix20 import MISPtoSTIX20Parser
+    return MISPtoSTIX20Parser(
+        trusted=trusted, validation_rate=validation_rate, cache=cache
+    )
+
+
+def _open_stix2_cache(cache_args: Union[tuple, None]):
+    if cache_args is None:
+        return nullcontext()
+    try:
+        return STIX2ResultCache(*cache_args)
+    except sqlite3.OperationalError:
+        # The file is converted anyway, only without the cache
+        return nullcontext()
+
+
 def _get_stix_conversion_method(version):
     if version == '2':
         return stix_2_to_misp
@@ -1351,3 +1902,70 @@ def _get_stix_ingestion_method(version):
     if version == '2':
         return stix2_to_misp_instance
     return stix1_to_misp_instance
+
+
+def _fetch_uploaded_misp_event(
+        misp: PyMISP, misp_event: MISPEvent) -> Union[MISPEvent, None]:
+    # MISP may have created the event although the previous upload attempt
+    # failed, in which case it must not be uploaded again
+    try:
+        if misp.event_exists(misp_event.uuid):
+            uploaded_event = misp.get_event(misp_event.uuid, pythonify=True)
+            if isinstance(uploaded_event, MISPEvent):
+                return uploaded_event
+    except (HTTPConnectionError, MISPServerError, Timeout):
+        pass
+    return None
+
+
+def _upload_misp_event(
+        misp: PyMISP, misp_event: MISPEvent, retries: int) -> Union[MISPEvent, str]:
+    # Server errors and timeouts are retried with an exponential backoff,
+    # any other error message from MISP is returned as is
+    for attempt in range(retries + 1):
+        if attempt:
+            sleep(_UPLOAD_BACKOFF * 2 ** (attempt - 1))
+            uploaded_event = _fetch_uploaded_misp_event(misp, misp_event)
+            if uploaded_event is not None:
+                return uploaded_event
+        try:
+            response = misp.add_event(misp_event, pythonify=True)
+        except (HTTPConnectionError, MISPServerError, Timeout) as error:
+            if attempt == retries:
+                return f'{error.__class__.__name__}: {error}'
+            continue
+        except Exception as error:
+            # Not retried, but the other events of the batch are still
+            # uploaded and the error is reported for this event only
+            return f'{error.__class__.__name__}: {error}'
+        if isinstance(response, MISPEvent):
+            return response
+        errors = response.get('errors', response)
+        if isinstance(errors, (list, tuple)) and len(errors) > 1:
+            if isinstance(errors[1], dict):
+                return errors[1].get('message', str(errors[1]))
+        return str(errors)
+
+
+def _upload_misp_events(
+        misp: PyMISP, stix_parser, retries: int, workers: int) -> tuple:
+    misp_events = (
+        [stix_parser.misp_event] if stix_parser.single_event
+        else stix_parser.misp_events
+    )
+    upload = partial(_upload_misp_event, misp, retries=retries)
+    if workers > 1 and len(misp_events) > 1:
+        # PyMISP shares a single HTTP session, whose connection pool is
+        # reused by the threads uploading the events
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            responses = list(executor.map(upload, misp_events))
+    else:
+        responses = map(upload, misp_events)
+    event_ids = []
+    errors = {}
+    for misp_event, response in zip(misp_events, responses):
+        if isinstance(response, MISPEvent):
+            event_ids.append(response.id)
+            continue
+        errors[misp_event.uuid] = response
+    return event_ids, errors
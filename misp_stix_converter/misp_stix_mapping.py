@@ -1,11 +1,36 @@
+class _BlockedMethod:
+    """
+    Hides a dict method from the instances of a read-only Mapping: accessing
+    it raises an AttributeError, as if the method did not exist.
+    The lookups of every other attribute are left to the dict type itself,
+    with no additional Python level function call.
+    """
+
+    def __set_name__(self, owner, name):
+        self.__name = name
+
+    def __get__(self, instance, owner=None):
+        if instance is None:
+            return self
+        raise AttributeError(
+            f'{type(instance).__name__} object has no attribute {self.__name}'
+        )
+
+
 class Mapping(dict):
+    __slots__ = ()
+
+    clear = _BlockedMethod()
+    pop = _BlockedMethod()
+    popitem = _BlockedMethod()
+    setdefault = _BlockedMethod()
+    update = _BlockedMethod()
+
     def __setitem__(self, key, value):
         raise TypeError(f'{type(self).__name__} object does not support item assignment')
 
     def __delitem__(self, key):
         raise TypeError(f'{type(self).__name__} object does not support item deletion')
 
-    def __getattribute__(self, attribute):
-        if attribute in ('clear', 'update', 'pop', 'popitem', 'setdefault'):
-            raise AttributeError(f'{type(self).__name__} object has no attribute {attribute}')
-        return super().__getattribute__(attribute)
+    def __ior__(self, other):
+        raise TypeError(f'{type(self).__name__} object does not support in-place update')
@@ -0,0 +1,287 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+from stix2.properties import (
+    DictionaryProperty, IDProperty, IntegerProperty, ListProperty,
+    ReferenceProperty, StringProperty, TimestampProperty)
+from stix2.v20.sdo import CustomObject as CustomObject_v20
+from stix2.v21.sdo import CustomObject as CustomObject_v21
+
+# The `x-misp-*` custom STIX object types are registered within python-stix2
+# when this module is imported: both the export and import sides rely on it,
+# so the STIX 2 content is parsed into the custom object classes
+
+_ANALYST_DATA_REFERENCE_TYPES = [
+    'attack-pattern', 'campaign', 'course-of-action', 'identity', 'indicator',
+    'intrusion-set', 'malware', 'observed-data', 'report', 'threat-actor',
+    'tool', 'vulnerability', 'x-misp-analyst-note', 'x-misp-analyst-opinion',
+    'x-misp-attribute', 'x-misp-event-note', 'x-misp-event-report',
+    'x-misp-galaxy-cluster', 'x-misp-object'
+]
+
+
+################################################################################
+#                       STIX 2.0 CUSTOM OBJECTS CLASSES                        #
+################################################################################
+
+
+@CustomObject_v20(
+    'x-misp-analyst-note',
+    [
+        ('id', IDProperty('x-misp-analyst-note')),
+        ('created', TimestampProperty(precision='millisecond')),
+        ('modified', TimestampProperty(precision='millisecond')),
+        ('x_misp_note', StringProperty(required=True)),
+        ('x_misp_author', StringProperty()),
+        ('x_misp_language', StringProperty()),
+        (
+            'object_ref',
+            ReferenceProperty(
+                valid_types=_ANALYST_DATA_REFERENCE_TYPES, spec_version='2.0'
+            )
+        )
+    ]
+)
+class CustomAnalystNote_v20:
+    pass
+
+
+@CustomObject_v20(
+    'x-misp-analyst-opinion',
+    [
+        ('id', IDProperty('x-misp-analyst-opinion')),
+        ('created', TimestampProperty(precision='millisecond')),
+        ('modified', TimestampProperty(precision='millisecond')),
+        ('x_misp_opinion', IntegerProperty(required=True)),
+        ('x_misp_author', StringProperty()),
+        ('x_misp_comment', StringProperty()),
+        (
+            'object_ref',
+            ReferenceProperty(
+                valid_types=_ANALYST_DATA_REFERENCE_TYPES, spec_version='2.0'
+            )
+        )
+    ]
+)
+class CustomAnalystOpinion_v20:
+    pass
+
+
+@CustomObject_v20(
+    'x-misp-attribute',
+    [
+        ('id', IDProperty('x-misp-attribute')),
+        ('labels', ListProperty(StringProperty, required=True)),
+        ('created', TimestampProperty(required=True, precision='millisecond')),
+        ('modified', TimestampProperty(required=True, precision='millisecond')),
+        (
+            'created_by_ref',
+            ReferenceProperty(valid_types='identity', spec_version='2.0')
+        ),
+        (
+            'object_marking_refs',
+            ListProperty(
+                ReferenceProperty(
+                    valid_types='marking-definition', spec_version='2.0'
+                )
+            )
+        ),
+        ('x_misp_type', StringProperty(required=True)),
+        ('x_misp_value', StringProperty(required=True)),
+        ('x_misp_comment', StringProperty()),
+        ('x_misp_category', StringProperty())
+    ]
+)
+class CustomAttribute_v20:
+    pass
+
+
+@CustomObject_v20(
+    'x-misp-event-report',
+    [
+        ('id', IDProperty('x-misp-event-report')),
+        ('created', TimestampProperty(required=True, precision='millisecond')),
+        ('modified', TimestampProperty(required=True, precision='millisecond')),
+        (
+            'created_by_ref',
+            ReferenceProperty(valid_types='identity', spec_version='2.0')
+        ),
+        (
+            'object_refs',
+            ListProperty(
+                ReferenceProperty(
+                    valid_types=_ANALYST_DATA_REFERENCE_TYPES,
+                    spec_version='2.0'
+                ),
+                required=True
+            )
+        ),
+        ('x_misp_content', StringProperty(required=True)),
+        ('x_misp_name', StringProperty()),
+    ]
+)
+class CustomEventReport_v20:
+    pass
+
+
+@CustomObject_v20(
+    'x-misp-galaxy-cluster',
+    [
+        ('id', IDProperty('x-misp-galaxy-cluster')),
+        ('labels', ListProperty(StringProperty, required=True)),
+        ('created', TimestampProperty(precision='millisecond')),
+        ('modified', TimestampProperty(precision='millisecond')),
+        (
+            'created_by_ref',
+            ReferenceProperty(valid_types='identity', spec_version='2.0')
+        ),
+        ('x_misp_name', StringProperty(required=True)),
+        ('x_misp_type', StringProperty(required=True)),
+        ('x_misp_value', StringProperty(required=True)),
+        ('x_misp_description', StringProperty(required=True)),
+        ('x_misp_meta', DictionaryProperty())
+    ]
+)
+class CustomGalaxyCluster_v20:
+    pass
+
+
+@CustomObject_v20(
+    'x-misp-object',
+    [
+        ('id', IDProperty('x-misp-object')),
+        ('labels', ListProperty(StringProperty, required=True)),
+        ('created', TimestampProperty(required=True, precision='millisecond')),
+        ('modified', TimestampProperty(required=True, precision='millisecond')),
+        (
+            'created_by_ref',
+            ReferenceProperty(valid_types='identity', spec_version='2.0')
+        ),
+        (
+            'object_marking_refs',
+            ListProperty(
+                ReferenceProperty(
+                    valid_types='marking-definition', spec_version='2.0'
+                )
+            )
+        ),
+        ('x_misp_name', StringProperty(required=True)),
+        ('x_misp_attributes', ListProperty(DictionaryProperty())),
+        ('x_misp_comment', StringProperty()),
+        ('x_misp_meta_category', StringProperty())
+    ]
+)
+class CustomMispObject_v20:
+    pass
+
+
+@CustomObject_v20(
+    'x-misp-event-note',
+    [
+        ('id', IDProperty('x-misp-event-note')),
+        ('created', TimestampProperty(required=True, precision='millisecond')),
+        ('modified', TimestampProperty(required=True, precision='millisecond')),
+        (
+            'created_by_ref',
+            ReferenceProperty(valid_types='identity', spec_version='2.0')
+        ),
+        ('x_misp_event_note', StringProperty(required=True)),
+        (
+            'object_ref',
+            ReferenceProperty(valid_types='report', spec_version='2.0')
+        )
+    ]
+)
+class CustomNote_v20:
+    pass
+
+
+@CustomObject_v20(
+    'x-misp-opinion',
+    [
+        ('id', IDProperty('x-misp-opinion')),
+        ('x_misp_author', StringProperty()),
+        (
+            'x_misp_author_ref',
+            ReferenceProperty(valid_types='identity', spec_version='2.0')
+        ),
+        ('x_misp_explanation', StringProperty()),
+        ('x_misp_opinion', StringProperty(required=True)),
+        ('x_misp_source', StringProperty()),
+        (
+            'object_ref',
+            ReferenceProperty(
+                valid_types=[
+                    'campaign', 'indicator', 'observed-data',
+                    'vulnerability', 'x-misp-attribute'
+                ],
+                spec_version='2.0'
+            )
+        )
+    ]
+)
+class CustomOpinion_v20:
+    pass
+
+
+################################################################################
+#                       STIX 2.1 CUSTOM OBJECTS CLASSES                        #
+################################################################################
+
+
+@CustomObject_v21(
+    'x-misp-attribute',
+    [
+        ('id', IDProperty('x-misp-attribute', spec_version='2.1')),
+        ('labels', ListProperty(StringProperty, required=True)),
+        ('created', TimestampProperty(required=True, precision='millisecond')),
+        ('modified', TimestampProperty(required=True, precision='millisecond')),
+        ('created_by_ref', ReferenceProperty(valid_types='identity', spec_version='2.1')),
+        ('object_marking_refs', ListProperty(ReferenceProperty(valid_types='marking-definition', spec_version='2.1'))),
+        ('x_misp_type', StringProperty(required=True)),
+        ('x_misp_value', StringProperty(required=True)),
+        ('x_misp_comment', StringProperty()),
+        ('x_misp_category', StringProperty())
+    ]
+)
+class CustomAttribute_v21:
+    pass
+
+
+@CustomObject_v21(
+    'x-misp-object',
+    [
+        ('id', IDProperty('x-misp-object', spec_version='2.1')),
+        ('labels', ListProperty(StringProperty, required=True)),
+        ('created', TimestampProperty(required=True, precision='millisecond')),
+        ('modified', TimestampProperty(required=True, precision='millisecond')),
+        ('created_by_ref', ReferenceProperty(valid_types='identity', spec_version='2.1')),
+        ('object_marking_refs', ListProperty(ReferenceProperty(valid_types='marking-definition', spec_version='2.1'))),
+        ('x_misp_name', StringProperty(required=True)),
+        ('x_misp_attributes', ListProperty(DictionaryProperty())),
+        ('x_misp_comment', StringProperty()),
+        ('x_misp_meta_category', StringProperty())
+    ]
+)
+class CustomMispObject_v21:
+    pass
+
+
+@CustomObject_v21(
+    'x-misp-galaxy-cluster',
+    [
+        ('id', IDProperty('x-misp-galaxy-cluster')),
+        ('labels', ListProperty(StringProperty, required=True)),
+        ('created', TimestampProperty(precision='millisecond')),
+        ('modified', TimestampProperty(precision='millisecond')),
+        ('created_by_ref', ReferenceProperty(valid_types='identity', spec_version='2.1')),
+        ('x_misp_name', StringProperty(required=True)),
+        ('x_misp_type', StringProperty(required=True)),
+        ('x_misp_value', StringProperty(required=True)),
+        ('x_misp_description', StringProperty(required=True)),
+        ('x_misp_meta', DictionaryProperty())
+    ]
+)
+class CustomGalaxyCluster_v21:
+    pass
+
@@ -1,8 +1,28 @@
-from .external_stix1_to_misp import ExternalSTIX1toMISPParser # noqa
-from .external_stix2_mapping import ExternalSTIX2toMISPMapping # noqa
-from .external_stix2_to_misp import ExternalSTIX2toMISPParser # noqa
-from .importparser import _load_stix2_content, MISP_org_uuid # noqa
-from .internal_stix1_to_misp import InternalSTIX1toMISPParser # noqa
-from .internal_stix2_mapping import InternalSTIX2toMISPMapping # noqa
-from .internal_stix2_to_misp import InternalSTIX2toMISPParser # noqa
-from .stix2_pattern_parser import STIX2PatternParser # noqa
+from importlib import import_module
+
+# The parsers and their dependencies (python-stix & cybox for STIX 1, stix2
+# and the pattern grammars for STIX 2.x) are only imported when they are
+# first accessed
+_lazy_imports = {
+    'ExternalSTIX1toMISPParser': '.external_stix1_to_misp',
+    'ExternalSTIX2toMISPMapping': '.external_stix2_mapping',
+    'ExternalSTIX2toMISPParser': '.external_stix2_to_misp',
+    '_load_stix2_content': '.importparser',
+    'MISP_org_uuid': '.importparser',
+    'InternalSTIX1toMISPParser': '.internal_stix1_to_misp',
+    'InternalSTIX2toMISPMapping': '.internal_stix2_mapping',
+    'InternalSTIX2toMISPParser': '.internal_stix2_to_misp',
+    'STIX2PatternParser': '.stix2_pattern_parser'
+}
+
+
+def __getattr__(name: str):
+    if name not in _lazy_imports:
+        raise AttributeError(f'module {__name__!r} has no attribute {name!r}')
+    value = getattr(import_module(_lazy_imports[name], __name__), name)
+    globals()[name] = value
+    return value
+
+
+def __dir__() -> list:
+    return sorted(set(globals()) | set(_lazy_imports))
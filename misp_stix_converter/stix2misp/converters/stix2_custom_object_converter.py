@@ -107,6 +107,7 @@ class STIX2CustomObjectConverter(InternalSTIX2Converter):
             }
             if galaxy_type not in self.main_parser._galaxies:
                 self._create_galaxy_args(galaxy_type, custom_galaxy.x_misp_name)
+        self.main_parser._clusters_references.add(self.event_uuid, custom_ref)
 
     def _parse_custom_object(self, custom_object: _CUSTOM_OBJECT_TYPING):
         name = custom_object.x_misp_name
@@ -355,7 +355,8 @@ class ExternalSTIX2IndicatorConverter(
         return self._pattern_parser.pattern
 
     def _handle_pattern_mapping(self, indicator: _INDICATOR_TYPING) -> str:
-        if isinstance(indicator, Indicator_v21):
+        # Only STIX 2.1 Indicators have a pattern type
+        if hasattr(indicator, 'pattern_type'):
             pattern_type = indicator.pattern_type
             if pattern_type != 'stix':
                 try:
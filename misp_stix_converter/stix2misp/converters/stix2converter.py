@@ -212,11 +212,10 @@ class ExternalSTIX2Converter(STIX2Converter, metaclass=ABCMeta):
     ############################################################################
 
     def _check_existing_galaxy_name(self, stix_object_name: str) -> Union[list, None]:
-        if stix_object_name in self.main_parser.synonyms_mapping:
-            return self.main_parser.synonyms_mapping[stix_object_name]
-        for name, tag_names in self.main_parser.synonyms_mapping.items():
-            if stix_object_name in name:
-                return tag_names
+        synonyms_mapping = self.main_parser.synonyms_mapping
+        if stix_object_name in synonyms_mapping:
+            return synonyms_mapping[stix_object_name]
+        return synonyms_mapping.search(stix_object_name)
 
     def _create_cluster_args(
             self, stix_object: _GALAXY_OBJECTS_TYPING, galaxy_type: str,
@@ -297,6 +296,9 @@ class ExternalSTIX2Converter(STIX2Converter, metaclass=ABCMeta):
             clusters[stix_object.id] = getattr(self, feature)(
                 stix_object, object_type
             )
+        self.main_parser._clusters_references.add(
+            self.event_uuid, stix_object.id
+        )
 
     def _parse_galaxy_as_container(self, stix_object: _GALAXY_OBJECTS_TYPING,
                                    object_type: Union[str, None]) -> dict:
@@ -453,6 +455,9 @@ class InternalSTIX2Converter(STIX2Converter, metaclass=ABCMeta):
         else:
             feature = f'_parse_galaxy_{self.main_parser.galaxy_feature}'
             clusters[stix_object.id] = getattr(self, feature)(stix_object)
+        self.main_parser._clusters_references.add(
+            self.event_uuid, stix_object.id
+        )
 
     def _parse_galaxy_as_container(
             self, stix_object: _GALAXY_OBJECTS_TYPING) -> dict:
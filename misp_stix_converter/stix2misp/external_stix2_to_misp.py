@@ -12,13 +12,14 @@ from .converters import (
     ExternalSTIX2ThreatActorConverter, ExternalSTIX2ToolConverter,
     ExternalSTIX2VulnerabilityConverter, STIX2ObservableObjectConverter)
 from .importparser import ExternalSTIXtoMISPParser
-from .stix2_to_misp import STIX2toMISPParser, _OBSERVABLE_TYPING
+from .stix2_to_misp import (
+    STIX2toMISPParser, _EventReferences, _OBSERVABLE_TYPING)
 from collections import defaultdict
-from pymisp import MISPAttribute, MISPObject
+from pymisp import MISPAttribute, MISPEvent, MISPObject
 from stix2.v20.sro import Sighting as Sighting_v20
 from stix2.v21.sdo import Note, Opinion
 from stix2.v21.sro import Sighting as Sighting_v21
-from typing import Optional, Union
+from typing import Iterator, Optional, Union
 
 _SIGHTING_TYPING = Union[Sighting_v20, Sighting_v21]
 
@@ -43,6 +44,18 @@ class ExternalSTIX2toMISPParser(STIX2toMISPParser, ExternalSTIXtoMISPParser):
         self._tool_parser: ExternalSTIX2ToolConverter
         self._vulnerability_parser: ExternalSTIX2VulnerabilityConverter
 
+    def iter_misp_events(
+            self, cluster_distribution: Optional[int] = 0,
+            cluster_sharing_group_id: Optional[int] = None,
+            organisation_uuid: Optional[str] = None,
+            **kwargs) -> Iterator[MISPEvent]:
+        self._set_parameters(**kwargs)
+        self._set_cluster_distribution(
+            cluster_distribution, cluster_sharing_group_id
+        )
+        self._set_organisation_uuid(organisation_uuid)
+        yield from self._iter_stix_bundle()
+
     def parse_stix_bundle(
             self, cluster_distribution: Optional[int] = 0,
             cluster_sharing_group_id: Optional[int] = None,
@@ -172,6 +185,8 @@ class ExternalSTIX2toMISPParser(STIX2toMISPParser, ExternalSTIXtoMISPParser):
             self._observable[observable.id] = to_load
         except AttributeError:
             self._observable = {observable.id: to_load}
+            self._observable_references = _EventReferences()
+        self._observable_references.register(observable.id)
 
     def _load_sighting(self, sighting: _SIGHTING_TYPING):
         sighting_of_ref = self._sanitise_uuid(sighting.sighting_of_ref)
@@ -203,6 +218,9 @@ class ExternalSTIX2toMISPParser(STIX2toMISPParser, ExternalSTIXtoMISPParser):
                     observable = self._observable[object_ref]
                     if self.misp_event.uuid not in observable['used']:
                         observable['used'][self.misp_event.uuid] = False
+                        self._observable_references.add(
+                            self.misp_event.uuid, object_ref
+                        )
                 continue
             try:
                 self._handle_object(object_type, object_ref)
@@ -225,8 +243,10 @@ class ExternalSTIX2toMISPParser(STIX2toMISPParser, ExternalSTIXtoMISPParser):
         if not hasattr(self, '_observable'):
             return super()._handle_unparsed_content()
         unparsed_content = defaultdict(list)
-        for object_id, content in self._observable.items():
-            if content['used'].get(self.misp_event.uuid, True):
+        event_uuid = self.misp_event.uuid
+        for object_id in self._observable_references.get(event_uuid):
+            content = self._observable[object_id]
+            if content['used'][event_uuid]:
                 continue
             unparsed_content[content['observable'].type].append(object_id)
         for observable_type in self._mapping.observable_object_types():
@@ -256,6 +276,9 @@ class ExternalSTIX2toMISPParser(STIX2toMISPParser, ExternalSTIXtoMISPParser):
 
     def _parse_loaded_features(self):
         if hasattr(self, '_observable'):
-            for observable in self._observable.values():
+            for object_id, observable in self._observable.items():
                 observable['used'][self.misp_event.uuid] = False
+                self._observable_references.add(
+                    self.misp_event.uuid, object_id
+                )
         super()._parse_loaded_features()
@@ -3,31 +3,60 @@
 import json
 import sys
 import traceback
+from .. import stix2_custom_objects  # registers the `x-misp-*` STIX types
+from ..file_compression import detect_compression, open_content
 from .exceptions import UnavailableGalaxyResourcesError
 from abc import ABCMeta
+from bisect import bisect_right
 from collections import defaultdict
 from datetime import datetime
+from functools import lru_cache
+from hashlib import sha1
 from mixbox.namespaces import NamespaceNotFoundError
 from pathlib import Path
 from pymisp import MISPEvent, MISPObject
 from pymisp.abstract import resources_path
-from stix.core import STIXPackage
 from stix2.exceptions import InvalidValueError
 from stix2.parsing import dict_to_stix2, parse as stix2_parser, ParseError
+from stix2.utils import parse_into_datetime
 from stix2.v20.bundle import Bundle as Bundle_v20
 from stix2.v21.bundle import Bundle as Bundle_v21
-from typing import Optional, Union
-from uuid import UUID, uuid5
+from typing import IO, Optional, Union
+from uuid import UUID
 
 _DATA_PATH = Path(__file__).parents[1].resolve() / 'data'
+# Resources loaded once and shared by every parser of the process - the
+# galaxy related ones are stored with the misp-galaxy fingerprint
+_SHARED_RESOURCES = {}
 
 MISP_org_uuid = '55f6ea65-aa10-4c5a-bf01-4f84950d210f'
+_MISP_STIX_tags = ('misp:tool="MISP-STIX-Converter"', 'misp:tool="misp2stix2"')
+_STIX2_event_types = ('grouping', 'report')
 
 _DEFAULT_DISTRIBUTION = 0
 
 _VALID_DISTRIBUTIONS = (0, 1, 2, 3, 4)
 _RFC_VERSIONS = (1, 3, 4, 5)
 _UUIDv4 = UUID('76beed5f-7251-457e-8c2a-b45f7b589d3d')
+# SHA-1 state after hashing the namespace, copied for every v5 UUID derivation
+_UUIDv5_NAMESPACE_HASH = sha1(_UUIDv4.bytes)
+# Timestamp properties of the STIX 2 objects, observables & extensions, which
+# python-stix2 parses into datetime objects
+_STIX2_TIMESTAMP_PROPERTIES = frozenset(
+    (
+        'accessed', 'account_created', 'account_expires',
+        'account_first_login', 'account_last_login', 'analysis_ended',
+        'analysis_started', 'atime', 'created', 'created_time',
+        'credential_last_changed', 'ctime', 'date', 'end', 'first_observed',
+        'first_seen', 'last_observed', 'last_seen', 'modified',
+        'modified_time', 'mtime', 'object_modified', 'password_last_changed',
+        'private_key_usage_period_not_after',
+        'private_key_usage_period_not_before', 'published', 'start',
+        'start_time', 'stop_time', 'submitted', 'time_date_stamp',
+        'valid_from', 'valid_until', 'validity_not_after',
+        'validity_not_before'
+    )
+)
 
 
 def _get_stix2_content_version(stix2_content: dict):
@@ -56,29 +85,64 @@ def _handle_stix2_loading_error(stix2_content: dict):
     return bundle(*stix2_content, allow_custom=True, interoperability=True)
 
 
+def _is_stix2_object_from_misp(stix_object: dict) -> bool:
+    if stix_object['type'] not in _STIX2_event_types:
+        return False
+    labels = stix_object.get('labels', [])
+    return any(tag in labels for tag in _MISP_STIX_tags)
+
+
 def _load_stix1_package(filename, tries=0):
+    if isinstance(filename, (Path, str)):
+        if detect_compression(filename) is None:
+            return _parse_stix1_package(filename, tries)
+    with open_content(filename, 'rb') as f:
+        return _parse_stix1_package(f, tries)
+
+
+def _parse_stix1_package(stix_content, tries=0):
+    from stix.core import STIXPackage
     try:
-        return STIXPackage.from_xml(filename)
+        return STIXPackage.from_xml(stix_content)
     except NamespaceNotFoundError:
         if tries > 0:
             sys.exit('Cannot handle STIX namespace')
         _update_namespaces()
-        return _load_stix1_package(filename, tries + 1)
+        if hasattr(stix_content, 'seek'):
+            stix_content.seek(0)
+        return _parse_stix1_package(stix_content, tries + 1)
     except NotImplementedError:
         sys.exit('Missing python library: stix_edh')
     except Exception:
         try:
             import maec
-            return STIXPackage.from_xml(filename)
+            if hasattr(stix_content, 'seek'):
+                stix_content.seek(0)
+            return STIXPackage.from_xml(stix_content)
         except ImportError:
             sys.exit('Missing python library: maec')
         except Exception as error:
             sys.exit(f'Error while loading STIX1 package: {error.__str__()}')
 
 
-def _load_stix2_content(filename):
-    with open(filename, 'rt', encoding='utf-8') as f:
+def _load_stix2_content(filename, streaming: Optional[bool] = False,
+                        trusted: Optional[bool] = False):
+    if isinstance(filename, dict):
+        # Content already loaded, there is nothing left to stream
+        if trusted:
+            return _load_trusted_stix2_content(json.dumps(filename))
+        try:
+            return stix2_parser(
+                filename, allow_custom=True, interoperability=True
+            )
+        except (InvalidValueError, ParseError):
+            return _handle_stix2_loading_error(filename)
+    if streaming:
+        return STIX2BundleReader(filename, trusted=trusted)
+    with open_content(filename) as f:
         stix2_content = f.read()
+    if trusted:
+        return _load_trusted_stix2_content(stix2_content)
     try:
         return stix2_parser(
             stix2_content, allow_custom=True, interoperability=True
@@ -87,6 +151,18 @@ def _load_stix2_content(filename):
         return _handle_stix2_loading_error(json.loads(stix2_content))
 
 
+def _load_trusted_stix2_content(stix2_content: str) -> 'TrustedSTIX2Object':
+    bundle = json.loads(stix2_content, object_pairs_hook=TrustedSTIX2Object)
+    # Same version fix as the one applied by _handle_stix2_loading_error
+    if _get_stix2_content_version(bundle) == '2.1':
+        bundle.pop('spec_version', None)
+    else:
+        bundle['spec_version'] = '2.0'
+    for stix_object in bundle['objects']:
+        stix_object.parse_timestamps()
+    return bundle
+
+
 def _load_json_file(path):
     with open(path, 'rb') as f:
         return json.load(f)
@@ -106,6 +182,264 @@ def _update_namespaces():
         register_namespace(namespace)
 
 
+class STIX2BundleReader:
+    """
+    Incremental reader of a STIX 2 Bundle file.
+    The `objects` list is decoded one object at a time, so only the STIX object
+    currently handled is held in memory instead of the full file content, its
+    JSON representation and every python-stix2 object at once.
+    Every iteration over `objects` or `raw_objects` reads the file again -
+    the content can also be given as bytes or as a seekable file object,
+    which is then read again from its initial position.
+    With `trusted` set, `objects` yields TrustedSTIX2Object instances instead
+    of python-stix2 objects.
+    Whether the content comes from MISP is found out while reading the bundle
+    header, which goes on through the objects until a Report or Grouping
+    converted from a MISP event is found.
+    """
+    __chunk_size = 65536
+
+    def __init__(self, filename: Union[Path, str, bytes, IO],
+                 trusted: Optional[bool] = False):
+        self.__filename = filename
+        self.__position = (
+            filename.tell() if hasattr(filename, 'read') else None
+        )
+        self.__trusted = trusted
+        self.__from_misp = False
+        self.__header: dict = {}
+        self.__version: Optional[str] = None
+        self.__read_header()
+
+    @property
+    def from_misp(self) -> bool:
+        return self.__from_misp
+
+    @property
+    def id(self) -> str:
+        return self.__header['id']
+
+    @property
+    def objects(self):
+        bundle_version = '2.0' if 'spec_version' in self.__header else '2.1'
+        content_version = '2.0'
+        for stix_object in self.raw_objects:
+            if stix_object.get('spec_version'):
+                content_version = '2.1'
+            if self.__trusted:
+                stix_object.parse_timestamps()
+                yield stix_object
+                continue
+            yield dict_to_stix2(
+                stix_object, allow_custom=True, interoperability=True,
+                version=stix_object.get('spec_version', bundle_version)
+            )
+        if content_version == '2.1' or bundle_version == '2.1':
+            self.__version = '2.1'
+        else:
+            self.__version = '2.0'
+
+    @property
+    def raw_objects(self):
+        for key, value in self.__iterate_bundle():
+            if key == 'objects':
+                yield value
+
+    @property
+    def spec_version(self) -> str:
+        if self.__version is None:
+            raise AttributeError(
+                'The STIX version is only defined once the objects are loaded'
+            )
+        return self.__version
+
+    @property
+    def type(self) -> str:
+        return self.__header.get('type', 'bundle')
+
+    def __iterate_bundle(self):
+        decoder = json.JSONDecoder(
+            object_pairs_hook=TrustedSTIX2Object if self.__trusted else None
+        )
+        if self.__position is not None:
+            self.__filename.seek(self.__position)
+        with open_content(self.__filename) as f:
+            buffer = _STIX2Buffer(f, self.__chunk_size)
+            buffer.expect('{')
+            if buffer.next_is('}'):
+                return
+            while True:
+                key = buffer.decode(decoder)
+                buffer.expect(':')
+                if key == 'objects':
+                    buffer.expect('[')
+                    if not buffer.next_is(']'):
+                        while True:
+                            yield key, buffer.decode(decoder)
+                            if buffer.next_is(']'):
+                                break
+                            buffer.expect(',')
+                else:
+                    yield key, buffer.decode(decoder)
+                if buffer.next_is('}'):
+                    return
+                buffer.expect(',')
+
+    def __read_header(self):
+        for key, value in self.__iterate_bundle():
+            if key == 'objects':
+                if not self.__from_misp:
+                    self.__from_misp = _is_stix2_object_from_misp(value)
+                if self.__from_misp and 'id' in self.__header:
+                    break
+                continue
+            self.__header[key] = value
+        if self.__header.get('type') != 'bundle' or 'id' not in self.__header:
+            name = (
+                self.__filename if isinstance(self.__filename, (Path, str))
+                else 'The given content'
+            )
+            raise ParseError(f'{name} is not a valid STIX 2 Bundle')
+
+
+class TrustedSTIX2Object(dict):
+    """
+    STIX 2 object loaded from trusted content as a plain dict, skipping the
+    python-stix2 objects construction and properties validation.
+    Properties are also accessible as attributes, and timestamps are parsed
+    into datetime objects, like with python-stix2 objects, so the converters
+    handle both the same way.
+    """
+    __slots__ = ()
+
+    def __getattr__(self, name: str):
+        try:
+            return self[name]
+        except KeyError:
+            raise AttributeError(
+                f"'{self.get('type', 'STIX')}' object has no attribute "
+                f"'{name}'"
+            ) from None
+
+    def parse_timestamps(self):
+        self.__parse_timestamps(self)
+        for extension in self.get('extensions', {}).values():
+            self.__parse_timestamps(extension)
+        if 'x509_v3_extensions' in self:
+            self.__parse_timestamps(self['x509_v3_extensions'])
+        if self.get('type') == 'observed-data' and 'objects' in self:
+            for observable in self['objects'].values():
+                observable.parse_timestamps()
+
+    @staticmethod
+    def __parse_timestamps(stix_object: dict):
+        for key in _STIX2_TIMESTAMP_PROPERTIES.intersection(stix_object):
+            if isinstance(stix_object[key], str):
+                stix_object[key] = parse_into_datetime(stix_object[key])
+
+
+class _STIX2Buffer:
+    def __init__(self, file_object, chunk_size: int):
+        self.__file = file_object
+        self.__chunk_size = chunk_size
+        self.__buffer = ''
+        self.__position = 0
+        self.__eof = False
+
+    def decode(self, decoder: json.JSONDecoder):
+        self.__skip_whitespaces()
+        while True:
+            try:
+                value, end = decoder.raw_decode(self.__buffer, self.__position)
+                # A value ending with the buffer might be truncated
+                if end < len(self.__buffer) or self.__eof:
+                    self.__position = end
+                    return value
+            except json.JSONDecodeError:
+                if self.__eof:
+                    raise
+            self.__read(max(self.__chunk_size, len(self.__buffer)))
+
+    def expect(self, character: str):
+        if not self.next_is(character):
+            raise ParseError(
+                f'Invalid STIX 2 Bundle: expected {character!r} at position '
+                f'{self.__position}'
+            )
+
+    def next_is(self, character: str) -> bool:
+        self.__skip_whitespaces()
+        if self.__buffer[self.__position:self.__position + 1] == character:
+            self.__position += 1
+            return True
+        return False
+
+    def __read(self, size: int):
+        # Drop what has been decoded already so the buffer only holds the
+        # object currently being decoded
+        self.__buffer = self.__buffer[self.__position:]
+        self.__position = 0
+        chunk = self.__file.read(size)
+        if not chunk:
+            self.__eof = True
+        self.__buffer += chunk
+
+    def __skip_whitespaces(self):
+        while True:
+            length = len(self.__buffer)
+            while (self.__position < length and
+                    self.__buffer[self.__position] in ' \t\n\r'):
+                self.__position += 1
+            if self.__position < length or self.__eof:
+                return
+            self.__read(self.__chunk_size)
+
+
+class SynonymsMapping(dict):
+    """
+    Mapping of the Galaxy Clusters values and synonyms to their tag names.
+    All the names are also joined in a single string, in the mapping order,
+    so looking for the first name containing a given value is a `str.find`
+    call followed by a binary search on the names offsets, instead of a loop
+    testing every name.
+    """
+    __cache_size = 4096
+    __separator = '\x00'
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.__names = tuple(self)
+        self.__joined_names = self.__separator.join(self.__names)
+        self.__offsets = []
+        offset = 0
+        for name in self.__names:
+            self.__offsets.append(offset)
+            offset += len(name) + 1
+        self.__search = lru_cache(maxsize=self.__cache_size)(
+            self.__find_tag_names
+        )
+
+    def __reduce__(self):
+        # The search cache is rebuilt rather than pickled
+        return self.__class__, (dict(self),)
+
+    def search(self, value: str) -> Union[list, None]:
+        """
+        Returns the tag names of the first name containing `value`.
+        The results of the most recent searches are kept in a bounded cache.
+        """
+        return self.__search(value)
+
+    def __find_tag_names(self, value: str) -> Union[list, None]:
+        if not self.__names or self.__separator in value:
+            return None
+        position = self.__joined_names.find(value)
+        if position == -1:
+            return None
+        index = bisect_right(self.__offsets, position) - 1
+        return self[self.__names[index]]
+
+
 class ExternalSTIXtoMISPParser(metaclass=ABCMeta):
     def _set_cluster_distribution(
             self, distribution: int, sharing_group_id: Union[int, None]):
@@ -146,6 +480,8 @@ class STIXtoMISPParser(metaclass=ABCMeta):
         self.__errors: defaultdict = defaultdict(set)
         self.__warnings: defaultdict = defaultdict(set)
         self.__replacement_uuids: dict = {}
+        self.__extracted_uuids: dict = {}
+        self.__rfc_uuids: dict = {}
 
     def _populate_misp_event(self):
         self.misp_events.append(self.misp_event)
@@ -274,7 +610,7 @@ class STIXtoMISPParser(metaclass=ABCMeta):
         return self.__single_event
 
     @property
-    def synonyms_mapping(self) -> dict:
+    def synonyms_mapping(self) -> 'SynonymsMapping':
         try:
             return self.__synonyms_mapping
         except AttributeError:
@@ -336,12 +672,19 @@ class STIXtoMISPParser(metaclass=ABCMeta):
     ############################################################################
 
     def __get_relationship_types(self):
-        relationships_path = resources_path / 'misp-objects' / 'relationships'
-        relationships = _load_json_file(relationships_path / 'definition.json')
-        self.__relationship_types = {
-            relationship['name']: relationship['opposite'] for relationship
-            in relationships['values'] if 'opposite' in relationship
-        }
+        if 'relationship_types' not in _SHARED_RESOURCES:
+            relationships_path = (
+                resources_path / 'misp-objects' / 'relationships'
+            )
+            relationships = _load_json_file(
+                relationships_path / 'definition.json'
+            )
+            _SHARED_RESOURCES['relationship_types'] = {
+                relationship['name']: relationship['opposite']
+                for relationship in relationships['values']
+                if 'opposite' in relationship
+            }
+        self.__relationship_types = _SHARED_RESOURCES['relationship_types']
 
     ############################################################################
     #          SYNONYMS TO GALAXY TAG NAMES MAPPING HANDLING METHODS.          #
@@ -366,6 +709,11 @@ class STIXtoMISPParser(metaclass=ABCMeta):
         return fingerprint == latest_fingerprint
 
     def __get_galaxy_definitions(self):
+        fingerprint = self.__get_misp_galaxy_fingerprint()
+        shared = _SHARED_RESOURCES.get('galaxy_definitions')
+        if shared is not None and shared[0] == fingerprint:
+            self.__galaxy_definitions = shared[1]
+            return
         definitions_path = _DATA_PATH / 'galaxyDefinitions.json'
         if not definitions_path.exists() or not self.__galaxies_up_to_date():
             data_path = _DATA_PATH / 'misp-galaxy' / 'galaxies'
@@ -379,6 +727,9 @@ class STIXtoMISPParser(metaclass=ABCMeta):
                 f.write(json.dumps(definitions))
             self.__check_fingerprint()
         self.__galaxy_definitions = _load_json_file(definitions_path)
+        _SHARED_RESOURCES['galaxy_definitions'] = (
+            fingerprint, self.__galaxy_definitions
+        )
 
     @staticmethod
     def __get_misp_galaxy_fingerprint() -> Optional[str]:
@@ -403,6 +754,11 @@ class STIXtoMISPParser(metaclass=ABCMeta):
         return None
 
     def __get_synonyms_mapping(self):
+        fingerprint = self.__get_misp_galaxy_fingerprint()
+        shared = _SHARED_RESOURCES.get('synonyms_mapping')
+        if shared is not None and shared[0] == fingerprint:
+            self.__synonyms_mapping = shared[1]
+            return
         synonyms_path = _DATA_PATH / 'synonymsToTagNames.json'
         if not synonyms_path.exists() or not self.__galaxies_up_to_date():
             data_path = _DATA_PATH / 'misp-galaxy' / 'clusters'
@@ -422,16 +778,21 @@ class STIXtoMISPParser(metaclass=ABCMeta):
             with open(synonyms_path, 'wt', encoding='utf-8') as f:
                 f.write(json.dumps(synonyms_mapping))
             self.__check_fingerprint()
-        self.__synonyms_mapping = _load_json_file(synonyms_path)
+        self.__synonyms_mapping = SynonymsMapping(
+            _load_json_file(synonyms_path)
+        )
+        _SHARED_RESOURCES['synonyms_mapping'] = (
+            fingerprint, self.__synonyms_mapping
+        )
 
     ############################################################################
     #                     UUID SANITATION HANDLING METHODS                     #
     ############################################################################
 
     def _check_uuid(self, object_id: str):
-        object_uuid = self._extract_uuid(object_id)
+        object_uuid = self._get_uuid(object_id)
         replacement = (
-            UUID(object_uuid).version not in _RFC_VERSIONS and
+            not self._is_rfc_uuid(object_uuid) and
             object_uuid not in self.replacement_uuids
         )
         if replacement:
@@ -441,11 +802,30 @@ class STIXtoMISPParser(metaclass=ABCMeta):
 
     @staticmethod
     def _create_v5_uuid(value: str) -> UUID:
-        return uuid5(_UUIDv4, value)
+        # Same result as uuid5(_UUIDv4, value), without hashing the namespace
+        sha = _UUIDv5_NAMESPACE_HASH.copy()
+        sha.update(value.encode())
+        return UUID(bytes=sha.digest()[:16], version=5)
+
+    def _get_uuid(self, object_id: str) -> str:
+        try:
+            return self.__extracted_uuids[object_id]
+        except KeyError:
+            object_uuid = self._extract_uuid(object_id)
+            self.__extracted_uuids[object_id] = object_uuid
+            return object_uuid
+
+    def _is_rfc_uuid(self, object_uuid: str) -> bool:
+        try:
+            return self.__rfc_uuids[object_uuid]
+        except KeyError:
+            is_rfc = UUID(object_uuid).version in _RFC_VERSIONS
+            self.__rfc_uuids[object_uuid] = is_rfc
+            return is_rfc
 
     def _sanitise_attribute_uuid(
             self, object_id: str, comment: Optional[str] = None) -> dict:
-        attribute_uuid = self._extract_uuid(object_id)
+        attribute_uuid = self._get_uuid(object_id)
         attribute_comment = f'Original UUID was: {attribute_uuid}'
         if attribute_uuid in self.replacement_uuids:
             return {
@@ -455,7 +835,7 @@ class STIXtoMISPParser(metaclass=ABCMeta):
                     else f'{comment} - {attribute_comment}'
                 )
             }
-        if UUID(attribute_uuid).version not in _RFC_VERSIONS:
+        if not self._is_rfc_uuid(attribute_uuid):
             sanitised_uuid = self._create_v5_uuid(attribute_uuid)
             self.replacement_uuids[attribute_uuid] = sanitised_uuid
             return {
@@ -472,7 +852,7 @@ class STIXtoMISPParser(metaclass=ABCMeta):
 
     def _sanitise_object_uuid(
             self, misp_object: Union[MISPEvent, MISPObject], object_id: str):
-        object_uuid = self._extract_uuid(object_id)
+        object_uuid = self._get_uuid(object_id)
         if object_uuid in self.replacement_uuids:
             comment = f'Original UUID was: {object_uuid}'
             misp_object.comment = (
@@ -483,8 +863,8 @@ class STIXtoMISPParser(metaclass=ABCMeta):
         misp_object.uuid = object_uuid
 
     def _sanitise_uuid(self, object_id: str) -> str:
-        object_uuid = self._extract_uuid(object_id)
-        if UUID(object_uuid).version not in _RFC_VERSIONS:
+        object_uuid = self._get_uuid(object_id)
+        if not self._is_rfc_uuid(object_uuid):
             if object_uuid in self.replacement_uuids:
                 return self.replacement_uuids[object_uuid]
             sanitised_uuid = self._create_v5_uuid(object_uuid)
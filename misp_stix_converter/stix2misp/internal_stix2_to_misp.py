@@ -14,12 +14,13 @@ from .converters import (
     STIX2CustomObjectConverter)
 from .stix2_to_misp import STIX2toMISPParser, _OBSERVABLE_TYPING
 from collections import defaultdict
-from pymisp import MISPAttribute, MISPEventReport, MISPObject, MISPSighting
+from pymisp import (
+    MISPAttribute, MISPEvent, MISPEventReport, MISPObject, MISPSighting)
 from stix2.v20.sdo import CustomObject as CustomObject_v20
 from stix2.v20.sro import Sighting as Sighting_v20
 from stix2.v21.sdo import CustomObject as CustomObject_v21, Note, Opinion
 from stix2.v21.sro import Sighting as Sighting_v21
-from typing import Union
+from typing import Iterator, Union
 
 _CUSTOM_TYPING = Union[
     CustomObject_v20,
@@ -51,6 +52,10 @@ class InternalSTIX2toMISPParser(STIX2toMISPParser):
         self._tool_parser: InternalSTIX2ToolConverter
         self._vulnerability_parser: InternalSTIX2VulnerabilityConverter
 
+    def iter_misp_events(self, **kwargs) -> Iterator[MISPEvent]:
+        self._set_parameters(**kwargs)
+        yield from self._iter_stix_bundle()
+
     def parse_stix_bundle(self, **kwargs):
         self._set_parameters(**kwargs)
         self._parse_stix_bundle()
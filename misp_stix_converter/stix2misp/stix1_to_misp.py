@@ -647,9 +647,9 @@ class STIX1toMISPParser(STIXtoMISPParser, metaclass=ABCMeta):
             return self.synonyms_mapping[galaxy_name]
         for identifier in galaxy_name.split(' - '):
             if identifier[0].isalpha() and any(character.isdecimal() for character in identifier[1:]):
-                for name, tag_names in self.synonyms_mapping.items():
-                    if identifier in name:
-                        return tag_names
+                tag_names = self.synonyms_mapping.search(identifier)
+                if tag_names is not None:
+                    return tag_names
         return [f'misp-galaxy:{default_value}="{galaxy_name}"']
 
     ############################################################################
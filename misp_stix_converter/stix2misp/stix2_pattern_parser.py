@@ -1,20 +1,107 @@
 import ast
+import re
 import stix2patterns.v20.object_validator as validator_v20
 import stix2patterns.v21.object_validator as validator_v21
 from antlr4 import CommonTokenStream, InputStream, ParseTreeWalker
+from collections import OrderedDict, namedtuple
 from stix2.v20.sdo import Indicator as Indicator_v20
 from stix2.v21.sdo import Indicator as Indicator_v21
 from stix2patterns.exceptions import STIXPatternErrorListener
+from stix2patterns.inspector import _PatternData as PatternData
 from stix2patterns.v20.grammars.STIXPatternLexer import STIXPatternLexer as lexer_v20
 from stix2patterns.v20.grammars.STIXPatternParser import STIXPatternParser as parser_v20
 from stix2patterns.v20.inspector import InspectionListener as inspector_v20
 from stix2patterns.v21.grammars.STIXPatternLexer import STIXPatternLexer as lexer_v21
 from stix2patterns.v21.grammars.STIXPatternParser import STIXPatternParser as parser_v21
 from stix2patterns.v21.inspector import InspectionListener as inspector_v21
-from typing import Union
+from typing import Optional, Union
+
+CacheInfo = namedtuple('CacheInfo', ['hits', 'misses', 'maxsize', 'currsize'])
+
+# Hand-written recognition of the patterns made of a single observation
+# expression with AND-only comparisons, which most indicators are. Anything
+# outside of that subset (OR, FOLLOWEDBY, qualifiers, parentheses, index steps
+# in object paths, hex/binary/timestamp/float literals, set comparisons, ...)
+# is left to the ANTLR grammars.
+_WS = r'[ \t\r\n]'
+_IDENTIFIER = r'[a-zA-Z_][a-zA-Z0-9_]*'
+_STRING_LITERAL = r"'(?:[^'\\]|\\['\\])*'"
+_PATH_COMPONENT = f'{_IDENTIFIER}|{_STRING_LITERAL}'
+_SIMPLE_COMPARISON = re.compile(
+    f'{_WS}*(?P<object_type>[a-zA-Z_][a-zA-Z0-9_-]*):'
+    f'(?P<object_path>(?:{_PATH_COMPONENT})(?:\\.(?:{_PATH_COMPONENT}))*){_WS}*'
+    '(?:'
+    f"(?P<equality>==|=|!=|<>){_WS}*"
+    f'(?P<primitive>{_STRING_LITERAL}|-?(?:0|[1-9][0-9]*)|true|false)'
+    f'|(?P<ordering><=|<|>=|>){_WS}*'
+    f'(?P<orderable>{_STRING_LITERAL}|-?(?:0|[1-9][0-9]*))'
+    f'|(?P<keyword>LIKE|MATCHES|ISSUBSET|ISSUPERSET){_WS}+'
+    f'(?P<string>{_STRING_LITERAL})'
+    ')'
+)
+_SIMPLE_PATTERN_END = re.compile(f'{_WS}*\\]{_WS}*\\Z')
+_SIMPLE_PATTERN_SEPARATOR = re.compile(f'{_WS}+AND{_WS}+')
+_SIMPLE_PATTERN_START = re.compile(f'{_WS}*\\[')
+_PATH_COMPONENTS = re.compile(_PATH_COMPONENT)
+_RESERVED_KEYWORDS = (
+    'AND', 'EXISTS', 'FOLLOWEDBY', 'IN', 'ISSUBSET', 'ISSUPERSET', 'LAST',
+    'LIKE', 'MATCHES', 'NOT', 'OR', 'REPEATS', 'SECONDS', 'START', 'STOP',
+    'TIMES', 'WITHIN', 'false', 'true'
+)
+
+
+def _parse_simple_pattern(pattern_str: str) -> Optional[PatternData]:
+    """
+    Returns the raw pattern data that the ANTLR inspection listeners would
+    produce for patterns in the simple subset, or None otherwise.
+    """
+    start = _SIMPLE_PATTERN_START.match(pattern_str)
+    if start is None:
+        return None
+    comparisons = {}
+    position = start.end()
+    while True:
+        comparison = _SIMPLE_COMPARISON.match(pattern_str, position)
+        if comparison is None:
+            return None
+        object_type = comparison.group('object_type')
+        object_path = [
+            component[1:-1].replace("\\'", "'").replace('\\\\', '\\')
+            if component.startswith("'") else component
+            for component in _PATH_COMPONENTS.findall(
+                comparison.group('object_path')
+            )
+        ]
+        if any(item in _RESERVED_KEYWORDS
+               for item in (object_type, *object_path)):
+            return None
+        operator, value = (
+            group for group in comparison.group(
+                'equality', 'primitive', 'ordering', 'orderable', 'keyword',
+                'string'
+            ) if group is not None
+        )
+        comparisons.setdefault(object_type, []).append(
+            (object_path, operator, value)
+        )
+        position = comparison.end()
+        if _SIMPLE_PATTERN_END.match(pattern_str, position) is not None:
+            return PatternData(comparisons, set(), set())
+        separator = _SIMPLE_PATTERN_SEPARATOR.match(pattern_str, position)
+        if separator is None:
+            return None
+        position = separator.end()
 
 
 class STIX2PatternParser:
+    # Parsing results shared by every parser instance, keyed by
+    # (version, pattern) and holding either the pattern data of a valid
+    # pattern or the error messages of an invalid one
+    __cache = OrderedDict()
+    __cache_hits = 0
+    __cache_misses = 0
+    __cache_size = 4096
+
     def __init__(self):
         self.__pattern_data: dict
         self.__valid: bool
@@ -36,10 +123,66 @@ class STIX2PatternParser:
     def valid_versions(self) -> tuple:
         return self.__valid_versions
 
+    @classmethod
+    def cache_clear(cls):
+        cls.__cache.clear()
+        cls.__cache_hits = cls.__cache_misses = 0
+
+    @classmethod
+    def cache_info(cls) -> CacheInfo:
+        return CacheInfo(
+            cls.__cache_hits, cls.__cache_misses,
+            cls.__cache_size, len(cls.__cache)
+        )
+
+    @classmethod
+    def set_cache_size(cls, size: int):
+        """
+        Sets the maximum number of parsed patterns kept in the cache shared by
+        every parser instance - a size of 0 disables the cache.
+        """
+        if size < 0:
+            raise ValueError(f'Invalid pattern cache size: {size}')
+        cls.__cache_size = size
+        while len(cls.__cache) > size:
+            cls.__cache.popitem(last=False)
+
     def handle_indicator(
             self, indicator: Union[Indicator_v20, Indicator_v21, dict]):
         version = self.__set_version(indicator.get('spec_version', '2.0'))
-        getattr(self, f'_load_stix_{version}_pattern')(indicator['pattern'])
+        pattern_str = indicator['pattern']
+        cache = STIX2PatternParser.__cache
+        key = (version, pattern_str)
+        if key in cache:
+            cache.move_to_end(key)
+            STIX2PatternParser.__cache_hits += 1
+            self.__valid, result = cache[key]
+            if self.__valid:
+                self.__pattern_data = result
+            else:
+                self.__errors = result
+            return
+        STIX2PatternParser.__cache_misses += 1
+        if not self._load_simple_pattern(pattern_str, version):
+            getattr(self, f'_load_stix_{version}_pattern')(pattern_str)
+        if STIX2PatternParser.__cache_size > 0:
+            cache[key] = (
+                self.__valid,
+                self.__pattern_data if self.__valid else self.__errors
+            )
+            if len(cache) > STIX2PatternParser.__cache_size:
+                cache.popitem(last=False)
+
+    def _load_simple_pattern(self, pattern_str: str, version: str) -> bool:
+        pattern_data = _parse_simple_pattern(pattern_str)
+        if pattern_data is None:
+            return False
+        validator = validator_v20 if version == '20' else validator_v21
+        errors = validator.verify_object(pattern_data)
+        if not errors:
+            self.__set_pattern_data(pattern_data)
+        self.__valid = self.__parse_err_listener(errors)
+        return True
 
     def _load_stix_20_pattern(self, pattern_str: str):
         pattern = InputStream(pattern_str)
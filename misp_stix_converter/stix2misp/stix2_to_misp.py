@@ -12,7 +12,8 @@ from .exceptions import (
     UnknownParsingFunctionError, UnknownPatternTypeError,
     UnknownStixObjectTypeError)
 from .external_stix2_mapping import ExternalSTIX2toMISPMapping
-from .importparser import STIXtoMISPParser, _load_stix2_content
+from .importparser import (
+    STIX2BundleReader, STIXtoMISPParser, _load_stix2_content)
 from .internal_stix2_mapping import InternalSTIX2toMISPMapping
 from abc import ABCMeta
 from collections import defaultdict
@@ -50,7 +51,7 @@ from stix2.v21.sdo import (
     Vulnerability as Vulnerability_v21)
 from stix2.v21.sro import (
     Relationship as Relationship_v21, Sighting as Sighting_v21)
-from typing import Optional, Union
+from typing import Iterator, Optional, Union
 
 # Some constants
 _LOADED_FEATURES = (
@@ -96,6 +97,32 @@ _SIGHTING_TYPING = Union[
 ]
 
 
+class _EventReferences:
+    """
+    Reverse index from MISP event UUIDs to the ids of the loaded STIX objects
+    (observables or galaxy clusters) each event refers to, so that the
+    content of an event is processed without going through every loaded
+    object. The ids are returned in the order the objects were loaded.
+    """
+    def __init__(self):
+        self.__positions: dict = {}
+        self.__references: defaultdict = defaultdict(set)
+
+    def add(self, event_uuid: str, object_id: str):
+        self.register(object_id)
+        self.__references[event_uuid].add(object_id)
+
+    def get(self, event_uuid: str) -> list:
+        return sorted(
+            self.__references.get(event_uuid, ()),
+            key=self.__positions.__getitem__
+        )
+
+    def register(self, object_id: str):
+        if object_id not in self.__positions:
+            self.__positions[object_id] = len(self.__positions)
+
+
 class STIX2toMISPParser(STIXtoMISPParser, metaclass=ABCMeta):
     def __init__(self):
         super().__init__()
@@ -104,8 +131,13 @@ class STIX2toMISPParser(STIXtoMISPParser, metaclass=ABCMeta):
             ExternalSTIX2toMISPMapping, InternalSTIX2toMISPMapping
         ]
 
+        self.__loading_functions: dict = {}
+        self.__object_parsers: dict = {}
+        self.__stix_object_features: dict = {}
+
         self._analyst_data: dict = defaultdict(list)
         self._clusters: dict = {}
+        self._clusters_references = _EventReferences()
         self._galaxies: dict = {}
 
         self._attack_pattern: dict
@@ -129,9 +161,9 @@ class STIX2toMISPParser(STIXtoMISPParser, metaclass=ABCMeta):
         self._tool: dict
         self._vulnerability: dict
 
-    def load_stix_bundle(self, bundle: Union[Bundle_v20, Bundle_v21]):
+    def load_stix_bundle(
+            self, bundle: Union[Bundle_v20, Bundle_v21, STIX2BundleReader]):
         self._identifier = bundle.id
-        self.__stix_version = getattr(bundle, 'spec_version', '2.1')
         n_report = 0
         for stix_object in bundle.objects:
             try:
@@ -140,8 +172,14 @@ class STIX2toMISPParser(STIXtoMISPParser, metaclass=ABCMeta):
                 object_type = stix_object['type']
             if object_type in ('grouping', 'report'):
                 n_report += 1
-            feature = self._mapping.stix_object_loading_mapping(object_type)
-            if feature is None:
+            try:
+                loading_function = self.__loading_functions[object_type]
+            except KeyError:
+                feature = self._mapping.stix_object_loading_mapping(object_type)
+                loading_function = self.__loading_functions[object_type] = (
+                    None if feature is None else getattr(self, feature)
+                )
+            if loading_function is None:
                 self._add_error(
                     f'Unable to load STIX object type: {object_type}'
                 )
@@ -149,7 +187,7 @@ class STIX2toMISPParser(STIXtoMISPParser, metaclass=ABCMeta):
             if hasattr(stix_object, 'created_by_ref'):
                 self._creators.add(stix_object.created_by_ref)
             try:
-                getattr(self, feature)(stix_object)
+                loading_function(stix_object)
             except MarkingDefinitionLoadingError as marking_definition_id:
                 self._add_error(
                     'Error whil parsing the Marking Definition '
@@ -157,24 +195,51 @@ class STIX2toMISPParser(STIXtoMISPParser, metaclass=ABCMeta):
                 )
             except AttributeError as exception:
                 self._critical_error(exception)
+        # With a streamed bundle, the version is known once objects are loaded
+        self.__stix_version = getattr(bundle, 'spec_version', '2.1')
         self.__n_report = 2 if n_report >= 2 else n_report
 
-    def parse_stix_content(self, filename: str, **kwargs):
+    def parse_stix_content(
+            self, filename: str, streaming: Optional[bool] = False,
+            trusted: Optional[bool] = False, **kwargs):
         try:
-            bundle = _load_stix2_content(filename)
+            bundle = _load_stix2_content(
+                filename, streaming=streaming, trusted=trusted
+            )
         except Exception as exception:
             sys.exit(exception)
         self.load_stix_bundle(bundle)
         del bundle
         self.parse_stix_bundle(**kwargs)
 
-    def _parse_stix_bundle(self):
+    def _iter_stix_bundle(self) -> Iterator[MISPEvent]:
+        feature = self.__get_bundle_parsing_feature()
         try:
-            feature = self._mapping.bundle_to_misp_mapping(str(self.__n_report))
-        except AttributeError:
-            sys.exit(
-                'No STIX content loaded, please run `load_stix_content` first.'
+            multiple_events = (
+                feature == '_parse_bundle_with_multiple_reports' and
+                not self.single_event
             )
+            if multiple_events:
+                yield from self._parse_reports_as_events()
+            else:
+                getattr(self, feature)()
+                yield self.misp_event
+        except (
+            SynonymsResourceJSONError,
+            UnavailableGalaxyResourcesError,
+            UnavailableSynonymsResourceError
+        ) as error:
+            self._critical_error(error)
+            misp_event = getattr(self, 'misp_event', None)
+            if not multiple_events and misp_event is not None:
+                # Like with `parse_stix_bundle`, what has been converted of
+                # the single MISP event before the error is still returned
+                yield misp_event
+        finally:
+            self.__clear_loaded_features()
+
+    def _parse_stix_bundle(self):
+        feature = self.__get_bundle_parsing_feature()
         try:
             getattr(self, feature)()
         except (
@@ -183,10 +248,21 @@ class STIX2toMISPParser(STIXtoMISPParser, metaclass=ABCMeta):
             UnavailableSynonymsResourceError
         ) as error:
             self._critical_error(error)
+        self.__clear_loaded_features()
+
+    def __clear_loaded_features(self):
         for feature in ('_grouping', '_report', *_LOADED_FEATURES):
             if hasattr(self, feature):
                 setattr(self, feature, {})
 
+    def __get_bundle_parsing_feature(self) -> str:
+        try:
+            return self._mapping.bundle_to_misp_mapping(str(self.__n_report))
+        except AttributeError:
+            sys.exit(
+                'No STIX content loaded, please run `load_stix_content` first.'
+            )
+
     ############################################################################
     #                                PROPERTIES                                #
     ############################################################################
@@ -357,19 +433,28 @@ class STIX2toMISPParser(STIXtoMISPParser, metaclass=ABCMeta):
 
     def _get_stix_object(self, object_ref: str):
         object_type = object_ref.split('--')[0]
-        if object_type.startswith('x-misp-'):
-            object_type = (
-                'note' if object_type == 'x-misp-event-report'
-                else object_type.replace('x-misp', 'custom')
+        try:
+            loaded_type, feature = self.__stix_object_features[object_type]
+        except KeyError:
+            loaded_type, feature = self.__stix_object_features[object_type] = (
+                self.__get_stix_object_feature(object_type)
             )
-        feature = f"_{object_type.replace('-', '_')}"
         try:
             return getattr(self, feature)[object_ref]
         except AttributeError:
-            raise ObjectTypeLoadingError(object_type)
+            raise ObjectTypeLoadingError(loaded_type)
         except KeyError:
             raise ObjectRefLoadingError(object_ref)
 
+    @staticmethod
+    def __get_stix_object_feature(object_type: str) -> tuple:
+        if object_type.startswith('x-misp-'):
+            object_type = (
+                'note' if object_type == 'x-misp-event-report'
+                else object_type.replace('x-misp', 'custom')
+            )
+        return object_type, f"_{object_type.replace('-', '_')}"
+
     def _handle_unparsed_content(self):
         if hasattr(self, '_observed_data_parser'):
             if hasattr(self.observed_data_parser, '_observable_relationships'):
@@ -385,13 +470,12 @@ class STIX2toMISPParser(STIXtoMISPParser, metaclass=ABCMeta):
             getattr(self, f'_parse_galaxies_{self.galaxy_feature}')()
 
     def _handle_object(self, object_type: str, object_ref: str):
-        feature = self._mapping.stix_to_misp_mapping(object_type)
-        if feature is None:
-            raise UnknownStixObjectTypeError(object_type)
         try:
-            parser = getattr(self, feature)
-        except AttributeError:
-            raise UnknownParsingFunctionError(feature)
+            parser = self.__object_parsers[object_type]
+        except KeyError:
+            parser = self.__object_parsers[object_type] = (
+                self.__get_object_parser(object_type)
+            )
         try:
             parser.parse(object_ref)
         except ObjectRefLoadingError as error:
@@ -476,20 +560,8 @@ class STIX2toMISPParser(STIXtoMISPParser, metaclass=ABCMeta):
             self._handle_unparsed_content()
         else:
             self._set_misp_events()
-            if getattr(self, '_report', None):
-                for report in self._report.values():
-                    self._set_misp_event(self._misp_event_from_report(report))
-                    self._handle_object_refs(report.object_refs)
-                    self._handle_unparsed_content()
-                    self._populate_misp_event()
-            if getattr(self, '_grouping', None):
-                for grouping in self._grouping.values():
-                    self._set_misp_event(
-                        self._misp_event_from_grouping(grouping)
-                    )
-                    self._handle_object_refs(grouping.object_refs)
-                    self._handle_unparsed_content()
-                    self._populate_misp_event()
+            for _ in self._parse_reports_as_events():
+                self._populate_misp_event()
 
     def _parse_bundle_with_no_report(self):
         self._set_single_event(True)
@@ -511,12 +583,26 @@ class STIX2toMISPParser(STIXtoMISPParser, metaclass=ABCMeta):
             self._parse_bundle_with_no_report()
         self._handle_unparsed_content()
 
+    def _parse_reports_as_events(self) -> Iterator[MISPEvent]:
+        if getattr(self, '_report', None):
+            for report in self._report.values():
+                self._set_misp_event(self._misp_event_from_report(report))
+                self._handle_object_refs(report.object_refs)
+                self._handle_unparsed_content()
+                yield self.misp_event
+        if getattr(self, '_grouping', None):
+            for grouping in self._grouping.values():
+                self._set_misp_event(self._misp_event_from_grouping(grouping))
+                self._handle_object_refs(grouping.object_refs)
+                self._handle_unparsed_content()
+                yield self.misp_event
+
     def _parse_galaxies_as_container(self):
         clusters = defaultdict(list)
-        for cluster in self._clusters.values():
-            if self.misp_event.uuid not in cluster['used']:
-                continue
-            if not cluster['used'][self.misp_event.uuid]:
+        event_uuid = self.misp_event.uuid
+        for cluster_id in self._clusters_references.get(event_uuid):
+            cluster = self._clusters[cluster_id]
+            if not cluster['used'][event_uuid]:
                 misp_cluster = cluster['cluster']
                 clusters[misp_cluster.type].append(misp_cluster)
         if clusters:
@@ -524,13 +610,22 @@ class STIX2toMISPParser(STIXtoMISPParser, metaclass=ABCMeta):
                 self.misp_event.add_galaxy(galaxy)
 
     def _parse_galaxies_as_tag_names(self):
-        for tags in self._clusters.values():
-            if self.misp_event.uuid not in tags['used']:
-                continue
-            if not tags['used'][self.misp_event.uuid]:
+        event_uuid = self.misp_event.uuid
+        for cluster_id in self._clusters_references.get(event_uuid):
+            tags = self._clusters[cluster_id]
+            if not tags['used'][event_uuid]:
                 for tag in tags['tag_names']:
                     self.misp_event.add_tag(tag)
 
+    def __get_object_parser(self, object_type: str):
+        feature = self._mapping.stix_to_misp_mapping(object_type)
+        if feature is None:
+            raise UnknownStixObjectTypeError(object_type)
+        try:
+            return getattr(self, feature)
+        except AttributeError:
+            raise UnknownParsingFunctionError(feature)
+
     def _parse_loaded_features(self):
         for feature in _LOADED_FEATURES:
             if hasattr(self, feature):
@@ -76,6 +76,21 @@ class TestCollectionSTIX2Export(TestCollectionSTIXExport):
         self.assertEqual(reference['objects'], to_test['objects'])
 
 
+class TestSTIX2TrustedExport:
+    """
+    Runs the export tests of the class it is mixed with in trusted mode,
+    every STIX object being also built with python-stix2 to check both
+    serialise the same way.
+    """
+
+    def setUp(self):
+        super().setUp()
+        self.parser = type(self.parser)(
+            interoperability=self.parser.interoperability, trusted=True,
+            validation_rate=1.0
+        )
+
+
 class TestSTIX2Export(TestSTIX):
     _labels = [
         'Threat-Report',
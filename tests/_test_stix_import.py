@@ -7,6 +7,8 @@ from collections import defaultdict
 from misp_stix_converter import (
     ExternalSTIX2toMISPMapping, ExternalSTIX2toMISPParser,
     InternalSTIX2toMISPParser, MISP_org_uuid)
+from misp_stix_converter.stix2misp.importparser import (
+    _load_trusted_stix2_content)
 from uuid import UUID, uuid5
 from ._test_stix import TestSTIX
 from .update_documentation import AttributesDocumentationUpdater, ObjectsDocumentationUpdater
@@ -378,6 +380,23 @@ class TestSTIX21Import(TestSTIX2Import):
             }
 
 
+class TestSTIX2TrustedImport:
+    """
+    Runs the import tests of the class it is mixed with on the same bundles,
+    loaded as trusted content: the parser gets plain dicts instead of
+    python-stix2 objects, while the checks still use the python-stix2 ones.
+    """
+
+    def setUp(self):
+        super().setUp()
+        load_stix_bundle = self.parser.load_stix_bundle
+
+        def load_trusted_stix_bundle(bundle):
+            load_stix_bundle(_load_trusted_stix2_content(bundle.serialize()))
+
+        self.parser.load_stix_bundle = load_trusted_stix_bundle
+
+
 class TestExternalSTIX2Import(TestSTIX2Import):
     _galaxy_name_mapping = ExternalSTIX2toMISPMapping().galaxy_name_mapping
 
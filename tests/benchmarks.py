@@ -0,0 +1,614 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+Performance regression benchmarks - not collected by the test suite, the
+dispatch timing harness being also run at a smaller scale by
+tests/test_stix2_dispatch.py.
+
+    python -m tests.benchmarks cache [--events 500]
+    python -m tests.benchmarks dispatch [--attributes 100000]
+    python -m tests.benchmarks event_reports [--attributes 20000]
+    python -m tests.benchmarks mappings [--rounds 500]
+    python -m tests.benchmarks object_references [--objects 8000]
+    python -m tests.benchmarks object_refs [--attributes 50000]
+    python -m tests.benchmarks startup
+    python -m tests.benchmarks stix1_export [--attributes 10000]
+    python -m tests.benchmarks trusted_export [--attributes 20000]
+    python -m tests.benchmarks trusted_import [--attributes 20000]
+    python -m tests.benchmarks uuids [--objects 100000]
+"""
+
+import argparse
+import os
+import subprocess
+import sys
+from copy import deepcopy
+from io import StringIO
+from misp_stix_converter import MISPtoSTIX20Parser, MISPtoSTIX21Parser
+from pathlib import Path
+from tempfile import TemporaryDirectory
+from time import perf_counter
+from uuid import NAMESPACE_URL, UUID, uuid4, uuid5
+from .test_events import (
+    _BASE_EVENT, _TEST_ATTACK_PATTERN_GALAXY, _TEST_IP_PORT_OBJECT)
+from .test_stix2_dispatch import _time_attribute_dispatch
+
+_VERSIONS = {
+    '2.0': MISPtoSTIX20Parser,
+    '2.1': MISPtoSTIX21Parser
+}
+_TESTS_PATH = Path(__file__).parent.resolve()
+_STARTUP_COMMANDS = {
+    'export -v 2.1': (
+        'export', '-v', '2.1', '-f',
+        str(_TESTS_PATH / 'test_events_collection_1.json')
+    ),
+    'import -v 2': (
+        'import', '-v', '2', '-f', str(_TESTS_PATH / 'test_event1_stix21.json')
+    )
+}
+_MAPPING_MODULES = (
+    'misp2stix.stix20_mapping', 'misp2stix.stix21_mapping',
+    'misp2stix.stix2_mapping', 'stix2misp.external_stix2_mapping',
+    'stix2misp.internal_stix2_mapping', 'stix2misp.stix2_mapping'
+)
+_STIX1_LIBRARIES = ('cybox', 'maec', 'stix')
+
+
+################################################################################
+#                        SYNTHETIC CONTENT GENERATION                        #
+################################################################################
+
+def _synthetic_event(attributes: int, galaxies: bool = True) -> dict:
+    event = deepcopy(_BASE_EVENT)
+    event['Event']['published'] = True
+    event['Event']['publish_timestamp'] = event['Event']['timestamp']
+    event['Event']['Attribute'] = [
+        {
+            'uuid': str(uuid5(NAMESPACE_URL, f'attribute-{index}')),
+            'type': 'ip-dst', 'category': 'Network activity',
+            'value': f'10.{index >> 16 & 255}.{index >> 8 & 255}.{index & 255}',
+            'timestamp': '1603642920', 'to_ids': True
+        } for index in range(attributes)
+    ]
+    if galaxies:
+        for attribute in event['Event']['Attribute']:
+            attribute['Galaxy'] = [deepcopy(_TEST_ATTACK_PATTERN_GALAXY)]
+    return event
+
+
+def _synthetic_reported_event(attributes: int, reports: int,
+                              references: int) -> dict:
+    event = _synthetic_event(attributes, galaxies=False)
+    event['Event']['EventReport'] = []
+    for index in range(reports):
+        referenced = event['Event']['Attribute'][
+            index * references:(index + 1) * references
+        ]
+        content = ' '.join(
+            f"Seen @[attribute]({attribute['uuid']}) in the wild."
+            for attribute in referenced
+        )
+        event['Event']['EventReport'].append(
+            {
+                'uuid': str(uuid5(NAMESPACE_URL, f'report-{index}')),
+                'name': f'Report {index}', 'timestamp': '1603642920',
+                'content': f'# Report {index}\n\n{content}'
+            }
+        )
+    return event
+
+
+def _synthetic_referenced_event(objects: int, references: int) -> dict:
+    event = deepcopy(_BASE_EVENT)
+    event['Event']['Object'] = []
+    for index in range(objects):
+        misp_object = deepcopy(_TEST_IP_PORT_OBJECT)
+        misp_object['uuid'] = str(uuid5(NAMESPACE_URL, f'object-{index}'))
+        for attribute in misp_object['Attribute']:
+            attribute['uuid'] = str(uuid4())
+        misp_object['ObjectReference'] = [
+            {
+                'referenced_uuid': event['Event']['Object'][target]['uuid'],
+                'relationship_type': 'connected-to'
+            } for target in range(max(index - references, 0), index)
+        ]
+        event['Event']['Object'].append(misp_object)
+    return event
+
+
+################################################################################
+#                                 BENCHMARKS                                 #
+################################################################################
+
+def _benchmark_cache(args):
+    from misp_stix_converter.misp2stix.stix2_cache import STIX2ResultCache
+    from misp_stix_converter.misp2stix.stix2_writer import STIX2BundleWriter
+    events = []
+    for _ in range(args.events):
+        event = _synthetic_event(args.attributes)
+        event['Event']['uuid'] = str(uuid4())
+        events.append(event)
+    with TemporaryDirectory() as cache_dir:
+        with STIX2ResultCache(Path(cache_dir) / 'cache.db') as cache:
+            for run in ('uncached', 'cold', 'warm'):
+                parser = _VERSIONS[args.stix_version](
+                    cache=None if run == 'uncached' else cache
+                )
+                content = {'response': deepcopy(events)}
+                start = perf_counter()
+                with STIX2BundleWriter(
+                        StringIO(), version=args.stix_version) as writer:
+                    parser.write_json_content(content, writer)
+                print(
+                    f'{run:>8} export of {args.events} events: '
+                    f'{perf_counter() - start:6.2f}s'
+                )
+            print(f'cache size: {cache.size / 1000000:.1f}MB')
+
+
+def _benchmark_dispatch(args):
+    event = _synthetic_event(args.attributes, galaxies=False)
+    durations = _time_attribute_dispatch(
+        _VERSIONS[args.stix_version], event['Event']['Attribute']
+    )
+    for name, duration in zip(('previous', 'current'), durations):
+        print(
+            f'{name:>8} dispatch of {args.attributes} attributes: '
+            f'{duration:.3f}s ({duration / args.attributes * 1e9:.0f}ns '
+            'per attribute)'
+        )
+    parser = _VERSIONS[args.stix_version](trusted=True)
+    start = perf_counter()
+    parser.parse_misp_event(event)
+    duration = perf_counter() - start
+    print(
+        f'export of {args.attributes} attributes: {duration:.2f}s '
+        f'({duration / args.attributes * 1e6:.1f}µs per attribute)'
+    )
+
+
+def _benchmark_event_reports(args):
+    import re
+    previous_regex = r'@[!]?\[%s\]\([0-9a-f]{8}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{12}\)'
+    event = _synthetic_reported_event(
+        args.attributes, args.reports, args.references
+    )
+    contents = [
+        event_report['content'] for event_report in event['Event']['EventReport']
+    ]
+
+    def previous_scan():
+        for content in contents:
+            {
+                reference.split('(')[1][:-1]
+                for feature in ('attribute', 'object')
+                for reference in re.findall(previous_regex % feature, content)
+            }
+
+    def current_scan():
+        from misp_stix_converter.misp2stix.misp_to_stix2 import (
+            _event_report_pattern)
+        for content in contents:
+            set(_event_report_pattern.findall(content))
+
+    for name, method in (('previous', previous_scan), ('current', current_scan)):
+        start = perf_counter()
+        for _ in range(args.rounds):
+            method()
+        print(
+            f'{name:>8} scan of {args.reports} reports x {args.rounds}: '
+            f'{perf_counter() - start:.2f}s'
+        )
+    parser = _VERSIONS[args.stix_version](trusted=True)
+    start = perf_counter()
+    parser.parse_misp_event(event)
+    print(
+        f'export of {args.attributes} attributes & {args.reports} reports: '
+        f'{perf_counter() - start:.2f}s, '
+        f'{len(parser._event_report_matching)} matching uuids recorded'
+    )
+
+
+def _benchmark_mappings(args):
+    from importlib import import_module
+    from misp_stix_converter import Mapping
+
+    class PreviousMapping(dict):
+        # Mapping implementation with a Python level __getattribute__ hook
+        def __getattribute__(self, attribute):
+            if attribute in ('clear', 'update', 'pop', 'popitem', 'setdefault'):
+                raise AttributeError(attribute)
+            return super().__getattribute__(attribute)
+
+    tables = []
+    for module_name in _MAPPING_MODULES:
+        module = import_module(f'misp_stix_converter.{module_name}')
+        for value in vars(module).values():
+            if isinstance(value, type):
+                tables.extend(
+                    table for table in vars(value).values()
+                    if isinstance(table, Mapping)
+                )
+    keys = [(table, tuple(table)) for table in tables]
+    print(
+        f'{len(tables)} mapping tables with '
+        f'{sum(len(table) for table in tables)} keys'
+    )
+    for name, mapping_type in (('previous', PreviousMapping),
+                               ('current', Mapping)):
+        mappings = [(mapping_type(table), fields) for table, fields in keys]
+        start = perf_counter()
+        for _ in range(args.rounds):
+            for mapping, fields in mappings:
+                for field in fields:
+                    mapping.get(field)
+                    field in mapping
+                mapping.items()
+        print(
+            f'{name:>8} lookups x {args.rounds}: '
+            f'{perf_counter() - start:.2f}s'
+        )
+
+
+def _benchmark_object_references(args):
+    sizes = [args.objects // 4, args.objects // 2, args.objects]
+    timings = []
+    for size in sizes:
+        event = _synthetic_referenced_event(size, args.references)
+        parser = _VERSIONS[args.stix_version](trusted=True)
+        start = perf_counter()
+        parser.parse_misp_event(event)
+        timings.append(perf_counter() - start)
+        print(
+            f'{size:>7} objects with {args.references} references each: '
+            f'{timings[-1]:8.2f}s'
+        )
+    ratio = timings[-1] / timings[0]
+    print(
+        f'Scaling factor for 4x the objects: {ratio:.2f} '
+        '(~4 when linear, ~16 when quadratic)'
+    )
+
+
+def _benchmark_object_refs(args):
+    sizes = [args.attributes // 4, args.attributes // 2, args.attributes]
+    timings = []
+    for size in sizes:
+        event = _synthetic_event(size)
+        parser = _VERSIONS[args.stix_version]()
+        start = perf_counter()
+        parser.parse_misp_event(event)
+        timings.append(perf_counter() - start)
+        print(
+            f'{size:>7} galaxy tagged attributes: {timings[-1]:8.2f}s '
+            f'({timings[-1] / size * 1000000:.1f}µs per attribute)'
+        )
+    ratio = timings[-1] / timings[0]
+    print(
+        f'Scaling factor for 4x the attributes: {ratio:.2f} '
+        '(~4 when linear, ~16 when quadratic)'
+    )
+
+
+def _benchmark_startup(args):
+    for name, command in _STARTUP_COMMANDS.items():
+        with TemporaryDirectory() as output_dir:
+            script = (
+                'import sys; from misp_stix_converter import main; '
+                f'sys.argv = {["misp_stix_converter", *command]!r}; main()'
+            )
+            start = perf_counter()
+            process = subprocess.run(
+                [sys.executable, '-X', 'importtime', '-c', script],
+                capture_output=True, cwd=output_dir, text=True,
+                env={**os.environ, 'PYTHONPATH': str(_TESTS_PATH.parent)}
+            )
+            duration = perf_counter() - start
+        if process.returncode != 0:
+            sys.exit(f'{name} failed:\n{process.stderr[-2000:]}')
+        imports = _parse_importtime(process.stderr)
+        total = sum(self_time for self_time, _ in imports.values())
+        print(
+            f'{name}: {duration:.2f}s wall, {total / 1000000:.2f}s of imports '
+            f'({len(imports)} modules)'
+        )
+        for library in _STIX1_LIBRARIES:
+            if library in imports:
+                print(
+                    f'    {library} loaded: '
+                    f'{imports[library][1] / 1000000:.2f}s cumulative'
+                )
+        slowest = sorted(
+            (cumulative, module) for module, (_, cumulative) in imports.items()
+            if '.' not in module
+        )[-args.top:]
+        for cumulative, module in reversed(slowest):
+            print(f'    {module:<30} {cumulative / 1000:8.1f}ms')
+
+
+def _benchmark_stix1_export(args):
+    import tracemalloc
+    from misp_stix_converter.misp2stix.framing import _handle_namespaces
+    from misp_stix_converter.misp2stix.misp_to_stix1 import (
+        MISPtoSTIX1EventsParser)
+    from misp_stix_converter.misp2stix.stix1_mapping import SCHEMALOC_DICT
+    from misp_stix_converter.misp2stix.stix1_writer import STIX1XMLWriter
+    parser = MISPtoSTIX1EventsParser('MISP', '1.2')
+    parser.parse_misp_event(_synthetic_event(args.attributes, galaxies=False))
+    namespaces = _handle_namespaces('https://misp-project.org', 'MISP')
+
+    def previous_export(filename: Path):
+        with open(filename, 'wb') as f:
+            f.write(
+                parser.stix_package.to_xml(
+                    auto_namespace=False, ns_dict=namespaces,
+                    schemaloc_dict=SCHEMALOC_DICT
+                )
+            )
+
+    def current_export(filename: Path):
+        with open(filename, 'wt', encoding='utf-8') as f:
+            STIX1XMLWriter(f, parser.stix_package, namespaces).close()
+
+    with TemporaryDirectory() as output_dir:
+        for name, method in (('previous', previous_export),
+                             ('current', current_export)):
+            filename = Path(output_dir) / f'{name}.xml'
+            tracemalloc.start()
+            start = perf_counter()
+            method(filename)
+            duration = perf_counter() - start
+            _, peak = tracemalloc.get_traced_memory()
+            tracemalloc.stop()
+            print(
+                f'{name:>8} XML export of {args.attributes} attributes: '
+                f'{duration:6.2f}s, {peak / 1000000:7.1f}MB peak, '
+                f'{filename.stat().st_size / 1000000:.1f}MB written'
+            )
+
+
+def _benchmark_trusted_export(args):
+    event = _synthetic_event(args.attributes)
+    for trusted in (False, True):
+        parser = _VERSIONS[args.stix_version](
+            trusted=trusted, validation_rate=args.validation_rate
+        )
+        start = perf_counter()
+        parser.parse_misp_event(deepcopy(event))
+        size = len(parser.bundle.serialize(indent=4)) / 1000000
+        print(
+            f'{"trusted" if trusted else "validated":>9} export of '
+            f'{args.attributes} attributes: {perf_counter() - start:6.2f}s '
+            f'({size:.1f}MB)'
+        )
+
+
+def _benchmark_trusted_import(args):
+    from misp_stix_converter import InternalSTIX2toMISPParser
+    from misp_stix_converter.stix2misp.importparser import _load_stix2_content
+    parser = MISPtoSTIX21Parser()
+    parser.parse_misp_event(_synthetic_event(args.attributes, galaxies=False))
+    with TemporaryDirectory() as output_dir:
+        filename = Path(output_dir) / 'bundle.json'
+        filename.write_text(parser.bundle.serialize())
+        size = filename.stat().st_size / 1000000
+        for trusted in (False, True):
+            start = perf_counter()
+            bundle = _load_stix2_content(filename, trusted=trusted)
+            loaded = perf_counter()
+            stix_parser = InternalSTIX2toMISPParser()
+            stix_parser.load_stix_bundle(bundle)
+            stix_parser.parse_stix_bundle()
+            end = perf_counter()
+            print(
+                f'{"trusted" if trusted else "validated":>9} import of '
+                f'{size:.1f}MB: {loaded - start:6.2f}s loading, '
+                f'{end - start:6.2f}s total'
+            )
+
+
+def _benchmark_uuids(args):
+    from misp_stix_converter import ExternalSTIX2toMISPParser
+    from misp_stix_converter.stix2misp.importparser import (
+        _RFC_VERSIONS, _UUIDv4)
+    # Every SCO is referenced by its observed-data, a relationship and a
+    # report, and converted into a MISP object with 4 attributes
+    object_ids = [f'ipv4-addr--{uuid4()}' for _ in range(args.objects)]
+    references = object_ids * 3
+    relations = ('address', 'port', 'hostname', 'domain')
+    attribute_references = [
+        f'{object_id} - {relation} - {index}'
+        for index, object_id in enumerate(object_ids) for relation in relations
+    ]
+
+    def previous_path():
+        replacement_uuids = {}
+        for object_id in references:
+            object_uuid = object_id.split('--')[-1]
+            if UUID(object_uuid).version not in _RFC_VERSIONS:
+                if object_uuid not in replacement_uuids:
+                    replacement_uuids[object_uuid] = uuid5(_UUIDv4, object_uuid)
+        for reference in attribute_references:
+            uuid5(_UUIDv4, reference)
+
+    def current_path():
+        parser = ExternalSTIX2toMISPParser()
+        for object_id in references:
+            parser._sanitise_uuid(object_id)
+        for reference in attribute_references:
+            parser._create_v5_uuid(reference)
+
+    for name, method in (('previous', previous_path), ('current', current_path)):
+        start = perf_counter()
+        method()
+        print(
+            f'{name:>8} UUID handling of {args.objects} SCOs: '
+            f'{perf_counter() - start:.2f}s'
+        )
+
+
+def _parse_importtime(stderr: str) -> dict:
+    imports = {}
+    for line in stderr.splitlines():
+        if not line.startswith('import time:'):
+            continue
+        self_time, cumulative, module = line[12:].split('|')
+        if not self_time.strip().isdigit():
+            continue
+        imports[module.strip()] = (int(self_time), int(cumulative))
+    return imports
+
+
+def main():
+    parser = argparse.ArgumentParser(description='misp-stix benchmarks')
+    subparsers = parser.add_subparsers(dest='benchmark', required=True)
+    cache_parser = subparsers.add_parser(
+        'cache',
+        help='Compare the export of synthetic events with a cold & warm cache.'
+    )
+    cache_parser.add_argument(
+        '--events', type=int, default=500,
+        help='Number of synthetic events.'
+    )
+    cache_parser.add_argument(
+        '--attributes', type=int, default=20,
+        help='Number of attributes of each synthetic event.'
+    )
+    cache_parser.add_argument(
+        '--stix-version', choices=tuple(_VERSIONS), default='2.1'
+    )
+    cache_parser.set_defaults(func=_benchmark_cache)
+    dispatch_parser = subparsers.add_parser(
+        'dispatch',
+        help='Compare the attribute parsing methods dispatch overhead.'
+    )
+    dispatch_parser.add_argument(
+        '--attributes', type=int, default=100000,
+        help='Number of attributes of the synthetic event.'
+    )
+    dispatch_parser.add_argument(
+        '--stix-version', choices=tuple(_VERSIONS), default='2.1'
+    )
+    dispatch_parser.set_defaults(func=_benchmark_dispatch)
+    event_reports_parser = subparsers.add_parser(
+        'event_reports',
+        help='Scan & export event reports referencing a few attributes.'
+    )
+    event_reports_parser.add_argument(
+        '--attributes', type=int, default=20000,
+        help='Number of attributes of the synthetic event.'
+    )
+    event_reports_parser.add_argument(
+        '--reports', type=int, default=200,
+        help='Number of event reports of the synthetic event.'
+    )
+    event_reports_parser.add_argument(
+        '--references', type=int, default=5,
+        help='Number of attributes referenced by each event report.'
+    )
+    event_reports_parser.add_argument(
+        '--rounds', type=int, default=100,
+        help='Number of times the event reports are scanned.'
+    )
+    event_reports_parser.add_argument(
+        '--stix-version', choices=tuple(_VERSIONS), default='2.1'
+    )
+    event_reports_parser.set_defaults(func=_benchmark_event_reports)
+    mappings_parser = subparsers.add_parser(
+        'mappings',
+        help='Compare the lookup cost on the mapping tables.'
+    )
+    mappings_parser.add_argument(
+        '--rounds', type=int, default=500,
+        help='Number of times every key of every mapping table is looked up.'
+    )
+    mappings_parser.set_defaults(func=_benchmark_mappings)
+    object_references_parser = subparsers.add_parser(
+        'object_references',
+        help='Export synthetic events with dense object references graphs.'
+    )
+    object_references_parser.add_argument(
+        '--objects', type=int, default=8000,
+        help='Number of objects of the largest synthetic event.'
+    )
+    object_references_parser.add_argument(
+        '--references', type=int, default=5,
+        help='Number of references of each object.'
+    )
+    object_references_parser.add_argument(
+        '--stix-version', choices=tuple(_VERSIONS), default='2.1'
+    )
+    object_references_parser.set_defaults(func=_benchmark_object_references)
+    object_refs_parser = subparsers.add_parser(
+        'object_refs',
+        help='Export a synthetic galaxy-tagged event with growing sizes.'
+    )
+    object_refs_parser.add_argument(
+        '--attributes', type=int, default=50000,
+        help='Number of attributes of the largest synthetic event.'
+    )
+    object_refs_parser.add_argument(
+        '--stix-version', choices=tuple(_VERSIONS), default='2.1'
+    )
+    object_refs_parser.set_defaults(func=_benchmark_object_refs)
+    startup_parser = subparsers.add_parser(
+        'startup',
+        help='Track the imports of the export -v 2.1 & import -v 2 commands.'
+    )
+    startup_parser.add_argument(
+        '--top', type=int, default=10,
+        help='Number of top-level packages to display, slowest first.'
+    )
+    startup_parser.set_defaults(func=_benchmark_startup)
+    stix1_export_parser = subparsers.add_parser(
+        'stix1_export',
+        help='Compare the STIX 1 XML export of a synthetic event in memory & '
+             'streamed.'
+    )
+    stix1_export_parser.add_argument(
+        '--attributes', type=int, default=10000,
+        help='Number of attributes of the synthetic event.'
+    )
+    stix1_export_parser.set_defaults(func=_benchmark_stix1_export)
+    trusted_export_parser = subparsers.add_parser(
+        'trusted_export',
+        help='Compare the export of a synthetic event with & without trust.'
+    )
+    trusted_export_parser.add_argument(
+        '--attributes', type=int, default=20000,
+        help='Number of attributes of the synthetic event.'
+    )
+    trusted_export_parser.add_argument(
+        '--stix-version', choices=tuple(_VERSIONS), default='2.1'
+    )
+    trusted_export_parser.add_argument(
+        '--validation-rate', type=float, default=0.0,
+        help='Share of the trusted objects also validated with python-stix2.'
+    )
+    trusted_export_parser.set_defaults(func=_benchmark_trusted_export)
+    trusted_import_parser = subparsers.add_parser(
+        'trusted_import',
+        help='Compare the import of a synthetic bundle with & without trust.'
+    )
+    trusted_import_parser.add_argument(
+        '--attributes', type=int, default=20000,
+        help='Number of attributes of the synthetic event.'
+    )
+    trusted_import_parser.set_defaults(func=_benchmark_trusted_import)
+    uuids_parser = subparsers.add_parser(
+        'uuids',
+        help='Compare the UUID sanitation and v5 derivation on import.'
+    )
+    uuids_parser.add_argument(
+        '--objects', type=int, default=100000,
+        help='Number of synthetic SCOs.'
+    )
+    uuids_parser.set_defaults(func=_benchmark_uuids)
+    args = parser.parse_args()
+    args.func(args)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,152 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import json
+import os
+import signal
+import socket
+import subprocess
+import sys
+import unittest
+from misp_stix_converter.misp_stix_converter import (
+    _process_conversion_job, _remove_stale_socket, stix_2_to_misp)
+from pathlib import Path
+from tempfile import TemporaryDirectory
+from time import sleep
+
+
+class TestConversionServer(unittest.TestCase):
+    def setUp(self):
+        self._current_path = Path(__file__).parent
+        self._output_dir = TemporaryDirectory()
+
+    def tearDown(self):
+        self._output_dir.cleanup()
+
+    def _start_server(self, socket_path: Path) -> subprocess.Popen:
+        script = (
+            'import sys; from misp_stix_converter import main; '
+            f"sys.argv = ['misp_stix_converter', 'serve', '-s', "
+            f"{str(socket_path)!r}]; main()"
+        )
+        server = subprocess.Popen(
+            [sys.executable, '-c', script], stderr=subprocess.PIPE,
+            env={**os.environ, 'PYTHONPATH': str(self._current_path.parent)}
+        )
+        for _ in range(600):
+            if socket_path.is_socket() or server.poll() is not None:
+                break
+            sleep(0.1)
+        if not socket_path.is_socket():
+            server.kill()
+            self.fail(server.communicate()[1].decode())
+        return server
+
+    def _send_job(self, client: socket.socket, job: dict) -> dict:
+        client.sendall(f'{json.dumps(job)}\n'.encode('utf-8'))
+        response = b''
+        while not response.endswith(b'\n'):
+            chunk = client.recv(65536)
+            if not chunk:
+                break
+            response += chunk
+        return json.loads(response)
+
+    def test_concurrent_connections(self):
+        # A client keeping its connection open must not prevent the other
+        # clients from getting their jobs run
+        socket_path = Path(self._output_dir.name) / 'server.sock'
+        server = self._start_server(socket_path)
+        filename = self._current_path / 'test_event1_stix21.json'
+        try:
+            with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as idle, \
+                    socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as client:
+                idle.connect(str(socket_path))
+                idle.sendall(b'\n')
+                client.connect(str(socket_path))
+                client.settimeout(60)
+                for n in (1, 2):
+                    output_dir = Path(self._output_dir.name) / str(n)
+                    output_dir.mkdir()
+                    response = self._send_job(
+                        client, {
+                            'id': n, 'method': 'stix_2_to_misp',
+                            'args': [str(filename)],
+                            'kwargs': {'output_dir': str(output_dir)}
+                        }
+                    )
+                    self.assertEqual(response['id'], n)
+                    self.assertEqual(response['traceback']['success'], 1)
+                idle.settimeout(60)
+                response = self._send_job(
+                    idle, {'id': 3, 'method': 'unknown'}
+                )
+                self.assertEqual(response['error'], 'Unknown method: unknown')
+        finally:
+            server.send_signal(signal.SIGTERM)
+            server.wait(timeout=60)
+            server.stderr.close()
+        self.assertFalse(socket_path.exists())
+        self.assertEqual(
+            sorted(path.name for path in Path(self._output_dir.name).iterdir()),
+            ['1', '2']
+        )
+
+    def test_conversion_job(self):
+        filename = self._current_path / 'test_event1_stix21.json'
+        job = {
+            'id': 'job-1', 'method': 'stix_2_to_misp', 'args': [str(filename)],
+            'kwargs': {'output_dir': self._output_dir.name}
+        }
+        response = json.loads(_process_conversion_job(json.dumps(job)))
+        self.assertEqual(response['id'], 'job-1')
+        traceback = stix_2_to_misp(
+            filename, output_dir=Path(self._output_dir.name)
+        )
+        self.assertEqual(
+            response['traceback'],
+            json.loads(json.dumps(traceback, default=str))
+        )
+        job['method'] = 'unknown'
+        response = json.loads(_process_conversion_job(json.dumps(job)))
+        self.assertEqual(response['error'], 'Unknown method: unknown')
+        response = json.loads(_process_conversion_job('not a job'))
+        self.assertIsNone(response['id'])
+        self.assertTrue(response['error'].startswith('Invalid job format'))
+        invalid_jobs = (
+            {'id': 'job-2', 'method': 'misp_to_stix2', 'kwargs': [1]},
+            {'id': 'job-3', 'method': 'misp_to_stix2', 'args': 5},
+            {'id': 'job-4', 'method': 'misp_to_stix2', 'args': [5]},
+            {
+                'id': 'job-5', 'method': 'stix_2_to_misp',
+                'args': [str(filename)], 'kwargs': {'output_dir': 5}
+            }
+        )
+        for invalid_job in invalid_jobs:
+            response = json.loads(_process_conversion_job(json.dumps(invalid_job)))
+            self.assertEqual(response['id'], invalid_job['id'])
+            self.assertTrue(response['error'].startswith('Invalid job format'))
+        response = json.loads(
+            _process_conversion_job(json.dumps({'id': 'job-6', 'method': [1]}))
+        )
+        self.assertEqual(response['error'], 'Unknown method: [1]')
+
+    def test_conversion_job_exiting(self):
+        # Loading errors calling `sys.exit` only end the job that raised them
+        filename = Path(self._output_dir.name) / 'invalid.xml'
+        filename.write_text('<invalid')
+        job = {'id': 'job-1', 'method': 'stix_1_to_misp', 'args': [str(filename)]}
+        response = json.loads(_process_conversion_job(json.dumps(job)))
+        self.assertEqual(response['id'], 'job-1')
+        self.assertIn('Error while loading STIX1 package', response['error'])
+
+    def test_stale_socket(self):
+        socket_path = Path(self._output_dir.name) / 'server.sock'
+        with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as server:
+            server.bind(str(socket_path))
+            server.listen()
+            with self.assertRaises(SystemExit):
+                _remove_stale_socket(socket_path)
+        self.assertTrue(socket_path.is_socket())
+        _remove_stale_socket(socket_path)
+        self.assertFalse(socket_path.exists())
@@ -3,7 +3,8 @@
 
 from .test_external_stix20_bundles import TestExternalSTIX20Bundles
 from ._test_stix import TestSTIX20
-from ._test_stix_import import TestExternalSTIX2Import, TestSTIX20Import
+from ._test_stix_import import (
+    TestExternalSTIX2Import, TestSTIX20Import, TestSTIX2TrustedImport)
 from uuid import uuid5
 
 
@@ -1051,3 +1052,7 @@ class TestExternalSTIX20Import(TestExternalSTIX2Import, TestSTIX20, TestSTIX20Im
         self._check_x509_object(multiple1, observed_data1, '0')
         self._check_x509_object(multiple2, observed_data1, '1')
         self._check_x509_object(single, observed_data2)
+
+
+class TestExternalSTIX20TrustedImport(TestSTIX2TrustedImport, TestExternalSTIX20Import):
+    pass
@@ -3,7 +3,8 @@
 
 from .test_external_stix21_bundles import TestExternalSTIX21Bundles
 from ._test_stix import TestSTIX21
-from ._test_stix_import import TestExternalSTIX2Import, TestSTIX21Import
+from ._test_stix_import import (
+    TestExternalSTIX2Import, TestSTIX21Import, TestSTIX2TrustedImport)
 from datetime import datetime
 from uuid import uuid5
 
@@ -996,3 +997,7 @@ class TestExternalSTIX21Import(TestExternalSTIX2Import, TestSTIX21, TestSTIX21Im
         self._check_x509_object(multiple1, od1, cert1)
         self._check_x509_object(multiple2, od1, cert2)
         self._check_x509_object(single, od2, cert3)
+
+
+class TestExternalSTIX21TrustedImport(TestSTIX2TrustedImport, TestExternalSTIX21Import):
+    pass
@@ -0,0 +1,284 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import json
+import pickle
+import unittest
+from copy import deepcopy
+from misp_stix_converter import (
+    InternalSTIX2toMISPParser, MISPtoSTIX20Parser, MISPtoSTIX21Parser)
+from misp_stix_converter.misp2stix import misp_to_stix2
+from misp_stix_converter.misp2stix.misp_to_stix2 import (
+    _GalaxiesCatalog, _load_galaxies_catalog)
+from misp_stix_converter.stix2misp.importparser import (
+    _DATA_PATH, SynonymsMapping)
+from pathlib import Path
+from tempfile import TemporaryDirectory
+from unittest.mock import patch
+from .test_events import _BASE_EVENT, _TEST_ATTACK_PATTERN_GALAXY
+
+_MITRE_IDENTITY = {
+    'type': 'identity', 'id': 'identity--c78cb6e5-0c4b-4611-8297-d1b8b55e40b5',
+    'created': '2017-06-01T00:00:00.000Z',
+    'modified': '2017-06-01T00:00:00.000Z',
+    'name': 'The MITRE Corporation', 'identity_class': 'organization'
+}
+_ACCESS_TOKEN_MANIPULATION = {
+    'type': 'attack-pattern',
+    'id': 'attack-pattern--dcaa092b-7de9-4a21-977f-7fcb77e89c48',
+    'created_by_ref': _MITRE_IDENTITY['id'],
+    'created': '2017-12-14T16:46:06.044Z',
+    'modified': '2023-03-30T21:01:51.631Z',
+    'name': 'Access Token Manipulation',
+    'external_references': [
+        {
+            'source_name': 'mitre-attack', 'external_id': 'T1134',
+            'url': 'https://attack.mitre.org/techniques/T1134'
+        }
+    ]
+}
+_ACCESS_TOKEN_MITIGATION = {
+    'type': 'course-of-action',
+    'id': 'course-of-action--c61fee9f-16fb-4f8c-bbf0-869093fcd4a6',
+    'created_by_ref': _MITRE_IDENTITY['id'],
+    'created': '2018-10-17T00:14:20.652Z',
+    'modified': '2019-07-24T14:24:44.818Z',
+    'name': 'Access Token Manipulation',
+    'external_references': [
+        {'source_name': 'mitre-attack', 'external_id': 'T1134'}
+    ]
+}
+_AGENT_MALWARES = tuple(
+    {
+        'type': 'malware', 'id': f'malware--{uuid}',
+        'created_by_ref': _MITRE_IDENTITY['id'],
+        'created': '2020-05-06T21:01:23.428Z',
+        'modified': '2020-05-06T21:01:23.428Z', 'name': 'Agent',
+        'external_references': [
+            {'source_name': 'mitre-attack', 'external_id': external_id}
+        ]
+    } for uuid, external_id in (
+        ('2f8229dc-da94-41c6-89ba-b5b6c32f6b7d', 'S0001'),
+        ('d906e6f7-434c-44c0-b51a-ed50af8f7945', 'S0002')
+    )
+)
+_UNNAMED_RELATIONSHIP = {
+    'type': 'relationship',
+    'id': 'relationship--0b9e5f9c-9a2c-4d1c-8f9c-4d1f4b2d2a9e',
+    'created': '2020-05-06T21:01:23.428Z',
+    'modified': '2020-05-06T21:01:23.428Z', 'relationship_type': 'mitigates',
+    'source_ref': _ACCESS_TOKEN_MITIGATION['id'],
+    'target_ref': _ACCESS_TOKEN_MANIPULATION['id']
+}
+_CTI_BUNDLES = {
+    'enterprise-attack': (
+        _MITRE_IDENTITY, _ACCESS_TOKEN_MANIPULATION, _ACCESS_TOKEN_MITIGATION,
+        _AGENT_MALWARES[0], _UNNAMED_RELATIONSHIP
+    ),
+    'mobile-attack': (
+        _MITRE_IDENTITY, _ACCESS_TOKEN_MANIPULATION, _AGENT_MALWARES[1]
+    )
+}
+
+_SYNONYMS = {
+    'APT28': ['misp-galaxy:threat-actor="APT28"'],
+    'Sofacy': ['misp-galaxy:threat-actor="APT28"'],
+    'APT28 group': ['misp-galaxy:threat-actor="APT28 group"'],
+    'Lazarus Group': ['misp-galaxy:threat-actor="Lazarus Group"'],
+    'Hidden Cobra': ['misp-galaxy:threat-actor="Lazarus Group"']
+}
+
+
+def _linear_search(synonyms_mapping: dict, value: str):
+    # The loop testing every name the indexed search replaces
+    for name, tag_names in synonyms_mapping.items():
+        if value in name:
+            return tag_names
+
+
+class TestSynonymsMapping(unittest.TestCase):
+    def _check_search(self, synonyms_mapping: SynonymsMapping, value: str):
+        expected = _linear_search(synonyms_mapping, value)
+        self.assertIs(synonyms_mapping.search(value), expected)
+        # Same result when it comes from the cache
+        self.assertIs(synonyms_mapping.search(value), expected)
+
+    def test_search(self):
+        synonyms_mapping = SynonymsMapping(_SYNONYMS)
+        values = (
+            'APT28', 'APT2', '28', 'group', 'Group', 'Sofacy', 'acy',
+            'Cobra', 'Hidden Cobra', 'Lazarus', 'Hidden Cobras', 'apt28',
+            'Sofacy\x00APT28', 'APT28\x00', '\x00', 'cyAPT', '28Sof', ''
+        )
+        for value in values:
+            with self.subTest(value=value):
+                self._check_search(synonyms_mapping, value)
+        # First match in the mapping order
+        self.assertEqual(
+            synonyms_mapping.search('APT2'), _SYNONYMS['APT28']
+        )
+        self.assertEqual(
+            synonyms_mapping.search('group'), _SYNONYMS['APT28 group']
+        )
+        self.assertEqual(synonyms_mapping.search(''), _SYNONYMS['APT28'])
+        self.assertIsNone(synonyms_mapping.search('Sofacy\x00APT28'))
+        self.assertIsNone(synonyms_mapping.search('Fancy Bear'))
+
+    def test_search_empty_mapping(self):
+        synonyms_mapping = SynonymsMapping()
+        for value in ('', 'APT28', '\x00'):
+            with self.subTest(value=value):
+                self.assertIsNone(synonyms_mapping.search(value))
+
+    @unittest.skipUnless(
+        (_DATA_PATH / 'misp-galaxy' / 'clusters').exists(),
+        'The misp-galaxy submodule is not checked out'
+    )
+    def test_search_galaxies_synonyms(self):
+        synonyms_mapping = InternalSTIX2toMISPParser().synonyms_mapping
+        names = list(synonyms_mapping)
+        values = {'', 'not a galaxy cluster name at all'}
+        for name in names[::max(len(names) // 200, 1)]:
+            values.update((name, name[1:], name[:-1], name[len(name) // 2:]))
+        for value in sorted(values):
+            with self.subTest(value=value):
+                self._check_search(synonyms_mapping, value)
+
+    def test_search_cache_size(self):
+        with patch.object(SynonymsMapping, '_SynonymsMapping__cache_size', 8):
+            synonyms_mapping = SynonymsMapping(_SYNONYMS)
+        for index in range(100):
+            synonyms_mapping.search(f'APT{index}')
+        cache_info = synonyms_mapping._SynonymsMapping__search.cache_info()
+        self.assertEqual(cache_info.maxsize, 8)
+        self.assertEqual(cache_info.currsize, 8)
+        copied = pickle.loads(pickle.dumps(synonyms_mapping))
+        self.assertEqual(copied, synonyms_mapping)
+        self.assertEqual(copied.search('Cobra'), _SYNONYMS['Hidden Cobra'])
+
+
+class TestGalaxiesCatalog(unittest.TestCase):
+    def setUp(self):
+        self._cti_dir = TemporaryDirectory()
+        self._cti_path = Path(self._cti_dir.name)
+        for name, stix_objects in _CTI_BUNDLES.items():
+            (self._cti_path / name).mkdir()
+            bundle = {
+                'type': 'bundle', 'id': f'bundle--{name}',
+                'objects': list(stix_objects)
+            }
+            with open(self._cti_path / name / f'{name}.json', 'wt',
+                      encoding='utf-8') as f:
+                f.write(json.dumps(bundle))
+        self._source_names = MISPtoSTIX21Parser()._mapping.source_names()
+        self._catalog = _GalaxiesCatalog(self._cti_path, self._source_names)
+
+    def tearDown(self):
+        self._cti_dir.cleanup()
+
+    def _load_fixture_catalog(self, cti_path: Path, source_names: tuple):
+        return _GalaxiesCatalog(self._cti_path, source_names)
+
+    def test_galaxies_catalog_lookups(self):
+        catalog = self._catalog
+        # By name, then by object type
+        self.assertIn('Access Token Manipulation', catalog)
+        self.assertEqual(
+            set(catalog['Access Token Manipulation']),
+            {'attack-pattern', 'course-of-action'}
+        )
+        self.assertEqual(
+            catalog['Access Token Manipulation']['attack-pattern'],
+            {_ACCESS_TOKEN_MANIPULATION['id']: _ACCESS_TOKEN_MANIPULATION}
+        )
+        self.assertEqual(
+            catalog.named('Access Token Manipulation', 'attack-pattern'),
+            (_ACCESS_TOKEN_MANIPULATION,)
+        )
+        self.assertEqual(
+            catalog.named('Access Token Manipulation', 'course-of-action'),
+            (_ACCESS_TOKEN_MITIGATION,)
+        )
+        self.assertEqual(
+            catalog.named('Agent', 'malware'), _AGENT_MALWARES
+        )
+        self.assertEqual(catalog.named('Agent', 'tool'), ())
+        # By external id, then by object type
+        self.assertEqual(
+            catalog['T1134'],
+            {
+                'attack-pattern': {
+                    _ACCESS_TOKEN_MANIPULATION['id']: _ACCESS_TOKEN_MANIPULATION
+                },
+                'course-of-action': {
+                    _ACCESS_TOKEN_MITIGATION['id']: _ACCESS_TOKEN_MITIGATION
+                }
+            }
+        )
+        self.assertEqual(
+            catalog.get('S0002'),
+            {'malware': {_AGENT_MALWARES[1]['id']: _AGENT_MALWARES[1]}}
+        )
+        self.assertEqual(catalog.named('T1134', 'attack-pattern'), ())
+        # Identities are kept aside, objects without a name are skipped
+        self.assertEqual(
+            catalog.identities, {_MITRE_IDENTITY['id']: _MITRE_IDENTITY}
+        )
+        self.assertNotIn(_MITRE_IDENTITY['name'], catalog)
+        self.assertIsNone(catalog.get('mitigates'))
+        self.assertEqual(catalog.get('unknown', {}), {})
+
+    def test_galaxies_catalog_immutability(self):
+        catalog = self._catalog
+        with self.assertRaises(TypeError):
+            catalog['T1134']['tool'] = {}
+        with self.assertRaises(TypeError):
+            del catalog['T1134']['attack-pattern'][
+                _ACCESS_TOKEN_MANIPULATION['id']
+            ]
+        with self.assertRaises(AttributeError):
+            catalog['T1134']['attack-pattern'].clear()
+        with self.assertRaises(TypeError):
+            catalog.identities['identity--unknown'] = {}
+        with self.assertRaises(AttributeError):
+            catalog.identities.pop(_MITRE_IDENTITY['id'])
+        with self.assertRaises(AttributeError):
+            catalog.named('Agent', 'malware').append(_AGENT_MALWARES[0])
+        self.assertEqual(catalog.named('Agent', 'malware'), _AGENT_MALWARES)
+
+    def test_galaxies_catalog_sharing(self):
+        _load_galaxies_catalog.cache_clear()
+        self.addCleanup(_load_galaxies_catalog.cache_clear)
+        event = deepcopy(_BASE_EVENT)
+        event['Event']['Galaxy'] = [deepcopy(_TEST_ATTACK_PATTERN_GALAXY)]
+        with patch.object(
+                misp_to_stix2, '_GalaxiesCatalog',
+                side_effect=self._load_fixture_catalog) as catalog_class:
+            parsers = []
+            for parser_class in (MISPtoSTIX20Parser, MISPtoSTIX21Parser) * 2:
+                parser = parser_class(interoperability=True)
+                parser.parse_misp_event(deepcopy(event))
+                parsers.append(parser)
+        catalog_class.assert_called_once()
+        catalog = parsers[0]._galaxies_catalog
+        for parser in parsers:
+            self.assertIs(parser._galaxies_catalog, catalog)
+            self.assertIs(parser._identities, catalog.identities)
+            identity, attack_pattern = (
+                stix_object for stix_object in parser.stix_objects
+                if stix_object['id'] in (
+                    _MITRE_IDENTITY['id'], _ACCESS_TOKEN_MANIPULATION['id']
+                )
+            )
+            self.assertEqual(identity['name'], _MITRE_IDENTITY['name'])
+            self.assertEqual(
+                attack_pattern['name'], _ACCESS_TOKEN_MANIPULATION['name']
+            )
+        # Converting the matching objects leaves the shared catalog as it is
+        self.assertEqual(
+            catalog.named('Access Token Manipulation', 'attack-pattern'),
+            (_ACCESS_TOKEN_MANIPULATION,)
+        )
+        self.assertEqual(
+            catalog.identities, {_MITRE_IDENTITY['id']: _MITRE_IDENTITY}
+        )
@@ -5,7 +5,8 @@ import json
 from uuid import uuid5
 from .test_internal_stix20_bundles import TestInternalSTIX20Bundles
 from ._test_stix import TestSTIX20
-from ._test_stix_import import TestInternalSTIX2Import, TestSTIX20Import
+from ._test_stix_import import (
+    TestInternalSTIX2Import, TestSTIX20Import, TestSTIX2TrustedImport)
 
 
 class TestInternalSTIX20Import(TestInternalSTIX2Import, TestSTIX20, TestSTIX20Import):
@@ -2434,3 +2435,7 @@ class TestInternalSTIX20Import(TestInternalSTIX2Import, TestSTIX20, TestSTIX20Im
             misp_object = json.loads(misp_object.to_json()),
             observed_data = observed_data
         )
+
+
+class TestInternalSTIX20TrustedImport(TestSTIX2TrustedImport, TestInternalSTIX20Import):
+    pass
@@ -1,11 +1,29 @@
 #!/usr/bin/env python
 # -*- coding: utf-8 -*-
 
+import gzip
 import json
+import os
+import subprocess
+import sys
+from argparse import Namespace
+from io import BytesIO
+from misp_stix_converter import InternalSTIX2toMISPParser
+from misp_stix_converter.misp_stix_converter import (
+    _process_stix_to_misp_files, stix_2_content_to_misp, stix_2_to_misp)
+from misp_stix_converter.stix2misp.exceptions import (
+    UnavailableGalaxyResourcesError)
+from misp_stix_converter.stix2misp.importparser import (
+    _load_stix2_content, _STIX2Buffer)
+from pathlib import Path
+from tempfile import TemporaryDirectory
+from unittest.mock import patch
 from uuid import uuid5
+from .test_external_stix21_bundles import TestExternalSTIX21Bundles
 from .test_internal_stix21_bundles import TestInternalSTIX21Bundles
 from ._test_stix import TestSTIX21
-from ._test_stix_import import TestInternalSTIX2Import, TestSTIX21Import
+from ._test_stix_import import (
+    TestInternalSTIX2Import, TestSTIX21Import, TestSTIX2TrustedImport)
 
 
 class TestInternalSTIX21Import(TestInternalSTIX2Import, TestSTIX21, TestSTIX21Import):
@@ -3099,3 +3117,254 @@ class TestInternalSTIX21Import(TestInternalSTIX2Import, TestSTIX21, TestSTIX21Im
             misp_object = json.loads(misp_object.to_json()),
             observed_data = [observed_data, x509]
         )
+
+
+class TestInternalSTIX21TrustedImport(TestSTIX2TrustedImport, TestInternalSTIX21Import):
+    pass
+
+
+class TestInternalSTIX21FilesImport(TestSTIX21):
+    def setUp(self):
+        self._current_path = Path(__file__).parent
+        self._output_dir = TemporaryDirectory()
+
+    def tearDown(self):
+        self._output_dir.cleanup()
+
+    def _get_args(self, input_files, workers):
+        return Namespace(
+            cluster_distribution=0, cluster_sharing_group=None, debug=False,
+            distribution=0, file=input_files, galaxies_as_tags=False,
+            no_force_contextual_data=False, org_uuid=None,
+            output_dir=Path(self._output_dir.name), output_name=None,
+            producer=None, sharing_group=None, single_event=False, title=None,
+            version='2', workers=workers
+        )
+
+    def test_stix21_files_import_with_workers(self):
+        input_files = [
+            self._current_path / f'test_event{n}_stix21.json' for n in (1, 2)
+        ]
+        sequential = _process_stix_to_misp_files(
+            self._get_args(input_files, 1)
+        )
+        parallel = _process_stix_to_misp_files(self._get_args(input_files, 2))
+        self.assertEqual(sequential, parallel)
+        self.assertEqual(len(parallel['results']), 4)
+        for result in parallel['results']:
+            self.assertTrue(result.exists())
+        self.assertEqual(
+            [result.name.split('.')[0] for result in parallel['results']],
+            ['test_event1_stix21'] * 2 + ['test_event2_stix21'] * 2
+        )
+
+    def test_stix21_custom_objects_import_in_fresh_process(self):
+        # The `x-misp-*` custom types must be registered by the import side
+        # on its own, without the export parsers being loaded beforehand
+        bundle = TestInternalSTIX21Bundles.get_bundle_with_custom_objects()
+        filename = Path(self._output_dir.name) / 'custom_objects.json'
+        filename.write_text(bundle.serialize())
+        output_name = Path(self._output_dir.name) / 'custom_objects.misp.json'
+        command = [
+            'misp_stix_converter', 'import', '-v', '2', '-f', str(filename),
+            '-o', str(output_name)
+        ]
+        script = (
+            'import sys; from misp_stix_converter import main; '
+            f'sys.argv = {command!r}; main()'
+        )
+        process = subprocess.run(
+            [sys.executable, '-c', script], capture_output=True, text=True,
+            env={**os.environ, 'PYTHONPATH': str(self._current_path.parent)}
+        )
+        self.assertEqual(process.returncode, 0, process.stderr)
+        misp_event = json.loads(output_name.read_text())
+        _, _, *custom_objects = bundle.objects
+        self.assertEqual(
+            [misp_object['uuid'] for misp_object in misp_event['Object']],
+            [custom_object.id.split('--')[1] for custom_object in custom_objects]
+        )
+        for misp_object, custom_object in zip(misp_event['Object'], custom_objects):
+            self.assertEqual(misp_object['name'], custom_object.x_misp_name)
+            self.assertEqual(
+                len(misp_object['Attribute']),
+                len(custom_object.x_misp_attributes)
+            )
+
+    def test_stix21_misp_events_iteration(self):
+        filename = self._current_path / 'test_event1_stix21.json'
+        parser = InternalSTIX2toMISPParser()
+        parser.load_stix_bundle(_load_stix2_content(filename))
+        parser.parse_stix_bundle()
+        iterating_parser = InternalSTIX2toMISPParser()
+        iterating_parser.load_stix_bundle(_load_stix2_content(filename))
+        misp_events = iterating_parser.iter_misp_events()
+        first_event = next(misp_events)
+        self.assertFalse(hasattr(iterating_parser, '_report_parser'))
+        self.assertEqual(first_event.uuid, parser.misp_events[0].uuid)
+        self.assertEqual(
+            [
+                misp_event.to_json()
+                for misp_event in (first_event, *misp_events)
+            ],
+            [misp_event.to_json() for misp_event in parser.misp_events]
+        )
+        self.assertFalse(
+            hasattr(iterating_parser, '_STIXtoMISPParser__misp_events')
+        )
+
+    def test_stix21_misp_events_iteration_critical_error(self):
+        # The single MISP event converted before a critical error is still
+        # returned, the same way it is with `parse_stix_bundle`
+        filename = self._current_path / 'test_event1_stix21.json'
+        misp_events = []
+        for iterating in (False, True):
+            parser = InternalSTIX2toMISPParser()
+            parser.load_stix_bundle(_load_stix2_content(filename))
+            error = UnavailableGalaxyResourcesError(
+                self._current_path / 'misp-galaxy'
+            )
+            with patch.object(
+                    InternalSTIX2toMISPParser, '_handle_unparsed_content',
+                    side_effect=error):
+                if iterating:
+                    misp_events.append(
+                        list(parser.iter_misp_events(single_event=True))
+                    )
+                else:
+                    parser.parse_stix_bundle(single_event=True)
+                    misp_events.append([parser.misp_event])
+            self.assertIn(
+                f'The following exception was raised: {error}',
+                parser.errors[parser._identifier]
+            )
+        self.assertEqual(len(misp_events[1]), 1)
+        self.assertEqual(
+            *(
+                [misp_event.to_json() for misp_event in events]
+                for events in misp_events
+            )
+        )
+
+    def test_stix21_streamed_bundle_import(self):
+        for n in (1, 2):
+            filename = self._current_path / f'test_event{n}_stix21.json'
+            bundle = _load_stix2_content(filename)
+            streamed_bundle = _load_stix2_content(filename, streaming=True)
+            self.assertEqual(streamed_bundle.id, bundle.id)
+            self.assertEqual(
+                [stix_object.serialize() for stix_object in streamed_bundle.objects],
+                [stix_object.serialize() for stix_object in bundle.objects]
+            )
+            self.assertEqual(streamed_bundle.spec_version, '2.1')
+            results = []
+            for streaming in (False, True):
+                output_dir = Path(self._output_dir.name) / f'{n}_{streaming}'
+                output_dir.mkdir()
+                traceback = stix_2_to_misp(
+                    filename, output_dir=output_dir, streaming=streaming
+                )
+                self.assertTrue(traceback['success'])
+                results.append(
+                    [result.read_text() for result in traceback['results']]
+                )
+            self.assertEqual(*results)
+
+    def test_stix21_streamed_bundle_reads(self):
+        # Whether the bundle comes from MISP is found out while reading its
+        # header, the conversion is then the only other pass over the file
+        buffer_path = 'misp_stix_converter.stix2misp.importparser._STIX2Buffer'
+        for n in (1, 2):
+            filename = self._current_path / f'test_event{n}_stix21.json'
+            self.assertTrue(_load_stix2_content(filename, streaming=True).from_misp)
+            with patch(buffer_path, side_effect=_STIX2Buffer) as buffer:
+                traceback = stix_2_to_misp(
+                    filename, output_dir=Path(self._output_dir.name),
+                    streaming=True
+                )
+            self.assertTrue(traceback['success'])
+            self.assertEqual(buffer.call_count, 2)
+        bundle = TestExternalSTIX21Bundles.get_bundle_with_grouping_description()
+        streamed_bundle = _load_stix2_content(
+            BytesIO(bundle.serialize().encode()), streaming=True
+        )
+        self.assertFalse(streamed_bundle.from_misp)
+        self.assertEqual(streamed_bundle.id, bundle.id)
+
+    def test_stix21_compressed_bundle_import(self):
+        for n in (1, 2):
+            filename = self._current_path / f'test_event{n}_stix21.json'
+            compressed_file = Path(self._output_dir.name) / f'{filename.name}.gz'
+            with gzip.open(compressed_file, 'wb') as f:
+                f.write(filename.read_bytes())
+            for streaming in (False, True):
+                output_dir = Path(self._output_dir.name) / f'{n}_{streaming}'
+                output_dir.mkdir()
+                traceback = stix_2_to_misp(
+                    filename, output_dir=output_dir, streaming=streaming
+                )
+                compressed_traceback = stix_2_to_misp(
+                    compressed_file, output_dir=output_dir,
+                    streaming=streaming, compress='gzip'
+                )
+                self.assertTrue(compressed_traceback['success'])
+                for result, compressed_result in zip(
+                        traceback['results'], compressed_traceback['results']):
+                    self.assertEqual(compressed_result.suffix, '.gz')
+                    with gzip.open(compressed_result, 'rt') as f:
+                        self.assertEqual(f.read(), result.read_text())
+
+    def test_stix21_in_memory_bundle_import(self):
+        for n in (1, 2):
+            filename = self._current_path / f'test_event{n}_stix21.json'
+            traceback = stix_2_to_misp(
+                filename, output_dir=Path(self._output_dir.name)
+            )
+            misp_events = [result.read_text() for result in traceback['results']]
+            content = filename.read_bytes()
+            inputs = (
+                lambda: json.loads(content), lambda: content,
+                lambda: BytesIO(gzip.compress(content))
+            )
+            for get_content in inputs:
+                for streaming in (False, True):
+                    traceback = stix_2_content_to_misp(
+                        get_content(), streaming=streaming
+                    )
+                    self.assertEqual(traceback['success'], 1)
+                    self.assertEqual(
+                        [
+                            misp_event.to_json(indent=4)
+                            for misp_event in traceback['results']
+                        ],
+                        misp_events
+                    )
+
+    def test_stix21_trusted_bundle_import(self):
+        for n in (1, 2):
+            filename = self._current_path / f'test_event{n}_stix21.json'
+            bundle = _load_stix2_content(filename)
+            for streaming in (False, True):
+                trusted_bundle = _load_stix2_content(
+                    filename, streaming=streaming, trusted=True
+                )
+                for stix_object, trusted_object in zip(bundle.objects, trusted_bundle.objects):
+                    self.assertIsInstance(trusted_object, dict)
+                    self.assertEqual(trusted_object.id, stix_object.id)
+                    self.assertEqual(
+                        trusted_object.get('modified'), stix_object.get('modified')
+                    )
+            results = []
+            for streaming, trusted in ((False, False), (False, True), (True, True)):
+                output_dir = Path(self._output_dir.name) / f'{n}_{streaming}_{trusted}'
+                output_dir.mkdir()
+                traceback = stix_2_to_misp(
+                    filename, output_dir=output_dir, streaming=streaming,
+                    trusted=trusted
+                )
+                self.assertTrue(traceback['success'])
+                results.append(
+                    [result.read_text() for result in traceback['results']]
+                )
+            self.assertEqual(results[0], results[1])
+            self.assertEqual(results[0], results[2])
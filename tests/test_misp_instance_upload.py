@@ -0,0 +1,205 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import json
+import threading
+from argparse import Namespace
+import unittest
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from misp_stix_converter import stix2_to_misp_instance
+from misp_stix_converter.misp_stix_converter import _connect_misp_instance
+from pathlib import Path
+from pymisp import PyMISP, __version__ as pymisp_version
+from time import perf_counter, sleep
+
+_TESTS_PATH = Path(__file__).parent.resolve()
+
+
+class _StubMISPHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        if '/events/view/' in self.path:
+            event = self.server.events.get(self.path.split('/')[-1])
+            if event is None:
+                return self._send_json(404, {'message': 'Invalid event'})
+            return self._send_json(200, {'Event': event})
+        if self.path.endswith('servers/getVersion'):
+            return self._send_json(
+                200, {
+                    'version': '2.5.0',
+                    'pymisp_recommended_version': pymisp_version
+                }
+            )
+        if self.path.endswith('users/view/me'):
+            return self._send_json(
+                200, {
+                    'User': {'id': '1', 'email': 'admin@admin.test'},
+                    'Role': {'id': '1', 'name': 'admin'},
+                    'UserSetting': {}
+                }
+            )
+        self._send_json(404, {'message': 'Not found', 'url': self.path})
+
+    def do_HEAD(self):
+        found = self.path.split('/')[-1] in self.server.events
+        self.send_response(200 if found else 404)
+        self.send_header('Content-Length', '0')
+        self.end_headers()
+
+    def do_POST(self):
+        content = self.rfile.read(int(self.headers['Content-Length']))
+        event = json.loads(content)
+        if 'Event' in event:
+            event = event['Event']
+        server = self.server
+        with server.lock:
+            server.in_flight += 1
+            server.max_in_flight = max(server.max_in_flight, server.in_flight)
+            attempts = server.attempts[event['uuid']] = (
+                server.attempts.get(event['uuid'], 0) + 1
+            )
+        sleep(0.05)
+        with server.lock:
+            server.in_flight -= 1
+        if event['uuid'] in server.events:
+            return self._send_json(
+                403, {
+                    'name': 'Event already exists',
+                    'message': 'Event already exists', 'url': '/events/add'
+                }
+            )
+        if event['uuid'] == server.broken:
+            body = b'Not a JSON response'
+            self.send_response(200)
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            return self.wfile.write(body)
+        if event['uuid'] == server.rejected:
+            return self._send_json(
+                403, {
+                    'name': 'Event already exists',
+                    'message': 'Event already exists', 'url': '/events/add'
+                }
+            )
+        if event['uuid'] in server.unavailable:
+            return self._send_json(503, {'message': 'Service unavailable'})
+        if event['uuid'] == server.flaky and attempts == 1:
+            return self._send_json(500, {'message': 'Internal error'})
+        event['id'] = str(len(server.attempts))
+        server.events[event['uuid']] = event
+        if event['uuid'] == server.slow and attempts == 1:
+            # The event is created, but the client gives up waiting
+            return sleep(3)
+        if event['uuid'] == server.lost and attempts == 1:
+            # The event is created, but the response is an error
+            return self._send_json(500, {'message': 'Internal error'})
+        self._send_json(200, {'Event': event})
+
+    def log_message(self, *args):
+        pass
+
+    def _send_json(self, status: int, content: dict):
+        body = json.dumps(content).encode()
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+
+class TestMISPInstanceUpload(unittest.TestCase):
+    _filename = _TESTS_PATH / 'test_events_collection_stix21.json'
+
+    def setUp(self):
+        self.server = ThreadingHTTPServer(('127.0.0.1', 0), _StubMISPHandler)
+        self.server.attempts = {}
+        self.server.broken = None
+        self.server.events = {}
+        self.server.flaky = None
+        self.server.in_flight = 0
+        self.server.lock = threading.Lock()
+        self.server.max_in_flight = 0
+        self.server.lost = None
+        self.server.rejected = None
+        self.server.slow = None
+        self.server.unavailable = ()
+        self.thread = threading.Thread(target=self.server.serve_forever)
+        self.thread.start()
+        self.misp = PyMISP(
+            f'http://127.0.0.1:{self.server.server_address[1]}',
+            'stub-api-key', False
+        )
+        with open(self._filename, 'rt', encoding='utf-8') as f:
+            self.event_uuids = [
+                stix_object['id'].split('--')[1]
+                for stix_object in json.load(f)['objects']
+                if stix_object['type'] in ('grouping', 'report')
+            ]
+
+    def tearDown(self):
+        self.server.shutdown()
+        self.server.server_close()
+        self.thread.join()
+
+    def test_concurrent_upload(self):
+        traceback = stix2_to_misp_instance(
+            self.misp, self._filename, upload_workers=4
+        )
+        self.assertEqual(traceback['success'], 1)
+        self.assertEqual(len(traceback['results']), len(self.event_uuids))
+        self.assertEqual(set(self.server.attempts), set(self.event_uuids))
+        self.assertGreater(self.server.max_in_flight, 1)
+
+    def test_upload_errors(self):
+        flaky, rejected, unavailable, _ = self.event_uuids
+        self.server.flaky = flaky
+        self.server.rejected = rejected
+        self.server.unavailable = (unavailable,)
+        traceback = stix2_to_misp_instance(
+            self.misp, self._filename, upload_retries=1, upload_workers=4
+        )
+        self.assertNotIn('success', traceback)
+        self.assertEqual(len(traceback['results']), 2)
+        pymisp_errors = traceback['pymisp_errors']
+        self.assertEqual(set(pymisp_errors), {rejected, unavailable})
+        self.assertEqual(pymisp_errors[rejected], 'Event already exists')
+        self.assertTrue(
+            pymisp_errors[unavailable].startswith('MISPServerError')
+        )
+        self.assertEqual(self.server.attempts[flaky], 2)
+        self.assertEqual(self.server.attempts[rejected], 1)
+        self.assertEqual(self.server.attempts[unavailable], 2)
+
+    def test_upload_unexpected_error(self):
+        broken, *uploaded = self.event_uuids
+        self.server.broken = broken
+        for workers in (1, 4):
+            self.server.attempts = {}
+            self.server.events = {}
+            traceback = stix2_to_misp_instance(
+                self.misp, self._filename, upload_retries=1,
+                upload_workers=workers
+            )
+            self.assertEqual(len(traceback['results']), len(uploaded))
+            self.assertEqual(set(self.server.attempts), set(self.event_uuids))
+            self.assertEqual(self.server.attempts[broken], 1)
+            self.assertEqual(list(traceback['pymisp_errors']), [broken])
+
+    def test_upload_retry_of_created_event(self):
+        lost, slow, *_ = self.event_uuids
+        self.server.lost = lost
+        self.server.slow = slow
+        misp = _connect_misp_instance(
+            Namespace(upload_timeout=0.5, upload_workers=4),
+            f'http://127.0.0.1:{self.server.server_address[1]}',
+            'stub-api-key', False
+        )
+        start = perf_counter()
+        traceback = stix2_to_misp_instance(
+            misp, self._filename, upload_retries=1, upload_workers=4
+        )
+        self.assertLess(perf_counter() - start, 2)
+        self.assertEqual(traceback['success'], 1)
+        self.assertEqual(len(traceback['results']), len(self.event_uuids))
+        self.assertEqual(set(self.server.events), set(self.event_uuids))
+        self.assertEqual(self.server.attempts[lost], 1)
+        self.assertEqual(self.server.attempts[slow], 1)
@@ -6,7 +6,8 @@ import unittest
 from base64 import b64encode
 from datetime import datetime, timezone
 from misp_stix_converter import (MISPtoSTIX1EventsParser, misp_attribute_collection_to_stix1,
-                                 misp_event_collection_to_stix1, misp_to_stix1)
+                                 misp_event_collection_to_stix1, misp_to_stix1, stix1_framing,
+                                 _get_events)
 from pymisp import MISPEvent
 from uuid import uuid5, UUID
 from .test_events import *
@@ -4245,6 +4246,21 @@ class TestCollectionStix1Export(TestCollectionSTIX1Export):
                 self._current_path / f'test_event{n}_stix12.xml'
             )
 
+    def test_event_collection_framing_12(self):
+        name = 'test_events_collection'
+        output_file = self._current_path / f'{name}.json.out'
+        reference_file = self._current_path / f'{name}_stix12.xml'
+        header, separator, footer = stix1_framing(
+            _DEFAULT_NAMESPACE, 'MISP', 'xml', '1.2'
+        )
+        contents = []
+        for n in (1, 2):
+            parser = MISPtoSTIX1EventsParser('MISP', '1.2')
+            parser.parse_json_content(self._current_path / f'{name}_{n}.json')
+            contents.append(_get_events(parser.stix_package, 'xml'))
+        output_file.write_text(f'{header}{separator.join(contents)}{footer}')
+        self._check_stix1_collection_export_results(output_file, reference_file)
+
     def test_event_export_11(self):
         name = 'test_events_collection_1.json'
         filename = self._current_path / name
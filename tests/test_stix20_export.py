@@ -1,17 +1,29 @@
 #!/usr/bin/env python
 # -*- coding: utf-8 -*-
 
+import gzip
+import json
+import re
 from datetime import datetime
+from importlib.util import find_spec
+from io import BytesIO, StringIO
 from misp_stix_converter import (
     MISPtoSTIX20Mapping, MISPtoSTIX20Parser, misp_collection_to_stix2,
-    misp_to_stix2)
+    misp_content_to_stix2, misp_to_stix2)
+from misp_stix_converter.misp2stix.stix2_cache import STIX2ResultCache
+from misp_stix_converter.misp2stix.stix2_writer import STIX2BundleWriter
+from pathlib import Path
 from pymisp import MISPAttribute, MISPEvent
+from tempfile import TemporaryDirectory
+from uuid import uuid4
 from .test_events import *
 from .update_documentation import (
     AttributesDocumentationUpdater, GalaxiesDocumentationUpdater,
     ObjectsDocumentationUpdater)
 from ._test_stix import TestSTIX20
-from ._test_stix_export import TestCollectionSTIX2Export, TestSTIX2Export, TestSTIX20Export
+from ._test_stix_export import (
+    TestCollectionSTIX2Export, TestSTIX2Export, TestSTIX20Export,
+    TestSTIX2TrustedExport)
 
 
 class TestSTIX20GenericExport(TestSTIX20Export, TestSTIX20):
@@ -323,6 +335,18 @@ class TestSTIX20JSONEventExport(TestSTIX20EventExport):
         event = get_event_with_event_report()
         self._test_event_with_event_report(event['Event'])
 
+    def test_event_with_event_report_references_matching(self):
+        event = get_event_with_event_report()
+        event_report = event['Event']['EventReport'][0]
+        self.parser.parse_misp_event(event)
+        references = set(
+            re.findall(
+                r'@!?\[(?:attribute|object)\]\(([0-9a-f-]{36})\)',
+                event_report['content']
+            )
+        )
+        self.assertEqual(set(self.parser._event_report_matching), references)
+
     def test_event_with_sightings(self):
         event = get_event_with_sightings()
         self._test_event_with_sightings(event['Event'])
@@ -4173,6 +4197,22 @@ class TestSTIX20JSONObjectsExport(TestSTIX20ObjectsExport):
         event = get_event_with_object_references()
         self._test_object_references(event['Event'])
 
+    def test_object_references_targets(self):
+        event = get_event_with_object_references()
+        self.parser.parse_misp_event(event)
+        object_refs = list(self.parser.object_refs)
+        for misp_object in event['Event']['Object']:
+            for reference in misp_object.get('ObjectReference', []):
+                referenced_uuid = reference['referenced_uuid']
+                self.assertEqual(
+                    self.parser._find_target_uuid(referenced_uuid),
+                    next(
+                        object_ref for object_ref in object_refs
+                        if referenced_uuid in object_ref
+                    )
+                )
+        self.assertIsNone(self.parser._find_target_uuid(str(uuid4())))
+
 
 class TestSTIX20MISPObjectsExport(TestSTIX20ObjectsExport):
     def test_embedded_indicator_object_galaxy(self):
@@ -4957,7 +4997,50 @@ class TestSTIX20MISPExportInteroperability(TestSTIX20ExportInteroperability):
         )
 
 
+class TestSTIX20TrustedJSONEventExport(
+        TestSTIX2TrustedExport, TestSTIX20JSONEventExport):
+    pass
+
+
+class TestSTIX20TrustedJSONAttributesExport(
+        TestSTIX2TrustedExport, TestSTIX20JSONAttributesExport):
+    pass
+
+
+class TestSTIX20TrustedJSONObjectsExport(
+        TestSTIX2TrustedExport, TestSTIX20JSONObjectsExport):
+    pass
+
+
+class TestSTIX20TrustedJSONGalaxiesExport(
+        TestSTIX2TrustedExport, TestSTIX20JSONGalaxiesExport):
+    pass
+
+
+class TestSTIX20TrustedJSONExportInteroperability(
+        TestSTIX2TrustedExport, TestSTIX20JSONExportInteroperability):
+    pass
+
+
 class TestCollectionSTIX20Export(TestCollectionSTIX2Export):
+    def test_trusted_events_collection(self):
+        name = 'test_events_collection'
+        input_files = [self._current_path / f'{name}_{n}.json' for n in (1, 2)]
+        with TemporaryDirectory() as validated, TemporaryDirectory() as trusted:
+            misp_collection_to_stix2(
+                *input_files, version='2.0', output_dir=validated
+            )
+            misp_collection_to_stix2(
+                *input_files, version='2.0', output_dir=trusted,
+                trusted=True, validation_rate=0.5
+            )
+            for n in (1, 2):
+                filename = f'{name}_{n}.json.out'
+                self.assertEqual(
+                    (Path(validated) / filename).read_bytes(),
+                    (Path(trusted) / filename).read_bytes()
+                )
+
     def test_attributes_collection(self):
         name = 'test_attributes_collection'
         output_file = self._current_path / f'{name}.json.out'
@@ -5016,6 +5099,199 @@ class TestCollectionSTIX20Export(TestCollectionSTIX2Export):
                 self._current_path / f'test_event{n}_stix20.json'
             )
 
+    def test_attributes_collection_with_workers(self):
+        name = 'test_attributes_collection'
+        output_file = self._current_path / f'{name}.json.out'
+        reference_file = self._current_path / f'{name}_stix20.json'
+        input_files = [self._current_path / f'{name}_{n}.json' for n in (1, 2)]
+        self.assertEqual(
+            misp_collection_to_stix2(
+                *input_files, version='2.0', single_output=True,
+                output_name=output_file, workers=2
+            ),
+            {'success': 1, 'results': [output_file]}
+        )
+        self._check_stix2_results_export(output_file, reference_file)
+
+    def test_events_collection_compact_output(self):
+        name = 'test_events_collection'
+        output_file = self._current_path / f'{name}.json.out'
+        reference_file = self._current_path / f'{name}_stix20.json'
+        input_files = [self._current_path / f'{name}_{n}.json' for n in (1, 2)]
+        json_backends = ('json', 'orjson') if find_spec('orjson') else ('json',)
+        for json_backend in json_backends:
+            self.assertEqual(
+                misp_collection_to_stix2(
+                    *input_files, version='2.0', single_output=True,
+                    output_name=output_file, indent=None,
+                    json_backend=json_backend
+                ),
+                {'success': 1, 'results': [output_file]}
+            )
+            self._check_stix2_results_export(output_file, reference_file)
+            self.assertNotIn('\n', output_file.read_text())
+
+    def test_events_collection_compressed_output(self):
+        name = 'test_events_collection'
+        output_file = self._current_path / f'{name}.json.out'
+        reference_file = self._current_path / f'{name}_stix20.json'
+        input_files = [self._current_path / f'{name}_{n}.json' for n in (1, 2)]
+        compressed_file = self._current_path / f'{name}.json.out.gz'
+        self.assertEqual(
+            misp_collection_to_stix2(
+                *input_files, version='2.0', single_output=True,
+                output_name=output_file, compress='gzip'
+            ),
+            {'success': 1, 'results': [compressed_file]}
+        )
+        with gzip.open(compressed_file, 'rt', encoding='utf-8') as f:
+            to_test = json.loads(f.read())
+        with open(reference_file, 'rt', encoding='utf-8') as f:
+            reference = json.loads(f.read())
+        self.assertEqual(reference['objects'], to_test['objects'])
+        compressed_file.unlink()
+
+    def test_events_collection_in_memory_content(self):
+        name = 'test_events_collection'
+        reference_file = self._current_path / f'{name}_stix20.json'
+        with open(reference_file, 'rt', encoding='utf-8') as f:
+            reference = json.loads(f.read())
+        contents = [
+            (self._current_path / f'{name}_{n}.json').read_bytes()
+            for n in (1, 2)
+        ]
+        inputs = (
+            [json.loads(content) for content in contents],
+            contents,
+            [BytesIO(gzip.compress(content)) for content in contents]
+        )
+        for in_memory_contents in inputs:
+            traceback = misp_content_to_stix2(
+                *in_memory_contents, version='2.0'
+            )
+            self.assertEqual(traceback['success'], 1)
+            bundle = json.loads(traceback['results'][0].serialize())
+            self.assertEqual(bundle['objects'], reference['objects'])
+        traceback = misp_content_to_stix2(
+            *contents, version='2.0', serialize=True
+        )
+        self.assertIsInstance(traceback['results'][0], bytes)
+        bundle = json.loads(traceback['results'][0])
+        self.assertEqual(bundle['objects'], reference['objects'])
+
+    def test_events_collection_streamed_bundle(self):
+        filename = self._current_path / 'test_events_collection_1.json'
+        parser = MISPtoSTIX20Parser()
+        parser.parse_json_content(filename)
+        bundle = parser.bundle
+        output = StringIO()
+        with STIX2BundleWriter(
+                output, version='2.0', bundle_id=bundle.id) as writer:
+            MISPtoSTIX20Parser().write_json_content(filename, writer)
+        self.assertEqual(writer.count, len(bundle.objects))
+        self.assertEqual(output.getvalue(), bundle.serialize(indent=4))
+
+    def test_events_collection_streamed_bundle_with_failing_content(self):
+        # The identity & markings of an event that fails are not written,
+        # they must then be written with the next events referencing them
+        name = 'test_events_collection'
+        contents = [
+            json.loads((self._current_path / f'{name}_{n}.json').read_bytes())
+            for n in (1, 2)
+        ]
+        contents[0]['response'][0]['Event']['EventReport'] = [
+            {
+                'uuid': '0b6aadf7-ef4b-4eb4-8b8d-40c0a1a6e7d1',
+                'name': 'Report without content', 'timestamp': '1603642920'
+            }
+        ]
+        reference = json.loads(
+            misp_content_to_stix2(
+                contents[1], version='2.0', serialize=True
+            )['results'][0]
+        )
+        traceback = misp_content_to_stix2(
+            *contents, version='2.0', serialize=True
+        )
+        self.assertEqual(len(traceback['fails']), 1)
+        bundle = json.loads(traceback['results'][0])
+        self.assertEqual(bundle['objects'], reference['objects'])
+        with TemporaryDirectory() as output_dir:
+            input_file = Path(output_dir) / f'{name}_1.json'
+            input_file.write_text(json.dumps(contents[0]))
+            output_file = Path(output_dir) / f'{name}.json.out'
+            traceback = misp_collection_to_stix2(
+                input_file, self._current_path / f'{name}_2.json',
+                version='2.0', single_output=True, output_name=output_file
+            )
+            self.assertEqual(len(traceback['fails']), 1)
+            self.assertEqual(traceback['results'], [output_file])
+            bundle = json.loads(output_file.read_text())
+        self.assertEqual(bundle['objects'], reference['objects'])
+
+    def test_events_collection_with_cache(self):
+        name = 'test_events_collection'
+        output_file = self._current_path / f'{name}.json.out'
+        reference_file = self._current_path / f'{name}_stix20.json'
+        input_files = [self._current_path / f'{name}_{n}.json' for n in (1, 2)]
+        with TemporaryDirectory() as cache_dir:
+            with STIX2ResultCache(Path(cache_dir) / 'cache.db') as cache:
+                for misses, hits in ((4, 0), (4, 4)):
+                    self.assertEqual(
+                        misp_collection_to_stix2(
+                            *input_files, version='2.0', single_output=True,
+                            output_name=output_file, cache=cache
+                        ),
+                        {'success': 1, 'results': [output_file]}
+                    )
+                    self._check_stix2_results_export(output_file, reference_file)
+                    self.assertEqual((cache.misses, cache.hits), (misses, hits))
+                bundle = misp_content_to_stix2(
+                    *(filename.read_bytes() for filename in input_files),
+                    version='2.0', cache=cache
+                )['results'][0]
+                with open(reference_file, 'rt', encoding='utf-8') as f:
+                    reference = json.loads(f.read())
+                self.assertEqual(
+                    json.loads(bundle.serialize())['objects'],
+                    reference['objects']
+                )
+
+    def test_events_collection_with_workers(self):
+        name = 'test_events_collection'
+        output_file = self._current_path / f'{name}.json.out'
+        reference_file = self._current_path / f'{name}_stix20.json'
+        input_files = [self._current_path / f'{name}_{n}.json' for n in (1, 2)]
+        self.assertEqual(
+            misp_collection_to_stix2(
+                *input_files, version='2.0', single_output=True,
+                output_name=output_file, workers=2
+            ),
+            {'success': 1, 'results': [output_file]}
+        )
+        self._check_stix2_results_export(output_file, reference_file)
+        self.assertEqual(
+            misp_collection_to_stix2(
+                *input_files, version='2.0', in_memory=True,
+                single_output=True, output_name=output_file, workers=2
+            ),
+            {'success': 1, 'results': [output_file]}
+        )
+        self._check_stix2_results_export(output_file, reference_file)
+        self.assertEqual(
+            misp_collection_to_stix2(*input_files, version='2.0', workers=2),
+            {
+                'success': 1,
+                'results': [
+                    self._current_path / f'{name}_{n}.json.out' for n in (1, 2)
+                ]
+            }
+        )
+        for n in (1, 2):
+            self._check_stix2_results_export(
+                self._current_path / f'{name}_{n}.json.out',
+                self._current_path / f'test_event{n}_stix20.json'
+            )
 
     def test_event_export(self):
         name = 'test_events_collection_1.json'
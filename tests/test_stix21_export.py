@@ -1,17 +1,46 @@
 #!/usr/bin/env python
 # -*- coding: utf-8 -*-
 
+import gzip
+import json
+import re
+import sqlite3
+from contextlib import redirect_stderr
 from datetime import datetime
+from importlib.util import find_spec
+from io import BytesIO, RawIOBase, StringIO
 from misp_stix_converter import (
-    MISPtoSTIX21Mapping, MISPtoSTIX21Parser, misp_collection_to_stix2,
-    misp_to_stix2)
+    MISPtoSTIX21Mapping, MISPtoSTIX21Parser, main, misp_collection_to_stix2,
+    misp_content_to_stix2, misp_to_stix2)
+from misp_stix_converter.misp2stix.stix2_cache import STIX2ResultCache
+from misp_stix_converter.misp2stix.stix2_writer import STIX2BundleWriter
+from pathlib import Path
 from pymisp import MISPAttribute, MISPEvent
+from tempfile import TemporaryDirectory
+from unittest.mock import patch
+from uuid import uuid4
 from .test_events import *
 from .update_documentation import (
     AttributesDocumentationUpdater, GalaxiesDocumentationUpdater,
     ObjectsDocumentationUpdater)
 from ._test_stix import TestSTIX21
-from ._test_stix_export import TestCollectionSTIX2Export, TestSTIX2Export, TestSTIX21Export
+from ._test_stix_export import (
+    TestCollectionSTIX2Export, TestSTIX2Export, TestSTIX21Export,
+    TestSTIX2TrustedExport)
+
+
+class _UnseekableStream(RawIOBase):
+    # Binary stream that can neither be rewound nor peeked at, like a pipe
+    def __init__(self, content: bytes):
+        self.__content = BytesIO(content)
+
+    def readable(self) -> bool:
+        return True
+
+    def readinto(self, buffer) -> int:
+        content = self.__content.read(len(buffer))
+        buffer[:len(content)] = content
+        return len(content)
 
 
 class TestSTIX21GenericExport(TestSTIX21Export, TestSTIX21):
@@ -410,6 +439,18 @@ class TestSTIX21JSONEventExport(TestSTIX21EventExport):
         event = get_event_with_event_report()
         self._test_event_with_event_report(event['Event'])
 
+    def test_event_with_event_report_references_matching(self):
+        event = get_event_with_event_report()
+        event_report = event['Event']['EventReport'][0]
+        self.parser.parse_misp_event(event)
+        references = set(
+            re.findall(
+                r'@!?\[(?:attribute|object)\]\(([0-9a-f-]{36})\)',
+                event_report['content']
+            )
+        )
+        self.assertEqual(set(self.parser._event_report_matching), references)
+
     def test_event_with_object_confidence_tags(self):
         event = get_event_with_object_confidence_tags()
         self._test_event_with_object_confidence_tags(event['Event'])
@@ -5370,6 +5411,22 @@ class TestSTIX21JSONObjectsExport(TestSTIX21ObjectsExport):
         event = get_event_with_object_references()
         self._test_object_references(event['Event'])
 
+    def test_object_references_targets(self):
+        event = get_event_with_object_references()
+        self.parser.parse_misp_event(event)
+        object_refs = list(self.parser.object_refs)
+        for misp_object in event['Event']['Object']:
+            for reference in misp_object.get('ObjectReference', []):
+                referenced_uuid = reference['referenced_uuid']
+                self.assertEqual(
+                    self.parser._find_target_uuid(referenced_uuid),
+                    next(
+                        object_ref for object_ref in object_refs
+                        if referenced_uuid in object_ref
+                    )
+                )
+        self.assertIsNone(self.parser._find_target_uuid(str(uuid4())))
+
 
 class TestSTIX21MISPObjectsExport(TestSTIX21ObjectsExport):
     def test_embedded_indicator_object_galaxy(self):
@@ -6247,7 +6304,88 @@ class TestSTIX21MISPExportInteroperability(TestSTIX21ExportInteroperability):
         )
 
 
+class TestSTIX21TrustedJSONEventExport(
+        TestSTIX2TrustedExport, TestSTIX21JSONEventExport):
+    pass
+
+
+class TestSTIX21TrustedJSONAttributesExport(
+        TestSTIX2TrustedExport, TestSTIX21JSONAttributesExport):
+    pass
+
+
+class TestSTIX21TrustedJSONObjectsExport(
+        TestSTIX2TrustedExport, TestSTIX21JSONObjectsExport):
+    pass
+
+
+class TestSTIX21TrustedJSONGalaxiesExport(
+        TestSTIX2TrustedExport, TestSTIX21JSONGalaxiesExport):
+    pass
+
+
+class TestSTIX21TrustedJSONExportInteroperability(
+        TestSTIX2TrustedExport, TestSTIX21JSONExportInteroperability):
+    pass
+
+
 class TestCollectionSTIX21Export(TestCollectionSTIX2Export):
+    def test_trusted_events_collection(self):
+        name = 'test_events_collection'
+        input_files = [self._current_path / f'{name}_{n}.json' for n in (1, 2)]
+        with TemporaryDirectory() as validated, TemporaryDirectory() as trusted:
+            misp_collection_to_stix2(
+                *input_files, version='2.1', output_dir=validated
+            )
+            misp_collection_to_stix2(
+                *input_files, version='2.1', output_dir=trusted,
+                trusted=True, validation_rate=0.5
+            )
+            for n in (1, 2):
+                filename = f'{name}_{n}.json.out'
+                self.assertEqual(
+                    (Path(validated) / filename).read_bytes(),
+                    (Path(trusted) / filename).read_bytes()
+                )
+
+    def test_trusted_events_collection_invalid_validation_rate(self):
+        name = 'test_events_collection'
+        input_files = [self._current_path / f'{name}_{n}.json' for n in (1, 2)]
+        message = 'Invalid validation rate: 2'
+        with TemporaryDirectory() as output_dir:
+            traceback = misp_collection_to_stix2(
+                *input_files, version='2.1', output_dir=output_dir,
+                trusted=True, validation_rate=2
+            )
+            self.assertEqual(len(traceback['fails']), 2)
+            for filename, fail in zip(input_files, traceback['fails']):
+                self.assertTrue(fail.startswith(f'{filename} - {message}'))
+            traceback = misp_to_stix2(
+                input_files[0], version='2.1', output_dir=output_dir,
+                trusted=True, validation_rate=2
+            )
+            self.assertTrue(
+                traceback['fails'][0].startswith(f'{input_files[0]} - {message}')
+            )
+            self.assertEqual(list(Path(output_dir).iterdir()), [])
+        arguments = (
+            ('--validation-rate', '2', '--trusted'),
+            ('--validation-rate', '-0.5', '--trusted'),
+            ('--validation-rate', 'nan', '--trusted'),
+            ('--validation-rate', '0.5')
+        )
+        for args in arguments:
+            command = [
+                'misp_stix_converter', 'export', '-v', '2.1',
+                '-f', str(input_files[0]), *args
+            ]
+            with self.subTest(args=args), patch('sys.argv', command), \
+                    redirect_stderr(StringIO()) as stderr:
+                with self.assertRaises(SystemExit) as exit_error:
+                    main()
+                self.assertEqual(exit_error.exception.code, 2)
+                self.assertIn('--validation-rate', stderr.getvalue())
+
     def test_attributes_collection(self):
         name = 'test_attributes_collection'
         output_file = self._current_path / f'{name}.json.out'
@@ -6315,6 +6453,257 @@ class TestCollectionSTIX21Export(TestCollectionSTIX2Export):
                 self._current_path / f'test_event{n}_stix21.json'
             )
 
+    def test_attributes_collection_with_workers(self):
+        name = 'test_attributes_collection'
+        output_file = self._current_path / f'{name}.json.out'
+        reference_file = self._current_path / f'{name}_stix21.json'
+        input_files = [self._current_path / f'{name}_{n}.json' for n in (1, 2)]
+        self.assertEqual(
+            misp_collection_to_stix2(
+                *input_files, version='2.1', single_output=True,
+                output_name=output_file, workers=2
+            ),
+            {'success': 1, 'results': [output_file]}
+        )
+        self._check_stix2_results_export(output_file, reference_file)
+
+    def test_events_collection_compact_output(self):
+        name = 'test_events_collection'
+        output_file = self._current_path / f'{name}.json.out'
+        reference_file = self._current_path / f'{name}_stix21.json'
+        input_files = [self._current_path / f'{name}_{n}.json' for n in (1, 2)]
+        json_backends = ('json', 'orjson') if find_spec('orjson') else ('json',)
+        for json_backend in json_backends:
+            self.assertEqual(
+                misp_collection_to_stix2(
+                    *input_files, version='2.1', single_output=True,
+                    output_name=output_file, indent=None,
+                    json_backend=json_backend
+                ),
+                {'success': 1, 'results': [output_file]}
+            )
+            self._check_stix2_results_export(output_file, reference_file)
+            self.assertNotIn('\n', output_file.read_text())
+
+    def test_events_collection_compressed_output(self):
+        name = 'test_events_collection'
+        output_file = self._current_path / f'{name}.json.out'
+        reference_file = self._current_path / f'{name}_stix21.json'
+        input_files = [self._current_path / f'{name}_{n}.json' for n in (1, 2)]
+        compressed_file = self._current_path / f'{name}.json.out.gz'
+        self.assertEqual(
+            misp_collection_to_stix2(
+                *input_files, version='2.1', single_output=True,
+                output_name=output_file, compress='gzip'
+            ),
+            {'success': 1, 'results': [compressed_file]}
+        )
+        with gzip.open(compressed_file, 'rt', encoding='utf-8') as f:
+            to_test = json.loads(f.read())
+        with open(reference_file, 'rt', encoding='utf-8') as f:
+            reference = json.loads(f.read())
+        self.assertEqual(reference['objects'], to_test['objects'])
+        compressed_file.unlink()
+
+    def test_events_collection_in_memory_content(self):
+        name = 'test_events_collection'
+        reference_file = self._current_path / f'{name}_stix21.json'
+        with open(reference_file, 'rt', encoding='utf-8') as f:
+            reference = json.loads(f.read())
+        contents = [
+            (self._current_path / f'{name}_{n}.json').read_bytes()
+            for n in (1, 2)
+        ]
+        inputs = (
+            [json.loads(content) for content in contents],
+            contents,
+            [BytesIO(gzip.compress(content)) for content in contents],
+            [_UnseekableStream(content) for content in contents],
+            [_UnseekableStream(gzip.compress(content)) for content in contents]
+        )
+        for in_memory_contents in inputs:
+            traceback = misp_content_to_stix2(
+                *in_memory_contents, version='2.1'
+            )
+            self.assertEqual(traceback['success'], 1)
+            bundle = json.loads(traceback['results'][0].serialize())
+            self.assertEqual(bundle['objects'], reference['objects'])
+            for content in in_memory_contents:
+                if isinstance(content, RawIOBase):
+                    self.assertFalse(content.closed)
+        traceback = misp_content_to_stix2(
+            *contents, version='2.1', serialize=True
+        )
+        self.assertIsInstance(traceback['results'][0], bytes)
+        bundle = json.loads(traceback['results'][0])
+        self.assertEqual(bundle['objects'], reference['objects'])
+
+    def test_events_collection_streamed_bundle(self):
+        filename = self._current_path / 'test_events_collection_1.json'
+        parser = MISPtoSTIX21Parser()
+        parser.parse_json_content(filename)
+        bundle = parser.bundle
+        output = StringIO()
+        with STIX2BundleWriter(
+                output, version='2.1', bundle_id=bundle.id) as writer:
+            MISPtoSTIX21Parser().write_json_content(filename, writer)
+        self.assertEqual(writer.count, len(bundle.objects))
+        self.assertEqual(output.getvalue(), bundle.serialize(indent=4))
+
+    def test_events_collection_streamed_bundle_with_failing_content(self):
+        # The identity & markings of an event that fails are not written,
+        # they must then be written with the next events referencing them
+        name = 'test_events_collection'
+        contents = [
+            json.loads((self._current_path / f'{name}_{n}.json').read_bytes())
+            for n in (1, 2)
+        ]
+        contents[0]['response'][0]['Event']['EventReport'] = [
+            {
+                'uuid': '0b6aadf7-ef4b-4eb4-8b8d-40c0a1a6e7d1',
+                'name': 'Report without content', 'timestamp': '1603642920'
+            }
+        ]
+        reference = json.loads(
+            misp_content_to_stix2(
+                contents[1], version='2.1', serialize=True
+            )['results'][0]
+        )
+        traceback = misp_content_to_stix2(
+            *contents, version='2.1', serialize=True
+        )
+        self.assertEqual(len(traceback['fails']), 1)
+        bundle = json.loads(traceback['results'][0])
+        self.assertEqual(bundle['objects'], reference['objects'])
+        with TemporaryDirectory() as output_dir:
+            input_file = Path(output_dir) / f'{name}_1.json'
+            input_file.write_text(json.dumps(contents[0]))
+            output_file = Path(output_dir) / f'{name}.json.out'
+            traceback = misp_collection_to_stix2(
+                input_file, self._current_path / f'{name}_2.json',
+                version='2.1', single_output=True, output_name=output_file
+            )
+            self.assertEqual(len(traceback['fails']), 1)
+            self.assertEqual(traceback['results'], [output_file])
+            bundle = json.loads(output_file.read_text())
+        self.assertEqual(bundle['objects'], reference['objects'])
+
+    def test_events_collection_cache_eviction(self):
+        filename = self._current_path / 'test_events_collection_1.json'
+        with TemporaryDirectory() as cache_dir:
+            cache_path = Path(cache_dir) / 'cache.db'
+            with STIX2ResultCache(cache_path) as cache:
+                MISPtoSTIX21Parser(cache=cache).parse_json_content(filename)
+                self.assertEqual(cache.misses, 2)
+                size = cache.size
+            with STIX2ResultCache(cache_path, max_age=3600) as cache:
+                self.assertEqual(cache.size, size)
+            with STIX2ResultCache(cache_path, max_age=0) as cache:
+                self.assertEqual(cache.size, 0)
+            with STIX2ResultCache(cache_path, max_size=size - 1) as cache:
+                for _ in range(2):
+                    MISPtoSTIX21Parser(cache=cache).parse_json_content(filename)
+                    self.assertLess(cache.size, size)
+
+    def test_events_collection_shared_cache(self):
+        name = 'test_events_collection'
+        input_files = [self._current_path / f'{name}_{n}.json' for n in (1, 2)]
+        with TemporaryDirectory() as cache_dir:
+            cache_path = Path(cache_dir) / 'cache.db'
+            # Results are visible to the other processes as soon as stored
+            with STIX2ResultCache(cache_path) as cache, \
+                    STIX2ResultCache(cache_path) as other_cache:
+                for parser_cache in (cache, other_cache):
+                    MISPtoSTIX21Parser(cache=parser_cache).parse_json_content(
+                        input_files[0]
+                    )
+                self.assertEqual((other_cache.misses, other_cache.hits), (0, 2))
+                size = cache.size
+            # A locked cache is skipped and the events are converted anyway
+            with patch(f'{STIX2ResultCache.__module__}._TIMEOUT', 0.1), \
+                    STIX2ResultCache(cache_path) as cache:
+                lock = sqlite3.connect(str(cache_path), isolation_level=None)
+                lock.execute('BEGIN EXCLUSIVE')
+                try:
+                    parser = MISPtoSTIX21Parser(cache=cache)
+                    parser.parse_json_content(input_files[1])
+                    parser.parse_json_content(input_files[0])
+                    self.assertEqual((cache.misses, cache.hits), (2, 2))
+                    self.assertEqual(cache.size, size)
+                finally:
+                    lock.rollback()
+                    lock.close()
+            reference = MISPtoSTIX21Parser()
+            for filename in input_files[::-1]:
+                reference.parse_json_content(filename)
+            self.assertEqual(
+                [stix_object['id'] for stix_object in parser.stix_objects],
+                [stix_object['id'] for stix_object in reference.stix_objects]
+            )
+
+    def test_events_collection_with_cache(self):
+        name = 'test_events_collection'
+        output_file = self._current_path / f'{name}.json.out'
+        reference_file = self._current_path / f'{name}_stix21.json'
+        input_files = [self._current_path / f'{name}_{n}.json' for n in (1, 2)]
+        with TemporaryDirectory() as cache_dir:
+            with STIX2ResultCache(Path(cache_dir) / 'cache.db') as cache:
+                for misses, hits in ((4, 0), (4, 4)):
+                    self.assertEqual(
+                        misp_collection_to_stix2(
+                            *input_files, version='2.1', single_output=True,
+                            output_name=output_file, cache=cache
+                        ),
+                        {'success': 1, 'results': [output_file]}
+                    )
+                    self._check_stix2_results_export(output_file, reference_file)
+                    self.assertEqual((cache.misses, cache.hits), (misses, hits))
+                bundle = misp_content_to_stix2(
+                    *(filename.read_bytes() for filename in input_files),
+                    version='2.1', cache=cache
+                )['results'][0]
+                with open(reference_file, 'rt', encoding='utf-8') as f:
+                    reference = json.loads(f.read())
+                self.assertEqual(
+                    json.loads(bundle.serialize())['objects'],
+                    reference['objects']
+                )
+
+    def test_events_collection_with_workers(self):
+        name = 'test_events_collection'
+        output_file = self._current_path / f'{name}.json.out'
+        reference_file = self._current_path / f'{name}_stix21.json'
+        input_files = [self._current_path / f'{name}_{n}.json' for n in (1, 2)]
+        self.assertEqual(
+            misp_collection_to_stix2(
+                *input_files, version='2.1', single_output=True,
+                output_name=output_file, workers=2
+            ),
+            {'success': 1, 'results': [output_file]}
+        )
+        self._check_stix2_results_export(output_file, reference_file)
+        self.assertEqual(
+            misp_collection_to_stix2(
+                *input_files, version='2.1', in_memory=True,
+                single_output=True, output_name=output_file, workers=2
+            ),
+            {'success': 1, 'results': [output_file]}
+        )
+        self._check_stix2_results_export(output_file, reference_file)
+        self.assertEqual(
+            misp_collection_to_stix2(*input_files, version='2.1', workers=2),
+            {
+                'success': 1,
+                'results': [
+                    self._current_path / f'{name}_{n}.json.out' for n in (1, 2)
+                ]
+            }
+        )
+        for n in (1, 2):
+            self._check_stix2_results_export(
+                self._current_path / f'{name}_{n}.json.out',
+                self._current_path / f'test_event{n}_stix21.json'
+            )
 
     def test_event_export(self):
         name = 'test_events_collection_1.json'
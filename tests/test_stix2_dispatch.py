@@ -0,0 +1,191 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import unittest
+from collections import Counter
+from copy import deepcopy
+from misp_stix_converter import (
+    InternalSTIX2toMISPParser, MISPtoSTIX20Parser, MISPtoSTIX21Parser)
+from misp_stix_converter.stix2misp.importparser import _load_stix2_content
+from pathlib import Path
+from time import perf_counter
+from unittest.mock import patch
+from uuid import NAMESPACE_URL, uuid5
+from .test_events import _BASE_EVENT, _TEST_IP_PORT_OBJECT
+
+_ATTRIBUTE_TYPES = (
+    ('ip-dst', 'Network activity'), ('domain', 'Network activity'),
+    ('md5', 'Payload delivery'), ('vulnerability', 'External analysis')
+)
+_TESTS_PATH = Path(__file__).parent.resolve()
+
+
+def _dispatch_event(attributes: int, objects: int = 0) -> dict:
+    event = deepcopy(_BASE_EVENT)
+    event['Event']['Attribute'] = []
+    for index in range(attributes):
+        attribute_type, category = _ATTRIBUTE_TYPES[index % 4]
+        value = {
+            'domain': f'domain{index}.test',
+            'ip-dst': f'10.{index >> 16 & 255}.{index >> 8 & 255}.{index & 255}',
+            'md5': f'{index:032x}', 'vulnerability': f'CVE-2021-{index}'
+        }
+        event['Event']['Attribute'].append(
+            {
+                'uuid': str(uuid5(NAMESPACE_URL, f'attribute-{index}')),
+                'type': attribute_type, 'category': category,
+                'value': value[attribute_type], 'timestamp': '1603642920',
+                'to_ids': attribute_type != 'vulnerability'
+            }
+        )
+    event['Event']['Object'] = []
+    for index in range(objects):
+        misp_object = deepcopy(_TEST_IP_PORT_OBJECT)
+        misp_object['uuid'] = str(uuid5(NAMESPACE_URL, f'object-{index}'))
+        for position, attribute in enumerate(misp_object['Attribute']):
+            attribute['uuid'] = str(
+                uuid5(NAMESPACE_URL, f'object-{index}-{position}')
+            )
+        event['Event']['Object'].append(misp_object)
+    return event
+
+
+def _time_attribute_dispatch(parser_class, attributes: list) -> tuple:
+    """
+    Times the dispatch of MISP attributes to their parsing method, as it was
+    done before (mapping lookup and `getattr` for every attribute), and as
+    `_resolve_attribute` does it now. The parsing methods themselves are
+    replaced with a no-op, so only the dispatch overhead is measured.
+    """
+    parser = parser_class()
+    parser._results_handling_function = parser._append_SDO
+    mapping = parser._mapping
+
+    def previous_dispatch():
+        for attribute in attributes:
+            getattr(parser, mapping.attribute_types_mapping(attribute['type']))
+
+    def no_op(attribute):
+        pass
+
+    parser._MISPtoSTIX2Parser__get_parser = lambda to_call: no_op
+
+    def current_dispatch():
+        for attribute in attributes:
+            parser._resolve_attribute(attribute)
+
+    durations = []
+    for dispatch in (previous_dispatch, current_dispatch):
+        start = perf_counter()
+        dispatch()
+        durations.append(perf_counter() - start)
+    return tuple(durations)
+
+
+class TestMISPtoSTIX2Dispatch(unittest.TestCase):
+    def _check_dispatch_tables(self, parser_class):
+        parser = parser_class()
+        mapping = parser._mapping
+        with patch.object(
+                mapping, 'attribute_types_mapping',
+                wraps=mapping.attribute_types_mapping) as attribute_mapping, \
+                patch.object(
+                    mapping, 'objects_mapping',
+                    wraps=mapping.objects_mapping) as objects_mapping:
+            parser.parse_misp_event(_dispatch_event(20, objects=3))
+            attribute_parsers = dict(
+                parser._MISPtoSTIX2Parser__attribute_parsers
+            )
+            object_parsers = dict(parser._MISPtoSTIX2Parser__object_parsers)
+            # Another event with the same parser reuses the bound methods
+            second_event = _dispatch_event(8, objects=2)
+            second_event['Event']['uuid'] = str(uuid5(NAMESPACE_URL, 'second'))
+            parser.parse_misp_event(second_event)
+        self.assertEqual(
+            Counter(call.args[0] for call in attribute_mapping.call_args_list),
+            Counter(attribute_type for attribute_type, _ in _ATTRIBUTE_TYPES)
+        )
+        self.assertEqual(
+            [call.args for call in objects_mapping.call_args_list],
+            [('ip-port',)]
+        )
+        self.assertEqual(
+            set(attribute_parsers),
+            {attribute_type for attribute_type, _ in _ATTRIBUTE_TYPES}
+        )
+        for attribute_type, attribute_parser in attribute_parsers.items():
+            self.assertIs(attribute_parser.__self__, parser)
+            self.assertEqual(
+                attribute_parser.__name__,
+                mapping.attribute_types_mapping(attribute_type)
+            )
+            self.assertIs(
+                parser._MISPtoSTIX2Parser__attribute_parsers[attribute_type],
+                attribute_parser
+            )
+        self.assertEqual(list(object_parsers), ['ip-port'])
+        self.assertIs(
+            parser._MISPtoSTIX2Parser__object_parsers['ip-port'],
+            object_parsers['ip-port']
+        )
+        self.assertIs(parser._results_handling_function.__self__, parser)
+        for id_parsing_function in parser._id_parsing_function.values():
+            self.assertIs(id_parsing_function.__self__, parser)
+        # Each parser instance gets its own dispatch tables
+        other_parser = parser_class()
+        other_parser.parse_misp_event(_dispatch_event(4))
+        other_parsers = other_parser._MISPtoSTIX2Parser__attribute_parsers
+        for attribute_parser in other_parsers.values():
+            self.assertIs(attribute_parser.__self__, other_parser)
+
+    def _check_dispatch_overhead(self, parser_class):
+        attributes = _dispatch_event(20000)['Event']['Attribute']
+        durations = [
+            _time_attribute_dispatch(parser_class, attributes)
+            for _ in range(3)
+        ]
+        previous, current = (min(values) for values in zip(*durations))
+        self.assertLess(current, previous)
+
+    def test_stix20_dispatch_tables(self):
+        self._check_dispatch_tables(MISPtoSTIX20Parser)
+
+    def test_stix20_dispatch_overhead(self):
+        self._check_dispatch_overhead(MISPtoSTIX20Parser)
+
+    def test_stix21_dispatch_tables(self):
+        self._check_dispatch_tables(MISPtoSTIX21Parser)
+
+    def test_stix21_dispatch_overhead(self):
+        self._check_dispatch_overhead(MISPtoSTIX21Parser)
+
+
+class TestSTIX2toMISPDispatch(unittest.TestCase):
+    def test_stix21_dispatch_tables(self):
+        bundle = _load_stix2_content(_TESTS_PATH / 'test_event1_stix21.json')
+        parser = InternalSTIX2toMISPParser()
+        mapping = parser._mapping
+        with patch.object(
+                mapping, 'stix_object_loading_mapping',
+                wraps=mapping.stix_object_loading_mapping) as loading_mapping, \
+                patch.object(
+                    mapping, 'stix_to_misp_mapping',
+                    wraps=mapping.stix_to_misp_mapping) as parsing_mapping:
+            parser.load_stix_bundle(bundle)
+            parser.parse_stix_bundle()
+        object_types = Counter(stix_object.type for stix_object in bundle.objects)
+        self.assertEqual(
+            Counter(call.args[0] for call in loading_mapping.call_args_list),
+            Counter(set(object_types))
+        )
+        parsing_calls = Counter(
+            call.args[0] for call in parsing_mapping.call_args_list
+        )
+        self.assertTrue(parsing_calls)
+        self.assertEqual(set(parsing_calls.values()), {1})
+        loading_functions = parser._STIX2toMISPParser__loading_functions
+        self.assertEqual(set(loading_functions), set(object_types))
+        for loading_function in loading_functions.values():
+            self.assertIs(loading_function.__self__, parser)
+        object_parsers = parser._STIX2toMISPParser__object_parsers
+        self.assertEqual(set(object_parsers), set(parsing_calls))
@@ -0,0 +1,162 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import json
+import unittest
+from . import (
+    test_external_stix20_bundles, test_external_stix21_bundles,
+    test_internal_stix20_bundles, test_internal_stix21_bundles)
+from misp_stix_converter import STIX2PatternParser
+from misp_stix_converter.stix2misp.stix2_pattern_parser import (
+    _parse_simple_pattern)
+from pathlib import Path
+
+_BUNDLE_MODULES = (
+    test_external_stix20_bundles, test_external_stix21_bundles,
+    test_internal_stix20_bundles, test_internal_stix21_bundles
+)
+_HANDCRAFTED_PATTERNS = (
+    "[domain-name:value = 'circl.lu']",
+    " [domain-name:value = 'circl.lu'] ",
+    "[domain-name:value='circl.lu']",
+    "[domain-name:value = 'circl.lu'\n AND domain-name:x_misp_port = 443]",
+    "[file:hashes.'SHA-256' = 'circl']",
+    "[file:name = 'x\\'y\\\\z' AND file:'x_misp_first-seen' != '2020']",
+    "[x-misp-object:a.b.'c\\\\' >= 'x' AND x-misp-object:d < -5]",
+    "[network-traffic:is_active = true AND network-traffic:src_port <> 0]",
+    "[url:value LIKE '%circl%' AND url:value MATCHES '^http']",
+    "[ipv4-addr:value ISSUBSET '10.0.0.0/8']",
+    "[ipv4-addr:value ISSUPERSET'10.0.0.0/8']",
+    "[domain-name:value = '80']",
+    "[domain-name:value = 'circl.lu' OR domain-name:value = 'misp.lu']",
+    "[domain-name:value = 'circl.lu'] AND [domain-name:value = 'misp.lu']",
+    "[domain-name:value = 'circl.lu'] REPEATS 5 TIMES",
+    "[(domain-name:value = 'circl.lu')]",
+    "[domain-name:value = 'circl.lu'AND domain-name:value = 'misp.lu']",
+    "[domain-name:value = trueAND domain-name:value = 'misp.lu']",
+    "[domain-name:value NOT = 'circl.lu']",
+    "[domain-name:value IN ('circl.lu', 'misp.lu')]",
+    "[domain-name:value = 'circl.lu' and domain-name:value = 'misp.lu']",
+    "[domain-name:AND = 'circl.lu']",
+    "[domain-name:values[*] = 'circl.lu']",
+    "[domain-name:value-x = 'circl.lu']",
+    "[domain-name:value < true]",
+    "[domain-name:value LIKE 1]",
+    "[domain-name:value = 1.5]",
+    "[domain-name:value = +1]",
+    "[domain-name:value = b'Y2lyY2w=']",
+    "[domain-name:value = 'circl.lu'",
+    "[domain-name:value = 'a\\nb']"
+)
+_TESTS_PATH = Path(__file__).parent.resolve()
+
+
+def _collect_patterns(content, patterns: set):
+    if isinstance(content, dict):
+        if content.get('type') == 'indicator' and 'pattern' in content:
+            patterns.add((content.get('spec_version', '2.0'), content['pattern']))
+        for value in content.values():
+            _collect_patterns(value, patterns)
+    elif isinstance(content, (list, tuple)):
+        for value in content:
+            _collect_patterns(value, patterns)
+
+
+class TestSTIX2PatternParser(unittest.TestCase):
+    _VALID_INDICATOR = {
+        'spec_version': '2.1',
+        'pattern': "[domain-name:value = 'circl.lu']"
+    }
+    _INVALID_INDICATOR = {
+        'spec_version': '2.1',
+        'pattern': "[domain-name:value = 'circl.lu'"
+    }
+
+    def setUp(self):
+        STIX2PatternParser.cache_clear()
+
+    def tearDown(self):
+        STIX2PatternParser.set_cache_size(4096)
+        STIX2PatternParser.cache_clear()
+
+    def test_pattern_cache_shared_across_instances(self):
+        parser = STIX2PatternParser()
+        parser.handle_indicator(self._VALID_INDICATOR)
+        self.assertTrue(parser.valid)
+        other_parser = STIX2PatternParser()
+        other_parser.handle_indicator(self._VALID_INDICATOR)
+        self.assertTrue(other_parser.valid)
+        self.assertIs(other_parser.pattern, parser.pattern)
+        self.assertEqual(
+            other_parser.pattern.comparisons,
+            {'domain-name': [[['value'], '=', 'circl.lu']]}
+        )
+        hits, misses, _, currsize = STIX2PatternParser.cache_info()
+        self.assertEqual((hits, misses, currsize), (1, 1, 1))
+
+    def test_pattern_cache_invalid_pattern(self):
+        parser = STIX2PatternParser()
+        parser.handle_indicator(self._INVALID_INDICATOR)
+        self.assertFalse(parser.valid)
+        errors = parser.errors
+        parser.handle_indicator(self._VALID_INDICATOR)
+        parser.handle_indicator(self._INVALID_INDICATOR)
+        self.assertFalse(parser.valid)
+        self.assertEqual(parser.errors, errors)
+        self.assertEqual(STIX2PatternParser.cache_info().hits, 1)
+
+    def test_pattern_cache_version_key(self):
+        parser = STIX2PatternParser()
+        parser.handle_indicator(self._VALID_INDICATOR)
+        parser.handle_indicator(
+            {'pattern': self._VALID_INDICATOR['pattern']}
+        )
+        self.assertEqual(STIX2PatternParser.cache_info().misses, 2)
+
+    def test_pattern_cache_size(self):
+        STIX2PatternParser.set_cache_size(1)
+        parser = STIX2PatternParser()
+        parser.handle_indicator(self._VALID_INDICATOR)
+        parser.handle_indicator(self._INVALID_INDICATOR)
+        parser.handle_indicator(self._VALID_INDICATOR)
+        self.assertEqual(
+            STIX2PatternParser.cache_info(), (0, 3, 1, 1)
+        )
+        STIX2PatternParser.set_cache_size(0)
+        self.assertEqual(STIX2PatternParser.cache_info().currsize, 0)
+        parser.handle_indicator(self._VALID_INDICATOR)
+        self.assertTrue(parser.valid)
+        self.assertEqual(STIX2PatternParser.cache_info().currsize, 0)
+        with self.assertRaises(ValueError):
+            STIX2PatternParser.set_cache_size(-1)
+
+    def test_simple_pattern_parser_differential(self):
+        patterns = set()
+        for module in _BUNDLE_MODULES:
+            _collect_patterns(list(vars(module).values()), patterns)
+        for filename in _TESTS_PATH.glob('test_*_stix2*.json'):
+            with open(filename, 'rt', encoding='utf-8') as f:
+                _collect_patterns(json.load(f), patterns)
+        for version in STIX2PatternParser().valid_versions:
+            patterns.update(
+                (version, pattern) for pattern in _HANDCRAFTED_PATTERNS
+            )
+        simple = 0
+        for spec_version, pattern in sorted(patterns):
+            version = spec_version.replace('.', '')
+            fast_parser = STIX2PatternParser()
+            if not fast_parser._load_simple_pattern(pattern, version):
+                continue
+            simple += 1
+            with self.subTest(version=spec_version, pattern=pattern):
+                antlr_parser = STIX2PatternParser()
+                getattr(antlr_parser, f'_load_stix_{version}_pattern')(pattern)
+                self.assertEqual(fast_parser.valid, antlr_parser.valid)
+                if antlr_parser.valid:
+                    self.assertEqual(fast_parser.pattern, antlr_parser.pattern)
+                else:
+                    self.assertEqual(fast_parser.errors, antlr_parser.errors)
+        self.assertGreater(simple, len(patterns) // 2)
+        self.assertIsNone(_parse_simple_pattern(
+            "[domain-name:value = 'circl.lu'] AND [url:value = 'circl.lu']"
+        ))